@@ -26,6 +26,17 @@ from app.api.models.model import Base
 
 target_metadata = Base.metadata
 
+# Objects created by migrations and maintained by the database itself, which
+# the models do not declare and autogenerate must leave alone.
+UNMAPPED_OBJECTS = {"search_vector", "ix_urls_search_vector", "ix_urls_title_trgm"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Partitions of url_audit are created at runtime by the audit worker.
+    if type_ == "table" and name.startswith("url_audit_"):
+        return False
+    return name not in UNMAPPED_OBJECTS
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -48,6 +59,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -70,7 +82,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,45 @@
+"""urls keyset indexes
+
+Revision ID: 7a5044fa1095
+Revises: 056d30a31577
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a5044fa1095'
+down_revision: Union[str, None] = '056d30a31577'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so large tables stay writable during the migration.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_urls_user_id_id',
+            'urls',
+            ['user_id', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_urls_rating_id',
+            'urls',
+            [sa.text('coalesce(rating, -1) DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_urls_rating_id', table_name='urls', postgresql_concurrently=True)
+        op.drop_index('ix_urls_user_id_id', table_name='urls', postgresql_concurrently=True)
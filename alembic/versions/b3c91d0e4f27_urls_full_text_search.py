@@ -0,0 +1,78 @@
+"""urls full text search
+
+Revision ID: b3c91d0e4f27
+Revises: 7a5044fa1095
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c91d0e4f27'
+down_revision: Union[str, None] = '7a5044fa1095'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('urls', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # Keep search_vector in sync with title (A), author (B) and description (C).
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION urls_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.author, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER urls_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, author, description ON urls
+        FOR EACH ROW EXECUTE FUNCTION urls_search_vector_update()
+        """
+    )
+    # Backfill existing rows through the trigger.
+    op.execute("UPDATE urls SET title = title")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_urls_search_vector',
+            'urls',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_urls_title_trgm',
+            'urls',
+            ['title'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_urls_title_trgm', table_name='urls', postgresql_concurrently=True)
+        op.drop_index('ix_urls_search_vector', table_name='urls', postgresql_concurrently=True)
+    op.execute("DROP TRIGGER IF EXISTS urls_search_vector_trigger ON urls")
+    op.execute("DROP FUNCTION IF EXISTS urls_search_vector_update()")
+    op.drop_column('urls', 'search_vector')
@@ -0,0 +1,41 @@
+"""url audit
+
+Revision ID: c4d2e8a1f3b5
+Revises: b3c91d0e4f27
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d2e8a1f3b5'
+down_revision: Union[str, None] = 'b3c91d0e4f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'url_audit',
+        sa.Column('event_id', sa.String(length=32), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('url_id', sa.Integer(), nullable=False),
+        sa.Column('actor', sa.String(length=50), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('event_id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_index('ix_url_audit_url_id_created_at', 'url_audit', ['url_id', 'created_at'], unique=False)
+    # Monthly partitions are created ahead of time by the audit worker; this
+    # one catches anything outside them.
+    op.execute("CREATE TABLE url_audit_default PARTITION OF url_audit DEFAULT")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_url_audit_url_id_created_at', table_name='url_audit')
+    op.drop_table('url_audit')
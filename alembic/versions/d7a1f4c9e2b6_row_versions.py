@@ -0,0 +1,28 @@
+"""row versions
+
+Revision ID: d7a1f4c9e2b6
+Revises: c4d2e8a1f3b5
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a1f4c9e2b6'
+down_revision: Union[str, None] = 'c4d2e8a1f3b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('urls', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('urls', 'version')
+    op.drop_column('users', 'version')
@@ -1,17 +1,72 @@
 # Este módulo contiene la configuración y ejecución de la aplicación FastAPI.
+from asyncio import create_task
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 # Register routers imports
 from app.api.routers.url_routers import router as url_router
 from app.api.routers.user_routers import router as user_router
+from app.api.routers.health_routers import router as health_router
+from app.api.routers.metrics_routers import router as metrics_router
+from app.api.modules.redis_conf.redis_conf import RedisManager
+from app.api.modules.crud_reddis.local_cache import listen_invalidations
+from app.api.modules.admission.admission_control import AdmissionControl
+from app.api.modules.metrics.metrics import RouteMetrics, publish_metrics
+from app.api.modules.metrics.request_stats import RequestTiming
+from app.api.connections.db import DBContext, engine, replica_engines
+from app.api.controllers.controller_url import load_search_index
+from app.api.modules.passwords.password_hasher import password_hasher
+from app.api.settings import get_settings
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Crea un único pool de Redis para todo el proceso; al apagar cierra
+    # las conexiones de Redis y de la base de datos.
+    app.state.redis_manager = RedisManager.from_settings(get_settings())
+    # Con el índice de búsqueda en memoria, lo carga desde la base de datos.
+    if get_settings().search_backend == "memory":
+        async with DBContext() as db:
+            await load_search_index(db)
+    # Aplica las invalidaciones de la caché local publicadas por cualquier worker.
+    invalidations = create_task(listen_invalidations(app.state.redis_manager))
+    # Publica las métricas de este worker para que /metrics las agregue.
+    metrics_publisher = create_task(publish_metrics(app.state.redis_manager))
+    try:
+        yield
+    finally:
+        invalidations.cancel()
+        metrics_publisher.cancel()
+        await app.state.redis_manager.close()
+        await engine.dispose()
+        for replica in replica_engines:
+            await replica.dispose()
+        password_hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 app.title = "api books url".upper()
 app.version = "0.1.0"
 
+# Cuenta las consultas SQL y operaciones de Redis de cada petición
+# (cabecera Server-Timing y presupuesto de consultas).
+app.add_middleware(RequestTiming)
+
+# Mide la latencia de cada petición según la plantilla de su ruta.
+app.add_middleware(RouteMetrics)
+
+# Rechaza pronto (429/503 con Retry-After) en lugar de encolar peticiones
+# cuando un cliente supera su límite o el worker está saturado.
+app.add_middleware(AdmissionControl)
+
 # Registra las rutas relacionadas con usuarios.
 app.include_router(user_router, prefix="/users", tags=["Users"])
 
 # Registra las rutas relacionadas con libros (URLs).
 app.include_router(url_router, prefix="/urls", tags=["Urls"])
+
+# Registra las rutas de estado del servicio.
+app.include_router(health_router, prefix="/health", tags=["Health"])
+
+# Registra el endpoint de métricas para Prometheus.
+app.include_router(metrics_router, tags=["Metrics"])
@@ -1,20 +1,132 @@
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from app.api.connections.routing import ReplicaRouter, RoutingSession
+from app.api.modules.metrics.metrics import metrics, observe_engine, pool_collector
+from app.api.settings import Settings, get_settings
 
-DATABASE_URL = "postgresql://postgres@localhost/urluser"  # URL of the database
-engine = create_engine(DATABASE_URL)  # Create database engine
-SessionLocal = sessionmaker(
-    autocommit=False, autoflush=False, bind=engine
+
+class PoolStats:
+    """
+    Counters for the connection pool of an engine.
+
+    Attributes:
+        connects (int): New DBAPI connections opened by the pool.
+        checkouts (int): Connections handed out to sessions.
+        checkins (int): Connections returned to the pool.
+        invalidated (int): Connections discarded after an error or failed pre-ping.
+    """
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        """
+        Attach the counters to the pool events of an engine.
+
+        Args:
+            engine (AsyncEngine): The engine whose pool is tracked.
+        """
+        self.engine = engine
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidated = 0
+
+        pool = engine.sync_engine.pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidated += 1
+
+    def snapshot(self) -> dict:
+        """
+        Get the counters together with the current pool occupancy.
+
+        Returns:
+            dict: Event counters and the size, checked-out and overflow gauges.
+        """
+        pool = self.engine.sync_engine.pool
+        return {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidated": self.invalidated,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+
+
+def build_engine(url: str, settings: Settings) -> AsyncEngine:
+    """
+    Create an async engine using the pool settings.
+
+    Args:
+        url (str): SQLAlchemy URL of the database.
+        settings (Settings): The configuration to apply.
+
+    Returns:
+        AsyncEngine: The configured engine.
+    """
+    connect_args = {}
+    if settings.db_statement_timeout_ms:
+        connect_args["server_settings"] = {
+            "statement_timeout": str(settings.db_statement_timeout_ms)
+        }
+    return create_async_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+
+settings = get_settings()
+engine = build_engine(settings.database_url, settings)  # Create database engine
+replica_engines = [build_engine(url, settings) for url in settings.replica_urls]  # Read replicas
+pool_stats = PoolStats(engine)  # Track pool checkouts and checkins
+replica_pool_stats = [PoolStats(replica) for replica in replica_engines]
+observe_engine(engine.sync_engine, "primary")  # Time every statement for /metrics
+metrics.register_collector(pool_collector(pool_stats, "primary"))
+for index, replica in enumerate(replica_engines):
+    observe_engine(replica.sync_engine, f"replica{index}")
+    metrics.register_collector(pool_collector(replica_pool_stats[index], f"replica{index}"))
+router = ReplicaRouter(
+    engine.sync_engine,
+    [replica.sync_engine for replica in replica_engines],
+    strategy=settings.db_replica_strategy,
+    pin_window=settings.db_read_your_writes_window,
+)  # Send reads to replicas and writes to the primary
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    info={"router": router},
+    autoflush=False,
+    expire_on_commit=False,
 )  # Create local session
 Base = declarative_base()  # Create declarative base
 
 class DBContext:
-    def __init__(self) -> None:
+    def __init__(self, pin_key: str = None) -> None:
         self.db = SessionLocal()  # Initialize database session
+        self.db.info["pin_key"] = pin_key  # Read-your-writes key of the caller
 
-    def __enter__(self):
+    async def __aenter__(self) -> AsyncSession:
         return self.db  # Return the session upon entering the context
 
-    def __exit__(self, exc_type, exc_value, traceback):
-        self.db.close()  # Close the session upon exiting the context
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.db.close()  # Close the session upon exiting the context
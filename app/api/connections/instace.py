@@ -1,7 +1,18 @@
-from sqlalchemy.orm import Session
+from hashlib import sha256
+from typing import AsyncIterator
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.connections.db import DBContext
+from app.api.modules.redis_conf.redis_conf import RedisManager
 
 
-def get_db() -> Session:
-    with DBContext() as db:
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
+    # Requests carrying the same credentials share a read-your-writes pin.
+    authorization = request.headers.get("authorization")
+    pin_key = sha256(authorization.encode()).hexdigest() if authorization else None
+    async with DBContext(pin_key=pin_key) as db:
         yield db
+
+
+def get_redis_manager(request: Request) -> RedisManager:
+    return request.app.state.redis_manager
@@ -0,0 +1,152 @@
+from itertools import count
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Dict, List, Optional
+from sqlalchemy import Select, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+class ReplicaRouter:
+    """
+    Chooses the engine a statement runs on.
+
+    Writes always go to the primary. Reads go to one of the replicas unless the
+    caller wrote recently: after a write, the pin key of the session (or the
+    session itself when it has no key) is pinned to the primary for
+    `pin_window` seconds so it reads its own writes despite replication lag.
+
+    With "least_latency", one read in EXPLORE_EVERY still goes round robin, so
+    a replica that was slow once keeps being measured and can win reads back.
+
+    Attributes:
+        primary (Engine): The engine receiving writes.
+        replicas (List[Engine]): The engines serving reads.
+        strategy (str): "round_robin" or "least_latency".
+        pin_window (float): Seconds a pin key stays on the primary after a write.
+    """
+
+    STRATEGIES = ("round_robin", "least_latency")
+    # Share of reads (one in this many) spread round robin under "least_latency".
+    EXPLORE_EVERY = 10
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: List[Engine],
+        strategy: str = "round_robin",
+        pin_window: float = 5.0,
+    ) -> None:
+        """
+        Initializes a new instance of ReplicaRouter.
+
+        Args:
+            primary (Engine): The (sync) engine receiving writes.
+            replicas (List[Engine]): The (sync) engines serving reads.
+            strategy (str): "round_robin" or "least_latency".
+            pin_window (float): Seconds a pin key stays on the primary after a write.
+
+        Raises:
+            ValueError: If the strategy is unknown.
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.pin_window = pin_window
+        self._counter = count()
+        self._pins: Dict[str, float] = {}
+        self._pins_lock = Lock()
+        self.latency: Dict[Engine, float] = {replica: 0.0 for replica in replicas}
+        if strategy == "least_latency":
+            for replica in replicas:
+                self._track_latency(replica)
+
+    def _track_latency(self, replica: Engine) -> None:
+        """
+        Keep an exponentially weighted moving average of statement latency.
+
+        Args:
+            replica (Engine): The engine to measure.
+        """
+
+        @event.listens_for(replica, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info["replica_started"] = perf_counter()
+
+        @event.listens_for(replica, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.pop("replica_started", None)
+            if started is not None:
+                elapsed = perf_counter() - started
+                self.latency[replica] = 0.8 * self.latency[replica] + 0.2 * elapsed
+
+    def note_write(self, pin_key: Optional[str]) -> None:
+        """
+        Pin a key to the primary for the read-your-writes window.
+
+        Args:
+            pin_key (str): The key identifying the writer, or None.
+        """
+        if pin_key is None:
+            return
+        now = monotonic()
+        with self._pins_lock:
+            self._pins[pin_key] = now + self.pin_window
+            if len(self._pins) > 10000:
+                self._pins = {key: until for key, until in self._pins.items() if until > now}
+
+    def is_pinned(self, pin_key: Optional[str]) -> bool:
+        """
+        Check whether a key wrote within the read-your-writes window.
+
+        Args:
+            pin_key (str): The key identifying the reader, or None.
+
+        Returns:
+            bool: True if reads for the key must go to the primary.
+        """
+        if pin_key is None:
+            return False
+        until = self._pins.get(pin_key)
+        return until is not None and until > monotonic()
+
+    def reader(self) -> Engine:
+        """
+        Pick the engine for a read.
+
+        Returns:
+            Engine: A replica chosen by the strategy, or the primary if there are none.
+        """
+        if not self.replicas:
+            return self.primary
+        turn = next(self._counter)
+        if self.strategy == "least_latency":
+            if turn % self.EXPLORE_EVERY:
+                return min(self.replicas, key=self.latency.__getitem__)
+            turn //= self.EXPLORE_EVERY
+        return self.replicas[turn % len(self.replicas)]
+
+
+class RoutingSession(Session):
+    """
+    Session sending reads to replicas and writes to the primary.
+
+    The router is taken from `info["router"]` and the optional read-your-writes
+    key from `info["pin_key"]`.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        router: ReplicaRouter = self.info["router"]
+        pin_key = self.info.get("pin_key")
+        if self._flushing or not isinstance(clause, Select) or clause._for_update_arg is not None:
+            self.info["last_write"] = monotonic()
+            router.note_write(pin_key)
+            return router.primary
+        last_write = self.info.get("last_write")
+        if last_write is not None and monotonic() - last_write < router.pin_window:
+            return router.primary
+        if router.is_pinned(pin_key):
+            return router.primary
+        return router.reader()
@@ -1,33 +1,50 @@
 from fastapi import HTTPException
-from fastapi.encoders import jsonable_encoder
-from app.api.modules.crud_postgresql.query_url import UrlDataRepository
-from app.api.modules.crud_reddis.crud_redis_basic import CrudRedis
-from app.api.connections.db import DBContext
-from app.api.modules.logger_modify import ColoredLogger
+from csv import writer as csv_writer
+from io import StringIO
+from json import dumps as json_dumps
+from time import perf_counter
+from typing import AsyncIterator, List, Optional
+from app.api.models.model import Urls
+from app.api.modules.crud_postgresql.pagination import decode_cursor, encode_cursor
+from app.api.modules.crud_postgresql.query_url import UrlDataRepository, URL_COLUMNS, URL_SORTS, url_sort_key
+from app.api.modules.crud_postgresql.querys_user import UserRepository
+from app.api.modules.crud_postgresql.versioning import VersionConflict
+from app.api.modules.crud_reddis.audit_stream import AuditStream
+from app.api.modules.crud_reddis.crud_redis_basic import CrudRedis, URL_NOT_FOUND
+from app.api.modules.crud_reddis.local_cache import publish_invalidation, url_local_cache
+from redis import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.modules.logger_modify import get_logger
 from app.api.modules.redis_conf.redis_conf import RedisManager
+from app.api.modules.search.inverted_index import url_search_index
+from app.api.settings import get_settings
 
 # Initialize the logger
-logger = ColoredLogger().get_logger()
+logger = get_logger(__name__)
 
 class UrlController:
     """
     Controller class for URL-related operations.
     """
 
-    def __init__(self, db: DBContext, redis_manager: RedisManager):
+    def __init__(self, db: AsyncSession, redis_manager: RedisManager, actor: Optional[str] = None):
         """
         Initializes an instance of UrlController.
 
         Args:
-            db (DBContext): The database context.
+            db (AsyncSession): The database session.
             redis_manager (RedisManager): The Redis manager.
+            actor (str): `sub` of the authenticated caller, recorded in the audit stream.
         """
         self.logger = logger
         self.db = db
         self.url_repo = UrlDataRepository(db)
+        self.user_repo = UserRepository(db)
+        self.redis_manager = redis_manager
         self.redis_repo = CrudRedis(redis=redis_manager)
+        self.audit = AuditStream(redis_manager, actor=actor)
 
-    def create_url(self, url_data: dict):
+    async def create_url(self, url_data: dict):
         """
         Create a new URL.
 
@@ -38,73 +55,491 @@ class UrlController:
             dict: The created URL data.
         """
         try:
-            url = self.url_repo.create_url(**url_data)
-            self.redis_repo.store_url_in_redis(url.id, url_data)
-            url_to_json = jsonable_encoder(url)
-            return {"status": url_to_json}
+            url = await self.url_repo.create_url(**url_data)
+            await self.redis_repo.store_url_in_redis(url.id, url.to_dict())
+            _index_urls([url.to_dict()])
+            await self.audit.publish([self.audit.event("create", url.id, url.to_dict())])
+            return {"status": url.to_dict()}
         except Exception as e:
             self.logger.error("Error creating URL: %s", str(e))
             raise HTTPException(status_code=500, detail="Error creating URL")
 
-    def read_url(self, url_id: int):
+    async def create_urls(self, urls: List[dict]):
+        """
+        Create many URLs at once.
+
+        Items are validated first; the valid ones are inserted in a single
+        transaction and cached with one Redis pipeline. Invalid items are
+        reported individually without aborting the rest of the batch.
+
+        Args:
+            urls (List[dict]): The URL data items.
+
+        Returns:
+            dict: Per-item results in input order, plus created/failed counts.
+
+        Raises:
+            ValueError: If the batch is larger than the configured maximum.
+        """
+        settings = get_settings()
+        if len(urls) > settings.bulk_max_items:
+            raise ValueError(f"At most {settings.bulk_max_items} URLs can be created at once")
+
+        results: List[dict] = [None] * len(urls)
+        errors = [_validate_url_item(item) for item in urls]
+        try:
+            user_ids = {item["user_id"] for item, error in zip(urls, errors) if not error and item["user_id"] is not None}
+            known_users = await self.user_repo.existing_user_ids(user_ids)
+            for index, item in enumerate(urls):
+                if not errors[index] and item["user_id"] is not None and item["user_id"] not in known_users:
+                    errors[index] = f"User {item['user_id']} does not exist"
+
+            valid = [index for index, error in enumerate(errors) if not error]
+            created = await self.url_repo.create_urls(
+                [urls[index] for index in valid], copy_threshold=settings.bulk_copy_threshold
+            )
+        except Exception as e:
+            self.logger.error("Error creating URLs: %s", str(e))
+            raise HTTPException(status_code=500, detail="Error creating URLs")
+
+        _index_urls(created)
+        await self.audit.publish(self.audit.event("create", url_data["id"], url_data) for url_data in created)
+        try:
+            await self.redis_repo.store_urls_in_redis(created)
+        except Exception as e:
+            # The rows are committed; reads will repopulate the cache on a miss.
+            self.logger.error("Error caching created URLs: %s", str(e))
+
+        for index, url_data in zip(valid, created):
+            results[index] = {"index": index, "status": "created", "url": url_data}
+        for index, error in enumerate(errors):
+            if error:
+                results[index] = {"index": index, "status": "error", "detail": error}
+        return {"created": len(created), "failed": len(urls) - len(created), "results": results}
+
+    async def read_url(self, url_id: int, fields: Optional[List[str]] = None):
         """
         Read URL data by ID.
 
+        Redis is consulted first; the database is only queried on a cache
+        miss, after which the row (or a "not found" marker) is written back.
+        Concurrent misses on the same URL are collapsed so that only one
+        request reloads it (see CrudRedis). Hot URLs are served from the
+        worker's in-memory cache without reaching Redis.
+
         Args:
             url_id (int): The ID of the URL.
+            fields (List[str]): Columns to return, as given by `select_fields`; all if None.
 
         Returns:
             dict: The retrieved URL data.
+
+        Raises:
+            ValueError: If the URL does not exist.
         """
+        local = url_local_cache.get(url_id)
+        if local is not None:
+            return {"result": local if fields is None else {field: local[field] for field in fields if field in local}}
+        generation = url_local_cache.generation
         try:
-            url = self.url_repo.read_url(url_id)
-            if url:
-                result = self.redis_repo.get_url_from_redis(url.id)
-                result_to_json = jsonable_encoder(result)
-                return {"result": result_to_json}
-            url_to_json = jsonable_encoder(url)
-            return {"status": url_to_json}
+            cached = await self.redis_repo.get_url_from_redis(url_id, fields=fields)
+            if cached is URL_NOT_FOUND:
+                raise ValueError("URL not found")
+            if cached is not None:
+                if fields is None:
+                    url_local_cache.put(url_id, cached, generation)
+                return {"result": cached}
+
+            started = perf_counter()
+            try:
+                url = await self.url_repo.read_url(url_id)
+            except ValueError:
+                await self.redis_repo.store_missing_url_in_redis(url_id)
+                raise
+            url_data = url.to_dict()
+            delta_ms = int((perf_counter() - started) * 1000)
+            await self.redis_repo.store_url_in_redis(url.id, url_data, delta_ms=delta_ms)
+            url_local_cache.put(url_id, url_data, generation)
+            if fields is not None:
+                url_data = {field: url_data[field] for field in fields}
+            return {"result": url_data}
+        except ValueError:
+            raise
         except Exception as e:
             self.logger.error("Error reading URL: %s", str(e))
             raise HTTPException(status_code=500, detail="Error reading URL")
 
-    def update_url(self, url_id: int, new_data: dict):
+    async def read_urls(self, url_ids: List[int]):
+        """
+        Read many URLs by ID in a constant number of round trips.
+
+        IDs missing from the in-memory cache are looked up with one Redis
+        pipeline; the misses are fetched with one IN query and written back
+        with one pipeline.
+
+        Args:
+            url_ids (List[int]): The IDs of the URLs, possibly repeated.
+
+        Returns:
+            dict: The URL data under `results` in requested order, with None for
+            IDs that do not exist, and the missing IDs under `missing`.
+
+        Raises:
+            ValueError: If more IDs are requested than the configured maximum.
+        """
+        settings = get_settings()
+        unique_ids = list(dict.fromkeys(url_ids))
+        if len(unique_ids) > settings.multi_get_max_ids:
+            raise ValueError(f"At most {settings.multi_get_max_ids} URLs can be read at once")
+        found = {}
+        for url_id in unique_ids:
+            local = url_local_cache.get(url_id)
+            if local is not None:
+                found[url_id] = local
+        generation = url_local_cache.generation
+        try:
+            remote = [url_id for url_id in unique_ids if url_id not in found]
+            cached = await self.redis_repo.get_urls_from_redis(remote)
+            for url_id, url_data in cached.items():
+                if url_data is not URL_NOT_FOUND:
+                    url_local_cache.put(url_id, url_data, generation)
+            found.update(cached)
+            misses = [url_id for url_id in remote if url_id not in found]
+            if misses:
+                started = perf_counter()
+                loaded = [url.to_dict() for url in await self.url_repo.read_urls(misses)]
+                delta_ms = int((perf_counter() - started) * 1000)
+                for url_data in loaded:
+                    found[url_data["id"]] = url_data
+                    url_local_cache.put(url_data["id"], url_data, generation)
+                missing = [url_id for url_id in misses if url_id not in found]
+                try:
+                    await self.redis_repo.store_urls_in_redis(loaded, missing_ids=missing, delta_ms=delta_ms)
+                except Exception as e:
+                    self.logger.error("Error caching URLs: %s", str(e))
+        except Exception as e:
+            self.logger.error("Error reading URLs: %s", str(e))
+            raise HTTPException(status_code=500, detail="Error reading URLs")
+
+        results = []
+        missing = []
+        for url_id in url_ids:
+            url_data = found.get(url_id, URL_NOT_FOUND)
+            if url_data is URL_NOT_FOUND:
+                results.append(None)
+                missing.append(url_id)
+            else:
+                results.append(url_data)
+        return {"results": results, "missing": missing}
+
+    async def list_urls(self, sort: str = "id", cursor: Optional[str] = None, limit: int = 50):
+        """
+        List URLs one keyset page at a time.
+
+        Args:
+            sort (str): "id" or "rating".
+            cursor (str): The `next_cursor` of the previous page, or None.
+            limit (int): Page size.
+
+        Returns:
+            dict: The URL data under `results` and the cursor of the next page
+            under `next_cursor` (None on the last page).
+
+        Raises:
+            ValueError: If the ordering or the cursor is invalid.
+        """
+        if sort not in URL_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(URL_SORTS)}")
+        after = decode_cursor(cursor, URL_SORTS[sort])
+        try:
+            urls = await self.url_repo.list_urls(sort=sort, after=after, limit=limit + 1)
+        except Exception as e:
+            self.logger.error("Error listing URLs: %s", str(e))
+            raise HTTPException(status_code=500, detail="Error listing URLs")
+        return _page(urls, limit, sort)
+
+    async def list_user_urls(self, user_id: int, cursor: Optional[str] = None, limit: int = 50):
+        """
+        List the URLs of a user one keyset page at a time.
+
+        Args:
+            user_id (int): The ID of the owner.
+            cursor (str): The `next_cursor` of the previous page, or None.
+            limit (int): Page size.
+
+        Returns:
+            dict: The URL data under `results` and the cursor of the next page
+            under `next_cursor` (None on the last page).
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        after = decode_cursor(cursor, 1)
+        try:
+            urls = await self.url_repo.list_user_urls(user_id, after=after, limit=limit + 1)
+        except Exception as e:
+            self.logger.error("Error listing URLs: %s", str(e))
+            raise HTTPException(status_code=500, detail="Error listing URLs")
+        return _page(urls, limit, "id")
+
+    async def search_urls(self, query: str, cursor: Optional[str] = None, limit: int = 20):
+        """
+        Search URLs by relevance over title, description and author.
+
+        Uses the Postgres full-text and trigram indexes, or the in-process
+        inverted index when SEARCH_BACKEND is "memory".
+
+        Args:
+            query (str): The search text.
+            cursor (str): The `next_cursor` of the previous page, or None.
+            limit (int): Page size.
+
+        Returns:
+            dict: The matching URL data with their `score` under `results`, best
+            first, and the cursor of the next page under `next_cursor`.
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        after = decode_cursor(cursor, 2)
+        try:
+            if get_settings().search_backend == "memory":
+                ranked = url_search_index.search(query, limit=limit + 1, after=after)
+                page = await self.read_urls([url_id for _, url_id in ranked[:limit]])
+                matches = [
+                    (url_data, score)
+                    for (score, _), url_data in zip(ranked, page["results"])
+                    if url_data is not None
+                ]
+            else:
+                rows = await self.url_repo.search_urls(query, after=after, limit=limit + 1)
+                ranked = [(score, url.id) for url, score in rows]
+                matches = [(url.to_dict(), score) for url, score in rows[:limit]]
+        except HTTPException:
+            raise
+        except Exception as e:
+            self.logger.error("Error searching URLs: %s", str(e))
+            raise HTTPException(status_code=500, detail="Error searching URLs")
+
+        results = [dict(url_data, score=score) for url_data, score in matches]
+        next_cursor = encode_cursor(list(ranked[limit - 1])) if len(ranked) > limit else None
+        return {"results": results, "next_cursor": next_cursor}
+
+    async def update_url(self, url_id: int, new_data: dict, expected_version: Optional[int] = None):
         """
         Update URL data by ID.
 
         Args:
             url_id (int): The ID of the URL.
             new_data (dict): The updated URL data.
+            expected_version (int): Version from the client's If-Match, or None.
 
         Returns:
-            bool: True if update was successful, False otherwise.
+            dict: The updated row, or None if the URL does not exist.
+
+        Raises:
+            ValueError: If `new_data` holds a key that is not an updatable column.
+            VersionConflict: If the URL is no longer at `expected_version`.
         """
+        unknown = [key for key in new_data if key not in URL_COLUMNS]
+        if unknown:
+            raise ValueError(f"Fields cannot be updated: {', '.join(unknown)}")
         try:
-            url_updated = self.url_repo.update_url(url_id, new_data)
-            if url_updated:
-                self.redis_repo.update_url_in_redis(url_id, new_data)
-                return True
-            return False
+            url_data = await self.url_repo.update_url(url_id, new_data, expected_version=expected_version)
+            if url_data is None:
+                return None
+            changed = {column: url_data[column] for column in new_data}
+            changed["version"] = url_data["version"]
+            try:
+                # Conditional on the row version: a slower concurrent update
+                # cannot overwrite this one in the cache.
+                await self.redis_repo.update_url_in_redis(url_id, changed, version=url_data["version"])
+            except RedisError:
+                # Drop the entry instead; the next read repopulates it.
+                await self.redis_repo.delete_url_from_redis(url_id)
+            await publish_invalidation(self.redis_manager, url_id)
+            await self.audit.publish([self.audit.event("update", url_id, new_data)])
+            _index_urls([url_data])
+            return url_data
+        except VersionConflict:
+            raise
         except Exception as e:
             self.logger.error("Error updating URL: %s", str(e))
             raise HTTPException(status_code=500, detail="Error updating URL")
 
-    def delete_url(self, url_id: int):
+    async def delete_url(self, url_id: int, expected_version: Optional[int] = None):
         """
         Delete URL data by ID.
 
         Args:
             url_id (int): The ID of the URL.
+            expected_version (int): Version from the client's If-Match, or None.
 
         Returns:
             bool: True if deletion was successful, False otherwise.
+
+        Raises:
+            VersionConflict: If the URL is no longer at `expected_version`.
         """
         try:
-            url_deleted = self.url_repo.delete_url(url_id)
+            url_deleted = await self.url_repo.delete_url(url_id, expected_version=expected_version)
             if url_deleted:
-                self.redis_repo.delete_url_from_redis(url_id)
+                await self.redis_repo.delete_url_from_redis(url_id)
+                await publish_invalidation(self.redis_manager, url_id)
+                url_search_index.remove(url_id)
+                await self.audit.publish([self.audit.event("delete", url_id)])
                 return True
             return False
+        except VersionConflict:
+            raise
         except Exception as e:
             self.logger.error("Error deleting URL: %s", str(e))
             raise HTTPException(status_code=500, detail="Error deleting URL")
+
+
+def select_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated list of URL columns.
+
+    Args:
+        fields (str): The `fields` query parameter, or None.
+
+    Returns:
+        List[str]: The selected columns, or None to return all of them.
+
+    Raises:
+        ValueError: If a column does not exist.
+    """
+    if not fields:
+        return None
+    selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in selected if field not in ("id",) + URL_COLUMNS + ("version",)]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return selected or None
+
+
+# Formats supported by the export, with their media types.
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def export_urls(
+    db: AsyncSession, export_format: str, user_id: Optional[int] = None, since_id: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Stream the URL catalog as NDJSON or CSV.
+
+    The session must stay open until the stream is consumed, which outlives
+    the request handler (the route takes it with `scope="request"`). One
+    chunk is yielded per database batch.
+
+    Args:
+        db (AsyncSession): The session to read the URLs with.
+        export_format (str): "ndjson" or "csv".
+        user_id (int): Only export the URLs of this user, if given.
+        since_id (int): Only export URLs with an ID greater than this, for incremental dumps.
+
+    Yields:
+        str: Consecutive chunks of the export.
+    """
+    batch_size = get_settings().export_batch_size
+    columns = ("id",) + URL_COLUMNS
+    buffer = StringIO()
+    rows = csv_writer(buffer)
+    if export_format == "csv":
+        rows.writerow(columns)
+    pending = 0
+    async for url_data in UrlDataRepository(db).stream_urls(user_id, since_id, batch_size):
+        if export_format == "csv":
+            rows.writerow([url_data[column] for column in columns])
+        else:
+            buffer.write(json_dumps(url_data, separators=(",", ":")))
+            buffer.write("\n")
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def load_search_index(db: AsyncSession, batch_size: int = 1000):
+    """
+    Fill the in-process search index with every URL in the database.
+
+    Args:
+        db (AsyncSession): The database session.
+        batch_size (int): Rows read per keyset page.
+    """
+    repo = UrlDataRepository(db)
+    after = None
+    while True:
+        urls = await repo.list_urls(after=after, limit=batch_size)
+        _index_urls([url.to_dict() for url in urls])
+        if len(urls) < batch_size:
+            break
+        after = url_sort_key(urls[-1], "id")
+    logger.info("Search index loaded: %d URLs", len(url_search_index))
+
+
+def _index_urls(urls: List[dict]):
+    """
+    Add URLs to the in-process search index when it is the search backend.
+
+    Args:
+        urls (List[dict]): The URL rows.
+    """
+    if get_settings().search_backend != "memory":
+        return
+    for url_data in urls:
+        url_search_index.add(url_data["id"], url_data["title"], url_data["author"], url_data["description"])
+
+
+def _page(urls: List[Urls], limit: int, sort: str) -> dict:
+    """
+    Build a listing response from up to `limit + 1` rows.
+
+    Args:
+        urls (List[Urls]): The rows fetched, one more than the page size if a next page exists.
+        limit (int): Page size.
+        sort (str): The ordering used, to build the next cursor.
+
+    Returns:
+        dict: The page under `results` and the cursor of the next page under `next_cursor`.
+    """
+    page = urls[:limit]
+    next_cursor = encode_cursor(url_sort_key(page[-1], sort)) if len(urls) > limit else None
+    return {"results": page, "next_cursor": next_cursor}
+
+
+def _validate_url_item(item: dict) -> Optional[str]:
+    """
+    Check that a bulk item can be inserted into `urls`.
+
+    Args:
+        item (dict): The candidate URL data.
+
+    Returns:
+        str: A description of the first problem found, or None if the item is valid.
+    """
+    missing = [column for column in URL_COLUMNS if column not in item]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    unknown = [key for key in item if key not in URL_COLUMNS]
+    if unknown:
+        return f"Unknown fields: {', '.join(unknown)}"
+    for column in URL_COLUMNS:
+        value = item[column]
+        if value is None:
+            continue
+        column_type = Urls.__table__.c[column].type
+        if column_type.python_type is int:
+            if not isinstance(value, int) or isinstance(value, bool):
+                return f"Field {column} must be an integer"
+        elif not isinstance(value, str):
+            return f"Field {column} must be a string"
+        elif column_type.length is not None and len(value) > column_type.length:
+            return f"Field {column} is longer than {column_type.length} characters"
+    return None
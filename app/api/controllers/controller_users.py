@@ -1,25 +1,28 @@
+from typing import Optional
 from fastapi import HTTPException
-from fastapi.encoders import jsonable_encoder
-from app.api.connections.db import DBContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.modules.crud_postgresql.querys_user import UserRepository
+from app.api.modules.crud_postgresql.versioning import VersionConflict
 from app.api.modules.crud_reddis.crud_redis_basic import CrudRedis
-from app.api.modules.logger_modify import ColoredLogger
+from app.api.modules.crud_reddis.local_cache import publish_invalidation
+from app.api.modules.logger_modify import get_logger
+from app.api.modules.passwords.password_hasher import password_hasher
 from app.api.modules.redis_conf.redis_conf import RedisManager
 
 # Initialize the logger
-logger = ColoredLogger().get_logger()
+logger = get_logger(__name__)
 
 class UserController:
     """
     Controller class for user-related operations.
     """
 
-    def __init__(self, db: DBContext, redis_manager: RedisManager):
+    def __init__(self, db: AsyncSession, redis_manager: RedisManager):
         """
         Initializes an instance of UserController.
 
         Args:
-            db (DBContext): The database context.
+            db (AsyncSession): The database session.
             redis_manager (RedisManager): The Redis manager.
         """
         self.logger = logger
@@ -27,7 +30,7 @@ class UserController:
         self.user_repo = UserRepository(db)
         self.redis_manager = CrudRedis(redis_manager)
 
-    def create_user(self, user_data: dict):
+    async def create_user(self, user_data: dict):
         """
         Create a new user.
 
@@ -35,17 +38,19 @@ class UserController:
             user_data (dict): The user data.
 
         Returns:
-            dict: The created user data.
+            User: The created user.
+
+        Raises:
+            PasswordPoolBusy: If the password pool is full.
         """
+        user_data = {**user_data, "password": await password_hasher.hash(user_data["password"])}
         try:
-            user = self.user_repo.create_user(**user_data)
-            user_to_json = jsonable_encoder(user)
-            return user_to_json
+            return await self.user_repo.create_user(**user_data)
         except Exception as e:
             self.logger.error("Error creating user: %s", str(e))
             raise HTTPException(status_code=500, detail="Error creating user")
 
-    def read_user(self, user_id: int):
+    async def read_user(self, user_id: int):
         """
         Read user data by ID.
 
@@ -53,54 +58,103 @@ class UserController:
             user_id (int): The ID of the user.
 
         Returns:
-            dict: The retrieved user data.
+            User: The retrieved user.
+
+        Raises:
+            ValueError: If the user does not exist.
         """
         try:
-            user = self.user_repo.read_user(user_id)
-            user_to_json = jsonable_encoder(user)
-            return user_to_json
+            user = await self.user_repo.read_user(user_id)
+            await self.redis_manager.store_user_version(user.id, user.version)
+            return user
+        except ValueError:
+            raise
         except Exception as e:
             self.logger.error("Error reading user: %s", str(e))
             raise HTTPException(status_code=500, detail="Error reading user")
 
-    def update_user(self, user_id: int, new_data: dict):
+    async def rehash_password(self, user, password_hash: str) -> None:
+        """
+        Store a new password hash for a user who just logged in.
+
+        The write bumps the user's version, so the version kept for
+        conditional GETs is updated too.
+
+        Args:
+            user (User): The user, as loaded by this controller's session.
+            password_hash (str): The hash made with the preferred scheme.
+        """
+        version = await self.user_repo.update_password(user, password_hash)
+        await self.redis_manager.store_user_version(user.id, version)
+
+    async def cached_version(self, user_id: int) -> Optional[int]:
+        """
+        Get the version of a user without querying the database.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The version last read or written, or None if unknown.
+        """
+        return await self.redis_manager.get_user_version(user_id)
+
+    async def update_user(self, user_id: int, new_data: dict, expected_version: Optional[int] = None):
         """
         Update user data by ID.
 
         Args:
             user_id (int): The ID of the user.
             new_data (dict): The updated user data.
+            expected_version (int): Version from the client's If-Match, or None.
 
         Returns:
             bool: True if update was successful, False otherwise.
+
+        Raises:
+            PasswordPoolBusy: If the password pool is full.
+            VersionConflict: If the user is no longer at `expected_version`.
         """
+        if new_data.get("password"):
+            new_data = {**new_data, "password": await password_hasher.hash(new_data["password"])}
         try:
-            user_updated = self.user_repo.update_user(user_id, new_data)
-            if user_updated:
-                return True
-            return False
+            version = await self.user_repo.update_user(user_id, new_data, expected_version=expected_version)
+            if version is None:
+                return False
+            await self.redis_manager.store_user_version(user_id, version)
+            return True
+        except VersionConflict:
+            raise
         except Exception as e:
             self.logger.error("Error updating user: %s", str(e))
             raise HTTPException(status_code=500, detail="Error updating user")
 
-    def delete_user(self, user_id: int):
+    async def delete_user(self, user_id: int, expected_version: Optional[int] = None):
         """
         Delete user data by ID.
 
         Args:
             user_id (int): The ID of the user.
+            expected_version (int): Version from the client's If-Match, or None.
 
         Returns:
             bool: True if deletion was successful, False otherwise.
+
+        Raises:
+            VersionConflict: If the user is no longer at `expected_version`.
         """
         try:
-            user_deleted = self.user_repo.delete_user(user_id)
-            if user_deleted:
-                return True
-            return False
+            url_ids = await self.user_repo.delete_user(user_id, expected_version=expected_version)
+            if url_ids is None:
+                return False
+            await self.redis_manager.delete_user_version(user_id)
+            # The user's URLs changed owner: drop their cached copies.
+            await self.redis_manager.delete_urls_from_redis(url_ids)
+            for url_id in url_ids:
+                await publish_invalidation(self.redis_manager.redis_manager, url_id)
+            return True
+        except VersionConflict:
+            raise
         except Exception as e:
             self.logger.error("Error deleting user: %s", str(e))
             raise HTTPException(status_code=500, detail="Error deleting user")
-
-# Create a global instance of the RedisManager class
-redis_manager = RedisManager()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import JSON, Column, DateTime, Integer, String, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.api.connections.db import Base
 
@@ -12,6 +12,7 @@ class User(Base):
         username (str): User's username.
         password (str): User's password.
         role (str): User's role.
+        version (int): Incremented on every change, for optimistic concurrency.
         urls (Relationship): Relationship with associated URLs for the user.
     """
 
@@ -21,9 +22,12 @@ class User(Base):
     username = Column(String(50), unique=True, index=True)
     password = Column(String(100))
     role = Column(String(20))
+    version = Column(Integer, nullable=False, server_default="1")
 
     urls = relationship("Urls", back_populates="user")
 
+    __mapper_args__ = {"version_id_col": version}
+
 
 class Urls(Base):
     """
@@ -36,7 +40,13 @@ class Urls(Base):
         author (str): URL's author.
         rating (int): URL's rating.
         user_id (int): ID of the user to whom the URL belongs.
+        version (int): Incremented on every change, for optimistic concurrency.
         user (Relationship): Relationship with the user who owns the URL.
+
+    Indexes:
+        ix_urls_user_id_id: Keyset pagination of a user's URLs on (user_id, id).
+        ix_urls_rating_id: Keyset pagination by rating on (rating DESC, id DESC),
+            with unrated URLs sorted last.
     """
 
     __tablename__ = "urls"
@@ -47,5 +57,55 @@ class Urls(Base):
     author = Column(String(50))
     rating = Column(Integer)
     user_id = Column(Integer, ForeignKey("users.id"))
+    version = Column(Integer, nullable=False, server_default="1")
 
     user = relationship("User", back_populates="urls")
+
+    __table_args__ = (
+        Index("ix_urls_user_id_id", user_id, id),
+        Index("ix_urls_rating_id", func.coalesce(rating, -1).desc(), id.desc()),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the column values of the URL into a plain dictionary.
+
+        Returns:
+            dict: Mapping of column names to their values.
+        """
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
+
+
+class UrlAudit(Base):
+    """
+    Class representing a change made to a URL, as recorded by the audit stream.
+
+    The table is partitioned by month on `created_at` in Postgres. Rows have
+    no foreign key to `urls`, so the history of deleted URLs is kept.
+
+    Attributes:
+        event_id (str): ID of the entry in the Redis Stream, unique per event.
+        created_at (datetime): When the change was made (taken from the entry ID).
+        action (str): "create", "update" or "delete".
+        url_id (int): ID of the changed URL.
+        actor (str): `sub` of the user who made the change, if known.
+        data (dict): The fields written by a create or update.
+
+    Indexes:
+        ix_url_audit_url_id_created_at: History of one URL in time order.
+    """
+
+    __tablename__ = "url_audit"
+
+    event_id = Column(String(32), primary_key=True)
+    created_at = Column(DateTime(timezone=True), primary_key=True)
+    action = Column(String(10), nullable=False)
+    url_id = Column(Integer, nullable=False)
+    actor = Column(String(50))
+    data = Column(JSON(none_as_null=True))
+
+    __table_args__ = (
+        Index("ix_url_audit_url_id_created_at", url_id, created_at),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
@@ -0,0 +1,134 @@
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class UrlSchema(BaseModel):
+    """
+    Public representation of a URL.
+
+    Every field is optional so that a response limited with `fields` only
+    carries the requested columns (routes use `response_model_exclude_unset`).
+    Instances are built from dicts or directly from `Urls` rows.
+
+    Attributes:
+        id (int): Unique identifier for the URL.
+        title (str): URL's title.
+        description (str): URL's description.
+        author (str): URL's author.
+        rating (int): URL's rating.
+        user_id (int): ID of the user to whom the URL belongs.
+        version (int): Version of the row, to send back in If-Match.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    author: Optional[str] = None
+    rating: Optional[int] = None
+    user_id: Optional[int] = None
+    version: Optional[int] = None
+
+
+class UrlSearchHit(UrlSchema):
+    """
+    A URL matched by a search, with its relevance.
+
+    Attributes:
+        score (float): Relevance of the match; higher is better.
+    """
+
+    score: float
+
+
+class UserSchema(BaseModel):
+    """
+    Public representation of a user; the password hash is never exposed.
+
+    Attributes:
+        id (int): Unique identifier for the user.
+        username (str): User's username.
+        role (str): User's role.
+        version (int): Version of the row, to send back in If-Match.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: Optional[str] = None
+    role: Optional[str] = None
+    version: Optional[int] = None
+
+
+class UrlCreatedResponse(BaseModel):
+    """
+    Response of the creation of a URL.
+    """
+
+    status: UrlSchema
+
+
+class UrlDeletedResponse(BaseModel):
+    """
+    Response of the deletion of a URL.
+    """
+
+    id: int
+    message: str
+
+
+class BulkItemResult(BaseModel):
+    """
+    Outcome of one item of a bulk creation: `url` when created, `detail` on error.
+    """
+
+    index: int
+    status: str
+    url: Optional[UrlSchema] = None
+    detail: Optional[str] = None
+
+
+class BulkCreateResponse(BaseModel):
+    """
+    Response of a bulk creation, with one result per item in input order.
+    """
+
+    created: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class UrlResponse(BaseModel):
+    """
+    Response holding one URL.
+    """
+
+    result: UrlSchema
+
+
+class UrlBatchResponse(BaseModel):
+    """
+    Response of a multi-get, in requested order with null for unknown IDs.
+    """
+
+    results: List[Optional[UrlSchema]]
+    missing: List[int]
+
+
+class UrlPageResponse(BaseModel):
+    """
+    A page of URLs and the cursor of the next page (null on the last page).
+    """
+
+    results: List[UrlSchema]
+    next_cursor: Optional[str] = None
+
+
+class UrlSearchResponse(BaseModel):
+    """
+    A page of search matches, best first, and the cursor of the next page.
+    """
+
+    results: List[UrlSearchHit]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,197 @@
+from math import ceil
+from time import time
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException
+from jwt import PyJWTError
+from redis import RedisError
+from starlette.responses import JSONResponse
+from app.api.modules.logger_modify import get_logger
+from app.api.modules.tokens.access_token import auth
+from app.api.settings import get_settings
+
+logger = get_logger(__name__)
+
+# Sliding-window counter: the count of the current fixed window plus the
+# previous window's count weighted by how much of it still overlaps the
+# sliding window. KEYS[1]/KEYS[2] are the previous/current window counters,
+# ARGV[1] the limit, ARGV[2] the window in ms and ARGV[3] the elapsed ms of
+# the current window. Returns {1, 0} when admitted (and counted), or
+# {0, ms until the request would be admitted}.
+_SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local previous = tonumber(redis.call('GET', KEYS[1]) or '0')
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * (window - elapsed) / window + current >= limit then
+    if current >= limit or previous == 0 then
+        return {0, window - elapsed}
+    end
+    return {0, math.max(1, math.ceil(window * (1 - (limit - current) / previous)) - elapsed)}
+end
+redis.call('INCR', KEYS[2])
+redis.call('PEXPIRE', KEYS[2], window * 2)
+return {1, 0}
+"""
+
+# Paths never shed or limited, so health checks and scrapes keep answering under load.
+EXEMPT_PREFIXES = ("/health", "/metrics")
+
+
+class AdmissionStats:
+    """
+    Counters of the admission control of this worker.
+
+    Attributes:
+        in_flight (int): Requests being handled right now.
+        shed (int): Requests answered 503 because `max_in_flight` was reached.
+        rate_limited (Dict[str, int]): Requests answered 429, per router prefix.
+        errors (int): Rate limit checks skipped because Redis was unavailable.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes all counters to zero.
+        """
+        self.in_flight = 0
+        self.shed = 0
+        self.rate_limited: Dict[str, int] = {}
+        self.errors = 0
+
+    def snapshot(self) -> dict:
+        """
+        Get the current values of the counters.
+
+        Returns:
+            dict: The counters, with the rate-limited requests per router prefix.
+        """
+        return {
+            "in_flight": self.in_flight,
+            "shed": self.shed,
+            "rate_limited": dict(self.rate_limited),
+            "errors": self.errors,
+        }
+
+
+# Process-wide admission counters.
+admission_stats = AdmissionStats()
+
+
+def limit_for(path: str, limits: Dict[str, int]) -> Optional[Tuple[str, int]]:
+    """
+    Find the rate limit that applies to a path.
+
+    Args:
+        path (str): The request path.
+        limits (Dict[str, int]): Requests per window, per router prefix.
+
+    Returns:
+        Tuple[str, int]: The matching prefix and its limit, or None if the path is not limited.
+    """
+    for prefix, limit in limits.items():
+        if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+            return prefix, limit
+    return None
+
+
+def subject_of(scope: dict) -> str:
+    """
+    Identify who sends a request, for rate limiting.
+
+    Args:
+        scope (dict): The ASGI scope.
+
+    Returns:
+        str: "sub:<claim>" for a valid bearer token, otherwise "ip:<client address>".
+    """
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            parts = value.decode("latin-1").split()
+            if len(parts) == 2:
+                try:
+                    # Verified tokens are cached, so this rarely decodes.
+                    subject = auth.verify_token(parts[1]).get("sub")
+                except (HTTPException, PyJWTError):
+                    # Rejected later by the route if it requires a token.
+                    subject = None
+                if subject:
+                    return f"sub:{subject}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail}, status_code=status_code, headers={"Retry-After": str(max(1, ceil(retry_after)))}
+    )
+
+
+class AdmissionControl:
+    """
+    ASGI middleware that rejects requests early instead of queueing them.
+
+    A worker handling MAX_IN_FLIGHT requests answers 503 right away, so a
+    burst cannot pile up on the database pool until requests time out.
+    Requests under a prefix of RATE_LIMITS are then counted per subject (the
+    token's `sub`, or the client address without a valid token) in a sliding
+    window of RATE_LIMIT_WINDOW seconds shared by all workers through Redis,
+    and answered 429 over the limit. Both carry Retry-After. If Redis is
+    unavailable, requests are admitted.
+    """
+
+    def __init__(self, app) -> None:
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The ASGI application to protect.
+        """
+        settings = get_settings()
+        self.app = app
+        self.max_in_flight = settings.max_in_flight
+        self.limits = settings.rate_limits
+        self.window_ms = settings.rate_limit_window * 1000
+        self.stats = admission_stats
+
+    async def _check_rate(self, scope: dict, prefix: str, limit: int) -> Optional[float]:
+        # Returns the seconds to wait, or None if admitted.
+        redis_manager = getattr(scope["app"].state, "redis_manager", None)
+        if redis_manager is None:
+            return None
+        client = redis_manager.get_client()
+        now_ms = int(time() * 1000)
+        window = now_ms // self.window_ms
+        key = f"rate:{prefix}:{subject_of(scope)}"
+        try:
+            admitted, wait_ms = await client.register_script(_SLIDING_WINDOW_SCRIPT)(
+                keys=[f"{key}:{window - 1}", f"{key}:{window}"],
+                args=[limit, self.window_ms, now_ms - window * self.window_ms],
+            )
+        except RedisError as e:
+            self.stats.errors += 1
+            logger.error("Rate limit check failed: %s", str(e))
+            return None
+        return None if admitted else int(wait_ms) / 1000
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        if self.max_in_flight and self.stats.in_flight >= self.max_in_flight:
+            self.stats.shed += 1
+            await _reject(503, "Server busy", 1)(scope, receive, send)
+            return
+
+        self.stats.in_flight += 1
+        try:
+            matched = limit_for(scope["path"], self.limits)
+            if matched:
+                wait = await self._check_rate(scope, *matched)
+                if wait is not None:
+                    self.stats.rate_limited[matched[0]] = self.stats.rate_limited.get(matched[0], 0) + 1
+                    await _reject(429, "Rate limit exceeded", wait)(scope, receive, send)
+                    return
+            await self.app(scope, receive, send)
+        finally:
+            self.stats.in_flight -= 1
@@ -0,0 +1,46 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from json import dumps as json_dumps
+from json import loads as json_loads
+from typing import List, Optional
+
+
+def encode_cursor(key: List) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+
+    Args:
+        key (List): The values of the sort key columns (numbers), in order.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    raw = json_dumps(key, separators=(",", ":")).encode()
+    return urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The cursor received from the client, or None for the first page.
+        size (int): The number of values the sort key must have.
+
+    Returns:
+        List: The sort key values, or None if no cursor was given.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        key = json_loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in key):
+        raise ValueError("Invalid cursor")
+    return key
@@ -0,0 +1,75 @@
+from datetime import date
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.models.model import UrlAudit
+from app.api.modules.logger_modify import get_logger
+
+logger = get_logger(__name__)
+
+
+class AuditRepository:
+    """
+    Writes URL audit events to the partitioned `url_audit` table.
+    """
+
+    def __init__(self, db: AsyncSession) -> None:
+        """
+        Initializes a new instance of AuditRepository.
+
+        Args:
+            db (AsyncSession): The database session.
+        """
+        self.db = db
+        self.logger = logger
+
+    async def ensure_partitions(self, months: int = 2) -> None:
+        """
+        Creates the monthly partitions of `url_audit` from the current month on.
+
+        Rows outside every monthly partition land in `url_audit_default`, so a
+        missing partition never loses events. Only Postgres is partitioned.
+
+        Args:
+            months (int): Number of months, starting with the current one.
+        """
+        if self.db.bind.dialect.name != "postgresql":
+            return
+        today = date.today()
+        year, month = today.year, today.month
+        for _ in range(months):
+            next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            await self.db.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS url_audit_{year}_{month:02d} PARTITION OF url_audit "
+                    f"FOR VALUES FROM ('{year}-{month:02d}-01') TO ('{next_year}-{next_month:02d}-01')"
+                )
+            )
+            year, month = next_year, next_month
+        await self.db.commit()
+
+    async def insert_events(self, rows: List[dict]) -> None:
+        """
+        Inserts a batch of events with one multi-row INSERT.
+
+        Events already stored (same stream ID) are skipped, so a batch that
+        is redelivered after a crash is not duplicated.
+
+        Args:
+            rows (List[dict]): Rows holding the UrlAudit columns.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        if not rows:
+            return
+        dialect = postgresql if self.db.bind.dialect.name == "postgresql" else sqlite
+        try:
+            await self.db.execute(dialect.insert(UrlAudit).on_conflict_do_nothing(), rows)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            self.logger.error("Error storing audit events: %s", str(e))
+            raise e
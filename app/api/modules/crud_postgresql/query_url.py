@@ -1,9 +1,41 @@
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import Float, cast, delete, func, insert, literal_column, or_, select, tuple_, update
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.models.model import Urls
-from app.api.modules.logger_modify import ColoredLogger
+from app.api.modules.crud_postgresql.versioning import VersionConflict
+from app.api.modules.logger_modify import get_logger
 
-logger = ColoredLogger().get_logger()
+logger = get_logger(__name__)
+
+# Columns written by the bulk insert paths, in COPY order.
+URL_COLUMNS = ("title", "description", "author", "rating", "user_id")
+
+# Orderings supported by the URL listings, each backed by an index, with the
+# number of values in their pagination key.
+URL_SORTS = {"id": 1, "rating": 2}
+
+# Rating used for ordering; unrated URLs sort after every rated one.
+_rating_key = func.coalesce(Urls.rating, -1)
+
+# Trigger-maintained tsvector over title (A), author (B) and description (C).
+_search_vector = literal_column("urls.search_vector")
+
+
+def url_sort_key(url: Urls, sort: str) -> List[int]:
+    """
+    Get the keyset pagination key of a URL for an ordering.
+
+    Args:
+        url (Urls): The URL row.
+        sort (str): One of URL_SORTS.
+
+    Returns:
+        List[int]: The values a cursor must hold to resume after this row.
+    """
+    if sort == "rating":
+        return [url.rating if url.rating is not None else -1, url.id]
+    return [url.id]
 
 class UrlDataRepository:
     """
@@ -12,21 +44,21 @@ class UrlDataRepository:
     This class encapsulates the operations to manage URL data in the database and Redis.
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         """
         Initializes a new instance of UrlDataRepository.
 
         Args:
-            db (DBContext): The database context to use for database operations.
+            db (AsyncSession): The database session to use for database operations.
             redis (RedisManager): The Redis manager to use for Redis operations.
-            logger (ColoredLogger): The logger instance to use for logging.
+            logger (Logger): The logger instance to use for logging.
         """
         self.logger = logger
         self.db = db
 
-    def create_url(self, title: str, description: str, author: str, rating: int, user_id: int) -> Urls:
+    async def create_url(self, title: str, description: str, author: str, rating: int, user_id: int) -> Urls:
         """
-        Creates a new URL in the database and stores the log in Redis.
+        Creates a new URL in the database.
 
         Args:
             title (str): The title of the URL.
@@ -44,22 +76,137 @@ class UrlDataRepository:
         try:
             url = Urls(title=title, description=description, author=author, rating=rating, user_id=user_id)
             self.db.add(url)
-            self.db.commit()
-            self.db.refresh(url)
+            await self.db.commit()
+            await self.db.refresh(url)
             self.logger.info("URL created: %s", url.title)
 
-            log_message = f"URL created: {url.title}"
-            self.logger.info("URL log stored in Redis: %s", log_message)
-
             return url
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             self.logger.error("Error creating URL: %s", str(e))
             raise e
 
-    def read_url(self, url_id: int) -> Urls:
+    async def create_urls(self, rows: List[dict], copy_threshold: int = 5000) -> List[dict]:
+        """
+        Creates many URLs in a single transaction.
+
+        Batches smaller than `copy_threshold` are written with multi-row
+        INSERT ... RETURNING statements; larger batches on asyncpg are streamed
+        into a temporary table with COPY and moved into `urls` with one
+        INSERT ... SELECT ... RETURNING.
+
+        Args:
+            rows (List[dict]): The URLs to create, each holding the URL_COLUMNS keys.
+            copy_threshold (int): Number of rows from which COPY is used.
+
+        Returns:
+            List[dict]: The created rows, including their IDs, in input order.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        if not rows:
+            return []
+        try:
+            if len(rows) >= copy_threshold and self.db.bind.dialect.driver == "asyncpg":
+                created = await self._copy_urls(rows)
+            else:
+                result = await self.db.execute(
+                    insert(Urls).returning(Urls, sort_by_parameter_order=True),
+                    [{column: row[column] for column in URL_COLUMNS} for row in rows],
+                )
+                created = [url.to_dict() for url in result.scalars().all()]
+            await self.db.commit()
+            self.logger.info("URLs created in bulk: %d", len(created))
+            return created
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            self.logger.error("Error creating URLs in bulk: %s", str(e))
+            raise e
+
+    async def _copy_urls(self, rows: List[dict]) -> List[dict]:
+        """
+        Loads rows through COPY into a staging table and inserts them into `urls`.
+
+        IDs come from the `urls` sequence in staging order, so sorting the
+        returned rows by ID restores the input order.
+
+        Args:
+            rows (List[dict]): The URLs to create.
+
+        Returns:
+            List[dict]: The created rows in input order.
+        """
+        connection = await self.db.connection()
+        # Run through SQLAlchemy first, so the session transaction has begun on
+        # the connection; otherwise asyncpg autocommits every statement below and
+        # ON COMMIT DELETE ROWS empties the staging table right after the COPY.
+        await connection.exec_driver_sql(
+            "CREATE TEMP TABLE IF NOT EXISTS urls_staging "
+            "(ord integer, title varchar(100), description varchar(500), "
+            "author varchar(50), rating integer, user_id integer) ON COMMIT DELETE ROWS"
+        )
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        await driver_connection.copy_records_to_table(
+            "urls_staging",
+            records=[(index,) + tuple(row[column] for column in URL_COLUMNS) for index, row in enumerate(rows)],
+            columns=("ord",) + URL_COLUMNS,
+        )
+        columns = ", ".join(URL_COLUMNS)
+        records = await driver_connection.fetch(
+            f"INSERT INTO urls ({columns}) SELECT {columns} FROM urls_staging ORDER BY ord "
+            f"RETURNING id, {columns}, version"
+        )
+        return sorted((dict(record) for record in records), key=lambda row: row["id"])
+
+    async def import_urls(self, rows: List[dict]) -> List[dict]:
+        """
+        Loads a chunk of an import into `urls` and commits it.
+
+        On asyncpg the IDs are reserved from the `urls` sequence in one query
+        and the rows are copied straight into `urls` with COPY FROM STDIN, with
+        no staging table and no RETURNING. Other drivers use `create_urls`.
+
+        Args:
+            rows (List[dict]): The URLs to load, each holding the URL_COLUMNS keys.
+
+        Returns:
+            List[dict]: The loaded rows, including their IDs, in input order.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        if not rows or self.db.bind.dialect.driver != "asyncpg":
+            return await self.create_urls(rows, copy_threshold=len(rows) + 1)
+        try:
+            # Reserving the IDs through SQLAlchemy begins the session transaction,
+            # so the COPY below is part of it and committed (or rolled back) with it.
+            connection = await self.db.connection()
+            ids = await connection.execute(
+                select(func.nextval(func.pg_get_serial_sequence("urls", "id"))).select_from(
+                    func.generate_series(1, len(rows))
+                )
+            )
+            loaded = [{"id": record[0], **row, "version": 1} for record, row in zip(ids, rows)]
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            await driver_connection.copy_records_to_table(
+                "urls",
+                records=[tuple(row[column] for column in ("id",) + URL_COLUMNS) for row in loaded],
+                columns=("id",) + URL_COLUMNS,
+            )
+            await self.db.commit()
+            self.logger.info("URLs imported: %d", len(loaded))
+            return loaded
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            self.logger.error("Error importing URLs: %s", str(e))
+            raise e
+
+    async def read_url(self, url_id: int) -> Urls:
         """
-        Retrieves a URL from the database by URL ID and stores the log in Redis.
+        Retrieves a URL from the database by URL ID.
 
         Args:
             url_id (int): The ID of the URL to retrieve.
@@ -72,81 +219,252 @@ class UrlDataRepository:
             SQLAlchemyError: If an error occurs during database operations.
         """
         try:
-            url = self.db.query(Urls).filter(Urls.id == url_id).first()
+            result = await self.db.execute(select(Urls).where(Urls.id == url_id))
+            url = result.scalars().first()
             if not url:
                 self.logger.warning("URL not found with ID: %d", url_id)
                 raise ValueError("URL not found")
-            self.logger.info("URL retrieved: %s", url.title)
-
-            log_message = f"URL retrieved: {url.title}"
-            self.logger.info("URL log stored in Redis: %s", log_message)
+            self.logger.debug("URL retrieved: %s", url.title)
 
             return url
         except SQLAlchemyError as e:
             self.logger.error("Error reading URL: %s", str(e))
             raise e
 
-    def update_url(self, url_id: int, new_data: dict) -> bool:
+    async def read_urls(self, url_ids: List[int]) -> List[Urls]:
         """
-        Updates a URL in the database and stores the log in Redis.
+        Retrieves the URLs with the given IDs using a single IN query.
 
         Args:
-            url_id (int): The ID of the URL to update.
-            new_data (dict): Dictionary containing the new data to update.
+            url_ids (List[int]): The IDs of the URLs to retrieve.
 
         Returns:
-            bool: True if the operation was successful, False otherwise.
+            List[Urls]: The URLs found, in no particular order.
 
         Raises:
             SQLAlchemyError: If an error occurs during database operations.
         """
+        if not url_ids:
+            return []
         try:
-            url = self.read_url(url_id)
-            if not url:
-                return False
+            result = await self.db.execute(select(Urls).where(Urls.id.in_(url_ids)))
+            return list(result.scalars().all())
+        except SQLAlchemyError as e:
+            self.logger.error("Error reading URLs: %s", str(e))
+            raise e
 
-            for key, value in new_data.items():
-                setattr(url, key, value)
+    async def list_urls(self, sort: str = "id", after: Optional[List[int]] = None, limit: int = 50) -> List[Urls]:
+        """
+        Lists URLs with keyset pagination.
 
-            self.db.commit()
-            self.logger.info("URL updated: %s", url.title)
+        "id" orders by ascending ID; "rating" orders by (rating DESC, id DESC).
+        Each page is a range scan starting right after `after`, so deep pages
+        cost the same as the first one.
 
-            log_message = f"URL updated: {url.title}"
-            self.logger.info("URL log stored in Redis: %s", log_message)
+        Args:
+            sort (str): One of URL_SORTS.
+            after (List[int]): Sort key of the last row of the previous page, or None.
+            limit (int): Maximum number of rows to return.
 
-            return True
+        Returns:
+            List[Urls]: The rows of the page.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        if sort == "rating":
+            query = select(Urls).order_by(_rating_key.desc(), Urls.id.desc())
+            if after is not None:
+                query = query.where(tuple_(_rating_key, Urls.id) < tuple_(*after))
+        else:
+            query = select(Urls).order_by(Urls.id)
+            if after is not None:
+                query = query.where(Urls.id > after[0])
+        try:
+            result = await self.db.execute(query.limit(limit))
+            return list(result.scalars().all())
         except SQLAlchemyError as e:
-            self.db.rollback()
-            self.logger.error("Error updating URL: %s", str(e))
+            self.logger.error("Error listing URLs: %s", str(e))
             raise e
 
-    def delete_url(self, url_id: int) -> bool:
+    async def list_user_urls(self, user_id: int, after: Optional[List[int]] = None, limit: int = 50) -> List[Urls]:
         """
-        Deletes a URL from the database and stores the log in Redis.
+        Lists the URLs of a user ordered by ID with keyset pagination.
 
         Args:
-            url_id (int): The ID of the URL to delete.
+            user_id (int): The ID of the owner.
+            after (List[int]): Sort key of the last row of the previous page, or None.
+            limit (int): Maximum number of rows to return.
 
         Returns:
-            bool: True if the operation was successful, False otherwise.
+            List[Urls]: The rows of the page.
 
         Raises:
             SQLAlchemyError: If an error occurs during database operations.
         """
+        query = select(Urls).where(Urls.user_id == user_id).order_by(Urls.id)
+        if after is not None:
+            query = query.where(Urls.id > after[0])
         try:
-            url = self.read_url(url_id)
-            if not url:
-                return False
+            result = await self.db.execute(query.limit(limit))
+            return list(result.scalars().all())
+        except SQLAlchemyError as e:
+            self.logger.error("Error listing URLs: %s", str(e))
+            raise e
+
+    async def search_urls(
+        self, query: str, after: Optional[List[float]] = None, limit: int = 20
+    ) -> List[Tuple[Urls, float]]:
+        """
+        Ranks URLs by relevance to a free-text query.
 
-            self.db.delete(url)
-            self.db.commit()
-            self.logger.info("URL deleted: %s", url.title)
+        Rows match when their search vector matches the query (GIN index on
+        `search_vector`) or their title is trigram-similar to it (GIN
+        `gin_trgm_ops` index on `title`). The score adds `ts_rank_cd` to the
+        title similarity, and pages are keyset on (score DESC, id DESC).
 
-            log_message = f"URL deleted: {url.title}"
-            self.logger.info("URL log stored in Redis: %s", log_message)
+        Args:
+            query (str): The search text, in web search syntax.
+            after (List[float]): (score, id) of the last row of the previous page, or None.
+            limit (int): Maximum number of rows to return.
+
+        Returns:
+            List[Tuple[Urls, float]]: The rows of the page with their scores.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        ts_query = func.websearch_to_tsquery("simple", query)
+        score = cast(func.ts_rank_cd(_search_vector, ts_query) + func.similarity(Urls.title, query), Float)
+        statement = (
+            select(Urls, score.label("score"))
+            .where(or_(_search_vector.op("@@")(ts_query), Urls.title.op("%")(query)))
+            .order_by(score.desc(), Urls.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            statement = statement.where(tuple_(score, Urls.id) < tuple_(cast(after[0], Float), int(after[1])))
+        try:
+            result = await self.db.execute(statement)
+            return [(url, url_score) for url, url_score in result.all()]
+        except SQLAlchemyError as e:
+            self.logger.error("Error searching URLs: %s", str(e))
+            raise e
+
+    async def stream_urls(
+        self, user_id: Optional[int] = None, since_id: Optional[int] = None, batch_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        """
+        Streams URL rows in ID order through a server-side cursor.
+
+        Rows are fetched `batch_size` at a time as plain mappings (no ORM
+        objects), so memory use does not grow with the size of the table.
+
+        Args:
+            user_id (int): Only export the URLs of this user, if given.
+            since_id (int): Only export URLs with an ID greater than this, if given.
+            batch_size (int): Rows fetched from the cursor per round trip.
+
+        Yields:
+            dict: One URL row at a time.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        query = select(*(Urls.__table__.c[column] for column in ("id",) + URL_COLUMNS)).order_by(Urls.id)
+        if user_id is not None:
+            query = query.where(Urls.user_id == user_id)
+        if since_id is not None:
+            query = query.where(Urls.id > since_id)
+        try:
+            result = await self.db.stream(query.execution_options(yield_per=batch_size))
+            async for row in result.mappings():
+                yield dict(row)
+        except SQLAlchemyError as e:
+            self.logger.error("Error exporting URLs: %s", str(e))
+            raise e
 
+    async def _current_version(self, url_id: int) -> Optional[int]:
+        result = await self.db.execute(select(Urls.version).where(Urls.id == url_id))
+        return result.scalar()
+
+    async def update_url(self, url_id: int, new_data: dict, expected_version: Optional[int] = None) -> Optional[dict]:
+        """
+        Updates a URL with a single UPDATE ... RETURNING and bumps its version.
+
+        With `expected_version`, the row is only updated if it is still at
+        that version, so a client cannot overwrite a change it has not seen.
+
+        Args:
+            url_id (int): The ID of the URL to update.
+            new_data (dict): Dictionary containing the new data to update.
+            expected_version (int): Version the row must have, or None to update unconditionally.
+
+        Returns:
+            dict: The updated row, or None if the URL does not exist.
+
+        Raises:
+            VersionConflict: If the row is at another version than `expected_version`.
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        statement = update(Urls).where(Urls.id == url_id)
+        if expected_version is not None:
+            statement = statement.where(Urls.version == expected_version)
+        statement = (
+            statement.values(**{column: value for column, value in new_data.items() if column not in ("id", "version")})
+            .values(version=Urls.version + 1)
+            .returning(*Urls.__table__.columns)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            row = (await self.db.execute(statement)).mappings().first()
+            if row is None:
+                await self.db.rollback()
+                if expected_version is not None:
+                    current = await self._current_version(url_id)
+                    if current is not None:
+                        raise VersionConflict(current)
+                return None
+            await self.db.commit()
+            self.logger.info("URL updated: %d (version %d)", url_id, row["version"])
+            return dict(row)
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            self.logger.error("Error updating URL: %s", str(e))
+            raise e
+
+    async def delete_url(self, url_id: int, expected_version: Optional[int] = None) -> bool:
+        """
+        Deletes a URL with a single DELETE ... RETURNING.
+
+        Args:
+            url_id (int): The ID of the URL to delete.
+            expected_version (int): Version the row must have, or None to delete unconditionally.
+
+        Returns:
+            bool: True if the URL was deleted, False if it does not exist.
+
+        Raises:
+            VersionConflict: If the row is at another version than `expected_version`.
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        statement = delete(Urls).where(Urls.id == url_id)
+        if expected_version is not None:
+            statement = statement.where(Urls.version == expected_version)
+        statement = statement.returning(Urls.id).execution_options(synchronize_session=False)
+        try:
+            deleted = (await self.db.execute(statement)).scalar()
+            if deleted is None:
+                await self.db.rollback()
+                if expected_version is not None:
+                    current = await self._current_version(url_id)
+                    if current is not None:
+                        raise VersionConflict(current)
+                return False
+            await self.db.commit()
+            self.logger.info("URL deleted: %d", url_id)
             return True
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             self.logger.error("Error deleting URL: %s", str(e))
             raise e
\ No newline at end of file
@@ -1,9 +1,12 @@
-from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional, Set
+from sqlalchemy import delete, select, update
 from sqlalchemy.exc import SQLAlchemyError
-from app.api.models.model import User
-from app.api.modules.logger_modify import ColoredLogger
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.models.model import Urls, User
+from app.api.modules.crud_postgresql.versioning import VersionConflict
+from app.api.modules.logger_modify import get_logger
 
-logger = ColoredLogger().get_logger()
+logger = get_logger(__name__)
 
 class UserRepository:
     """
@@ -12,18 +15,18 @@ class UserRepository:
     This class encapsulates the operations to manage User data in the database.
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         """
         Initializes a new instance of UserRepository.
 
         Args:
-            db (DBContext): The database context to use for database operations.
-            logger (ColoredLogger): The logger instance to use for logging.
+            db (AsyncSession): The database session to use for database operations.
+            logger (Logger): The logger instance to use for logging.
         """
         self.logger = logger
         self.db = db
 
-    def create_user(self, username: str, password: str, role: str) -> User:
+    async def create_user(self, username: str, password: str, role: str) -> User:
         """
         Creates a new User in the database.
 
@@ -41,16 +44,40 @@ class UserRepository:
         try:
             user = User(username=username, password=password, role=role)
             self.db.add(user)
-            self.db.commit()
-            self.db.refresh(user)
+            await self.db.commit()
+            await self.db.refresh(user)
             self.logger.info("User created: %s", user.username)
             return user
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             self.logger.error("Error creating user: %s", str(e))
             raise e
 
-    def read_user(self, user_id: int) -> User:
+    async def update_password(self, user: User, password_hash: str) -> int:
+        """
+        Replaces the stored password hash of a User, which bumps its version.
+
+        Args:
+            user (User): The User, as loaded by this session.
+            password_hash (str): The new hash.
+
+        Returns:
+            int: The new version of the User.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        try:
+            user.password = password_hash
+            await self.db.commit()
+            self.logger.info("Password rehashed: %s", user.username)
+            return user.version
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            self.logger.error("Error updating password: %s", str(e))
+            raise e
+
+    async def read_user(self, user_id: int) -> User:
         """
         Retrieves a User from the database by User ID.
 
@@ -65,69 +92,149 @@ class UserRepository:
             SQLAlchemyError: If an error occurs during database operations.
         """
         try:
-            user = self.db.query(User).filter(User.id == user_id).first()
+            result = await self.db.execute(select(User).where(User.id == user_id))
+            user = result.scalars().first()
             if not user:
                 self.logger.warning("User not found with ID: %d", user_id)
                 raise ValueError("User not found")
-            self.logger.info("User retrieved: %s", user.username)
+            self.logger.debug("User retrieved: %s", user.username)
             return user
         except SQLAlchemyError as e:
             self.logger.error("Error reading user: %s", str(e))
             raise e
 
-    def update_user(self, user_id: int, new_data: dict) -> bool:
+    async def existing_user_ids(self, user_ids: Iterable[int]) -> Set[int]:
         """
-        Updates a User in the database.
+        Finds which of the given User IDs exist, with a single query.
 
         Args:
-            user_id (int): The ID of the User to update.
-            new_data (dict): Dictionary containing the new data to update.
+            user_ids (Iterable[int]): The IDs to look up.
 
         Returns:
-            bool: True if the operation was successful, False otherwise.
+            Set[int]: The subset of IDs present in the database.
 
         Raises:
             SQLAlchemyError: If an error occurs during database operations.
         """
+        ids = set(user_ids)
+        if not ids:
+            return set()
         try:
-            user = self.read_user(user_id)
-            if not user:
-                return False
+            result = await self.db.execute(select(User.id).where(User.id.in_(ids)))
+            return set(result.scalars().all())
+        except SQLAlchemyError as e:
+            self.logger.error("Error reading users: %s", str(e))
+            raise e
 
-            for key, value in new_data.items():
-                setattr(user, key, value)
+    async def read_user_by_username(self, username: str) -> User:
+        """
+        Retrieves a User from the database by username.
+
+        Args:
+            username (str): The username of the User to retrieve.
 
-            self.db.commit()
-            self.logger.info("User updated: %s", user.username)
-            return True
+        Returns:
+            User: The retrieved User object, or None if not found.
+
+        Raises:
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        try:
+            result = await self.db.execute(select(User).where(User.username == username))
+            return result.scalars().first()
         except SQLAlchemyError as e:
-            self.db.rollback()
+            self.logger.error("Error reading user: %s", str(e))
+            raise e
+
+    async def _current_version(self, user_id: int) -> Optional[int]:
+        result = await self.db.execute(select(User.version).where(User.id == user_id))
+        return result.scalar()
+
+    async def update_user(self, user_id: int, new_data: dict, expected_version: Optional[int] = None) -> Optional[int]:
+        """
+        Updates a User with a single UPDATE ... RETURNING and bumps its version.
+
+        Args:
+            user_id (int): The ID of the User to update.
+            new_data (dict): Dictionary containing the new data to update.
+            expected_version (int): Version the row must have, or None to update unconditionally.
+
+        Returns:
+            int: The new version, or None if the User does not exist.
+
+        Raises:
+            VersionConflict: If the row is at another version than `expected_version`.
+            SQLAlchemyError: If an error occurs during database operations.
+        """
+        statement = update(User).where(User.id == user_id)
+        if expected_version is not None:
+            statement = statement.where(User.version == expected_version)
+        statement = (
+            statement.values(**{column: value for column, value in new_data.items() if column not in ("id", "version")})
+            .values(version=User.version + 1)
+            .returning(User.version)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            version = (await self.db.execute(statement)).scalar()
+            if version is None:
+                await self.db.rollback()
+                if expected_version is not None:
+                    current = await self._current_version(user_id)
+                    if current is not None:
+                        raise VersionConflict(current)
+                return None
+            await self.db.commit()
+            self.logger.info("User updated: %d (version %d)", user_id, version)
+            return version
+        except SQLAlchemyError as e:
+            await self.db.rollback()
             self.logger.error("Error updating user: %s", str(e))
             raise e
 
-    def delete_user(self, user_id: int) -> bool:
+    async def delete_user(self, user_id: int, expected_version: Optional[int] = None) -> Optional[List[int]]:
         """
-        Deletes a User from the database.
+        Deletes a User with a single DELETE ... RETURNING.
+
+        The User's URLs are kept without an owner, in the same transaction.
 
         Args:
             user_id (int): The ID of the User to delete.
+            expected_version (int): Version the row must have, or None to delete unconditionally.
 
         Returns:
-            bool: True if the operation was successful, False otherwise.
+            List[int]: The IDs of the URLs left without an owner, or None if
+                the User does not exist.
 
         Raises:
+            VersionConflict: If the row is at another version than `expected_version`.
             SQLAlchemyError: If an error occurs during database operations.
         """
+        statement = delete(User).where(User.id == user_id)
+        if expected_version is not None:
+            statement = statement.where(User.version == expected_version)
+        statement = statement.returning(User.id).execution_options(synchronize_session=False)
         try:
-            user = self.read_user(user_id)
-            if not user:
-                return False
-
-            self.db.delete(user)
-            self.db.commit()
-            self.logger.info("User deleted: %s", user.username)
-            return True
+            orphaned = await self.db.execute(
+                update(Urls)
+                .where(Urls.user_id == user_id)
+                .values(user_id=None, version=Urls.version + 1)
+                .returning(Urls.id)
+                .execution_options(synchronize_session=False)
+            )
+            url_ids = list(orphaned.scalars())
+            deleted = (await self.db.execute(statement)).scalar()
+            if deleted is None:
+                await self.db.rollback()
+                if expected_version is not None:
+                    current = await self._current_version(user_id)
+                    if current is not None:
+                        raise VersionConflict(current)
+                return None
+            await self.db.commit()
+            self.logger.info("User deleted: %d", user_id)
+            return url_ids
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             self.logger.error("Error deleting user: %s", str(e))
             raise e
@@ -0,0 +1,84 @@
+from typing import Optional, Sequence
+
+
+class VersionConflict(Exception):
+    """
+    Raised when a conditional write finds the row at another version.
+
+    Attributes:
+        current_version (int): The version the row has now.
+    """
+
+    def __init__(self, current_version: int) -> None:
+        """
+        Initializes the exception.
+
+        Args:
+            current_version (int): The version the row has now.
+        """
+        super().__init__(f"Version mismatch: the current version is {current_version}")
+        self.current_version = current_version
+
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    """
+    Read the expected row version from an If-Match header.
+
+    Accepts `3`, `"3"`, the weak form `W/"3"` and the ETags built by
+    `make_etag`. A missing header or `*` means the write is unconditional.
+
+    Args:
+        value (str): The header value, or None.
+
+    Returns:
+        int: The expected version, or None for an unconditional write.
+
+    Raises:
+        ValueError: If the header does not hold a version.
+    """
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"').split(";", 1)[0]
+    if not tag.isdigit():
+        raise ValueError("If-Match must hold the version of the resource")
+    return int(tag)
+
+
+def make_etag(version: Optional[int], fields: Optional[Sequence[str]] = None) -> Optional[str]:
+    """
+    Build the strong ETag of a representation of a row.
+
+    Args:
+        version (int): The row version, or None if unknown.
+        fields (Sequence[str]): The columns of a partial representation; None for all of them.
+
+    Returns:
+        str: The quoted ETag, or None without a version.
+    """
+    if version is None:
+        return None
+    if fields is None:
+        return f'"{version}"'
+    return f'"{version};{",".join(fields)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Check an If-None-Match header against the current ETag.
+
+    Uses the weak comparison that RFC 9110 prescribes for If-None-Match.
+
+    Args:
+        if_none_match (str): The header value, or None.
+        etag (str): The current ETag, or None.
+
+    Returns:
+        bool: True if the client's copy is current and 304 can be answered.
+    """
+    if not if_none_match or etag is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
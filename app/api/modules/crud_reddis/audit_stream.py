@@ -0,0 +1,73 @@
+from json import dumps as json_dumps
+from typing import Iterable, List, Optional
+from redis.exceptions import RedisError
+from app.api.modules.logger_modify import get_logger
+from app.api.modules.redis_conf.redis_conf import RedisManager
+from app.api.settings import get_settings
+
+logger = get_logger(__name__)
+
+
+class AuditStream:
+    """
+    Appends URL mutation events to a Redis Stream.
+
+    Every event is a flat entry with `action`, `url_id`, `actor` and, for
+    creates and updates, the written fields as JSON in `data`. All events of
+    one request go out in a single pipelined round trip, and the stream is
+    trimmed to about `maxlen` entries. Events are persisted to Postgres by
+    `app.api.tools.audit_worker`.
+
+    Publishing is best effort: a Redis failure is logged and never fails the
+    request whose changes are already committed.
+    """
+
+    def __init__(self, redis: RedisManager, actor: Optional[str] = None) -> None:
+        """
+        Initializes a new instance of AuditStream.
+
+        Args:
+            redis (RedisManager): The shared Redis manager.
+            actor (str): `sub` of the authenticated caller, if any.
+        """
+        settings = get_settings()
+        self.redis_manager = redis
+        self.actor = actor
+        self.stream = settings.audit_stream
+        self.maxlen = settings.audit_stream_maxlen
+        self.enabled = settings.audit_enabled
+
+    def event(self, action: str, url_id: int, data: Optional[dict] = None) -> dict:
+        """
+        Build a stream entry.
+
+        Args:
+            action (str): "create", "update" or "delete".
+            url_id (int): The ID of the URL.
+            data (dict): The written fields, if any.
+
+        Returns:
+            dict: The entry fields.
+        """
+        entry = {"action": action, "url_id": url_id, "actor": self.actor or ""}
+        if data:
+            entry["data"] = json_dumps({key: value for key, value in data.items() if key != "id"})
+        return entry
+
+    async def publish(self, events: Iterable[dict]) -> None:
+        """
+        Append events to the stream in one pipelined round trip.
+
+        Args:
+            events (Iterable[dict]): Entries built by `event`.
+        """
+        events: List[dict] = list(events)
+        if not self.enabled or not events:
+            return
+        try:
+            pipeline = self.redis_manager.get_client().pipeline(transaction=False)
+            for entry in events:
+                pipeline.xadd(self.stream, entry, maxlen=self.maxlen, approximate=True)
+            await pipeline.execute()
+        except RedisError as e:
+            logger.error("Error publishing %d audit events: %s", len(events), str(e))
@@ -0,0 +1,164 @@
+from functools import partial
+from json import dumps as json_dumps
+from json import loads as json_loads
+from typing import Callable, Dict, Tuple
+from app.api.settings import get_settings
+
+# First byte of every value written in a versioned format. JSON text never
+# starts with it, so values without it are read as legacy JSON.
+MAGIC = b"\x00"
+
+# Format byte that follows MAGIC, per (serializer, compression). IDs are
+# never reused: a worker that meets an ID it does not know (written by a
+# newer release) reports the value as undecodable and the entry is rebuilt.
+FORMATS: Dict[Tuple[str, str], int] = {
+    ("orjson", ""): 1,
+    ("orjson", "zstd"): 2,
+    ("orjson", "lz4"): 3,
+    ("msgpack", ""): 4,
+    ("msgpack", "zstd"): 5,
+    ("msgpack", "lz4"): 6,
+    ("json", "zstd"): 7,
+    ("json", "lz4"): 8,
+}
+_FORMAT_NAMES = {format_id: names for names, format_id in FORMATS.items()}
+
+
+def _load_serializer(name: str) -> Tuple[Callable, Callable]:
+    if name == "json":
+        return (lambda value: json_dumps(value).encode()), json_loads
+    if name == "orjson":
+        import orjson
+
+        return orjson.dumps, orjson.loads
+    if name == "msgpack":
+        import msgpack
+
+        return partial(msgpack.packb, use_bin_type=True), partial(msgpack.unpackb, raw=False)
+    raise ValueError(f"Unknown cache codec: {name}")
+
+
+def _load_compressor(name: str) -> Tuple[Callable, Callable]:
+    if name == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+    if name == "lz4":
+        import lz4.frame
+
+        return lz4.frame.compress, lz4.frame.decompress
+    raise ValueError(f"Unknown cache compression: {name}")
+
+
+class ValueCodec:
+    """
+    Serializes the values stored in the URL cache.
+
+    A value is written as MAGIC, a format byte naming the serializer and the
+    compression (see FORMATS), and the payload. Values longer than
+    `compression_threshold` bytes are compressed when it makes them smaller.
+    The "json" codec without compression writes plain JSON, the format used
+    before codecs existed, so it is the safe setting while older workers are
+    still running; every worker reads every format whose libraries it has.
+
+    Attributes:
+        name (str): "json", "orjson" or "msgpack".
+        compression (str): "zstd", "lz4" or "" for none.
+        compression_threshold (int): Smallest payload, in bytes, that is compressed.
+    """
+
+    def __init__(self, name: str = "json", compression: str = "", compression_threshold: int = 1024) -> None:
+        """
+        Initializes a codec, importing the libraries it writes with.
+
+        Args:
+            name (str): "json", "orjson" or "msgpack".
+            compression (str): "zstd", "lz4" or "" for none.
+            compression_threshold (int): Smallest payload, in bytes, that is compressed.
+
+        Raises:
+            ValueError: If the codec or compression is unknown.
+            ImportError: If the library of the codec or compression is not installed.
+        """
+        self.name = name
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self._serializers: Dict[str, Tuple[Callable, Callable]] = {}
+        self._compressors: Dict[str, Tuple[Callable, Callable]] = {}
+        self._dumps = self._serializer(name)[0]
+        self._compress = self._compressor(compression)[0] if compression else None
+        self._plain_format = FORMATS.get((name, ""))
+        self._compressed_format = FORMATS[(name, compression)] if compression else None
+        # Legacy values are JSON; orjson parses them faster than the stdlib.
+        self._legacy_loads = self._serializer("orjson" if name == "orjson" else "json")[1]
+
+    def _serializer(self, name: str) -> Tuple[Callable, Callable]:
+        if name not in self._serializers:
+            self._serializers[name] = _load_serializer(name)
+        return self._serializers[name]
+
+    def _compressor(self, name: str) -> Tuple[Callable, Callable]:
+        if name not in self._compressors:
+            self._compressors[name] = _load_compressor(name)
+        return self._compressors[name]
+
+    def encode(self, value) -> bytes:
+        """
+        Serialize a value for Redis.
+
+        Args:
+            value: A JSON-compatible value.
+
+        Returns:
+            bytes: The stored representation.
+        """
+        payload = self._dumps(value)
+        if self._compress is not None and len(payload) >= self.compression_threshold:
+            compressed = self._compress(payload)
+            if len(compressed) < len(payload):
+                return MAGIC + bytes((self._compressed_format,)) + compressed
+        if self._plain_format is None:
+            return payload
+        return MAGIC + bytes((self._plain_format,)) + payload
+
+    def decode(self, raw):
+        """
+        Deserialize a value read from Redis, in any known format.
+
+        Args:
+            raw (bytes): The stored representation.
+
+        Returns:
+            The value.
+
+        Raises:
+            ValueError: If the format is unknown or its library is missing, or the value is corrupt.
+        """
+        if isinstance(raw, str):
+            raw = raw.encode()
+        if not raw.startswith(MAGIC):
+            return self._legacy_loads(raw)
+        names = _FORMAT_NAMES.get(raw[1]) if len(raw) > 1 else None
+        if names is None:
+            raise ValueError("Unknown cache value format")
+        serializer, compression = names
+        try:
+            payload = raw[2:]
+            if compression:
+                payload = self._compressor(compression)[1](payload)
+            return self._serializer(serializer)[1](payload)
+        except ImportError as e:
+            raise ValueError(f"Cannot read cache value format {raw[1]}: {e}") from e
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Corrupt cache value: {e}") from e
+
+
+settings = get_settings()
+# Process-wide codec of the url_data:* values.
+url_value_codec = ValueCodec(
+    settings.url_cache_codec,
+    settings.url_cache_compression,
+    settings.url_cache_compression_threshold,
+)
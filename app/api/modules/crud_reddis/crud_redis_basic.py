@@ -1,87 +1,499 @@
-from app.api.modules.logger_modify import ColoredLogger
+from asyncio import sleep
+from math import log
+from random import random, uniform
+from time import monotonic, time
+from uuid import uuid4
+from app.api.modules.crud_reddis.codec import ValueCodec, url_value_codec
+from app.api.modules.logger_modify import get_logger
+from app.api.modules.metrics.metrics import cache_collector, metrics, timed_redis
 from app.api.modules.redis_conf.redis_conf import RedisManager
+from app.api.settings import get_settings
 from redis import RedisError
-from json import dumps as json_dumps
-from json import loads as json_loads
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
-logger = ColoredLogger().get_logger()
+logger = get_logger(__name__)
+
+# Marker returned by CrudRedis.get_url_from_redis for IDs known to be missing.
+URL_NOT_FOUND = object()
+
+# Hash fields that are not URL columns: the entry version, the "not found"
+# flag, the logical expiry (epoch ms) and how long the last rebuild took (ms).
+VERSION_FIELD = "_v"
+MISSING_FIELD = "_missing"
+EXPIRES_FIELD = "_exp"
+DELTA_FIELD = "_delta"
+META_FIELDS = (MISSING_FIELD, EXPIRES_FIELD, DELTA_FIELD)
+
+# Milliseconds between checks while waiting for another worker's rebuild.
+LOCK_POLL_MS = 20
+
+# Applies a partial update to a cached URL hash in one round trip. Nothing is
+# written when the URL is not cached (or cached as missing), so a partial
+# entry is never created. With a version (ARGV[1]), the write only applies if
+# it is newer than the cached one; without, the cached version is bumped.
+# Returns the new version, -1 if not cached, -2 if the cached entry is newer.
+_UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 or redis.call('HEXISTS', KEYS[1], ARGV[2]) == 1 then
+    return -1
+end
+local cached = tonumber(redis.call('HGET', KEYS[1], ARGV[3]) or '0')
+local version = tonumber(ARGV[1])
+if version and version <= cached then
+    return -2
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+if version then
+    redis.call('HSET', KEYS[1], ARGV[3], version)
+    return version
+end
+return redis.call('HINCRBY', KEYS[1], ARGV[3], 1)
+"""
+
+# Replaces a cached URL (KEYS[1]), which may be a "not found" marker, unless
+# the cached version is newer than the one being stored (ARGV[1]), so a slow
+# rebuild cannot overwrite an entry written by a later update. ARGV[2] is the
+# physical TTL in ms and ARGV[3..] the field/value pairs.
+# Returns 1 if the entry was written, 0 if the cached one is newer.
+_STORE_SCRIPT = """
+local cached = tonumber(redis.call('HGET', KEYS[1], '_v') or '0')
+if cached > tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+# Deletes a rebuild lock (KEYS[1]) only if it still holds this worker's token
+# (ARGV[1]): once it has expired and been taken by another worker, that
+# worker's lock is left alone.
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Stores a user's version (KEYS[1]) unless a newer one is already stored, so
+# a slow read cannot roll back the version written by an update.
+_USER_VERSION_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tonumber(ARGV[1]) > current then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+return 1
+"""
+
+
+def _encode_fields(codec: ValueCodec, url_data: dict) -> Dict[str, bytes]:
+    return {field: codec.encode(value) for field, value in url_data.items()}
+
+
+def _decode_fields(codec: ValueCodec, fields: Dict) -> dict:
+    data = {}
+    for field, value in fields.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        if not field.startswith("_"):
+            data[field] = codec.decode(value)
+    return data
+
+
+def _parse_entry(codec: ValueCodec, values, fields: Optional[Sequence[str]]) -> Tuple[object, int, int]:
+    """
+    Split a cached entry into its data and its refresh metadata.
+
+    An entry with a value this worker cannot decode (e.g. a format written
+    by a newer release) is reported as not cached, so it is rebuilt.
+
+    Args:
+        codec (ValueCodec): Decoder of the column values.
+        values: An HGETALL mapping, or the HMGET values of `fields` + META_FIELDS.
+        fields (Sequence[str]): The columns read with HMGET, or None for HGETALL.
+
+    Returns:
+        Tuple[object, int, int]: The data (or URL_NOT_FOUND, or None if not
+            cached), the logical expiry in epoch ms and the rebuild time in ms.
+    """
+    try:
+        return _split_entry(codec, values, fields)
+    except ValueError as e:
+        logger.warning("Undecodable URL cache entry: %s", str(e))
+        return None, 0, 0
+
+
+def _split_entry(codec: ValueCodec, values, fields: Optional[Sequence[str]]) -> Tuple[object, int, int]:
+    if fields is None:
+        if not values:
+            return None, 0, 0
+        entry = {(field.decode() if isinstance(field, bytes) else field): value for field, value in values.items()}
+        if MISSING_FIELD in entry:
+            return URL_NOT_FOUND, 0, 0
+        return _decode_fields(codec, entry), int(entry.get(EXPIRES_FIELD) or 0), int(entry.get(DELTA_FIELD) or 0)
+    missing, expires, delta = values[-len(META_FIELDS):]
+    if missing is not None:
+        return URL_NOT_FOUND, 0, 0
+    columns = values[:-len(META_FIELDS)]
+    if all(value is None for value in columns):
+        return None, 0, 0
+    data = _decode_fields(codec, {field: value for field, value in zip(fields, columns) if value is not None})
+    return data, int(expires or 0), int(delta or 0)
+
+
+class CacheStats:
+    """
+    Counters describing how the URL cache is performing.
+
+    Attributes:
+        hits (int): Lookups answered with a cached URL.
+        negative_hits (int): Lookups answered with a cached "not found" marker.
+        misses (int): Lookups that had to fall back to the database.
+        errors (int): Lookups that failed because Redis was unavailable.
+        stale_hits (int): Hits served past their expiry while another worker rebuilt the entry.
+        refreshes (int): Entries rebuilt before or at expiry by the worker holding the lock.
+        lock_timeouts (int): Misses that waited for another worker's rebuild in vain.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes all counters to zero.
+        """
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.lock_timeouts = 0
+
+    def snapshot(self) -> dict:
+        """
+        Get the current values of the counters.
+
+        Returns:
+            dict: The counters plus the hit ratio over all lookups.
+        """
+        lookups = self.hits + self.negative_hits + self.misses
+        hit_ratio = (self.hits + self.negative_hits) / lookups if lookups else 0.0
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "lock_timeouts": self.lock_timeouts,
+            "hit_ratio": round(hit_ratio, 4),
+        }
+
+
+# Process-wide statistics for the url_data:* keys.
+url_cache_stats = CacheStats()
+metrics.register_collector(cache_collector(url_cache_stats, "url_redis"))
 
 
 class CrudRedis:
     """
     Provides methods for CRUD operations using Redis as a data store.
 
-    This class encapsulates the operations to store, retrieve, update, and delete data in Redis.
+    Every URL is cached as a hash at `url_data:{id}` with one field per column
+    (serialized by `url_value_codec`, so types survive), plus a `_v` version field. A URL known
+    not to exist is a hash holding only `_missing`, which expires after
+    `negative_ttl` seconds. Updates write only the changed fields.
+
+    Entries expire logically after URL_CACHE_TTL seconds (with jitter, so keys
+    written together do not expire together) but stay in Redis for another
+    URL_CACHE_STALE_TTL seconds. A read may refresh an entry early, with a
+    probability that grows as expiry approaches and with the time the last
+    rebuild took (XFetch). Rebuilds are single-flight: the reader that takes
+    the `lock:url_data:{id}` lock (SET NX PX) goes to the database, while the
+    others get the stale entry or, on a cold miss, wait briefly for it. A
+    rebuild never replaces an entry with a newer `_v`, and only releases the
+    lock if it still holds it.
+
+    Users are not cached; only their version is kept at `user_version:{id}`
+    so that conditional GETs can be answered without the database.
     """
 
     def __init__(
         self,
-        redis: RedisManager
+        redis: RedisManager,
+        negative_ttl: Optional[int] = None,
     ) -> None:
         """
         Initializes a new instance of CrudRedis.
 
         Args:
             redis (RedisManager): The Redis manager to use for Redis operations.
+            negative_ttl (int): Seconds a "not found" marker is kept for a missing URL;
+                defaults to URL_CACHE_NEGATIVE_TTL.
         """
+        settings = get_settings()
         self.logger = logger
         self.redis_manager = redis
+        self.negative_ttl = settings.url_cache_negative_ttl if negative_ttl is None else negative_ttl
+        self.ttl = settings.url_cache_ttl
+        self.ttl_jitter = settings.url_cache_ttl_jitter
+        self.stale_ttl = settings.url_cache_stale_ttl
+        self.xfetch_beta = settings.url_cache_xfetch_beta
+        self.lock_ms = settings.url_cache_lock_ms
+        self.lock_wait_ms = settings.url_cache_lock_wait_ms
+        self.stats = url_cache_stats
+        self.codec = url_value_codec
+        self._locks: Dict[int, str] = {}
 
-    def store_url_in_redis(self, url_id: int, url_data: dict):
+    async def _queue_store(self, pipeline, url_data: dict, delta_ms: int = 0) -> None:
+        # Replace the whole entry, unless a newer version is already cached.
+        ttl_ms = int(self.ttl * 1000 * uniform(1 - self.ttl_jitter, 1 + self.ttl_jitter))
+        entry = {
+            **_encode_fields(self.codec, url_data),
+            VERSION_FIELD: url_data.get("version") or 0,
+            EXPIRES_FIELD: int(time() * 1000) + ttl_ms,
+            DELTA_FIELD: delta_ms,
+        }
+        fields = [item for pair in entry.items() for item in pair]
+        await pipeline.register_script(_STORE_SCRIPT)(
+            keys=[f"url_data:{url_data['id']}"],
+            args=[entry[VERSION_FIELD], ttl_ms + self.stale_ttl * 1000, *fields],
+        )
+        await self._queue_release(pipeline, url_data["id"])
+
+    async def _queue_missing(self, pipeline, url_id: int) -> None:
+        key = f"url_data:{url_id}"
+        pipeline.delete(key)
+        pipeline.hset(key, MISSING_FIELD, 1)
+        pipeline.expire(key, self.negative_ttl)
+        await self._queue_release(pipeline, url_id)
+
+    async def _queue_release(self, pipeline, url_id: int) -> None:
+        # The rebuild is written, so let the next refresh take the lock.
+        token = self._locks.pop(url_id, None)
+        if token is not None:
+            await pipeline.register_script(_RELEASE_SCRIPT)(keys=[f"lock:url_data:{url_id}"], args=[token])
+
+    async def _acquire(self, client, url_id: int) -> bool:
+        token = uuid4().hex
+        acquired = await client.set(f"lock:url_data:{url_id}", token, nx=True, px=self.lock_ms)
+        if acquired:
+            self._locks[url_id] = token
+        return bool(acquired)
+
+    def _should_refresh(self, expires_at: int, delta_ms: int) -> bool:
+        # XFetch: now - delta * beta * ln(rand) >= expiry, with rand in (0, 1].
+        return time() * 1000 - delta_ms * self.xfetch_beta * log(1.0 - random()) >= expires_at
+
+    @timed_redis("store_url")
+    async def store_url_in_redis(self, url_id: int, url_data: dict, delta_ms: int = 0):
         """
         Store URL data in Redis.
 
         Args:
             url_id (int): The ID of the URL.
-            url_data (dict): The data to store in Redis.
+            url_data (dict): The full row to store.
+            delta_ms (int): Milliseconds it took to load the row, used for early refresh.
 
         Raises:
             RedisError: If an error occurs while storing URL data in Redis.
         """
         try:
-            key = f"url_data:{url_id}"
-            value = json_dumps(url_data)
-            self.redis_manager.get_client().set(key, value)
+            pipeline = self.redis_manager.get_client().pipeline(transaction=True)
+            await self._queue_store(pipeline, {**url_data, "id": url_id}, delta_ms)
+            await pipeline.execute()
+        except RedisError as e:
+            self.logger.error("Error storing URL data in Redis: %s", str(e))
+            raise e
+
+    @timed_redis("store_urls")
+    async def store_urls_in_redis(self, urls: List[dict], missing_ids: Iterable[int] = (), delta_ms: int = 0):
+        """
+        Store many URLs in Redis with a single pipelined round trip.
+
+        Args:
+            urls (List[dict]): The URL rows to store, each holding its `id`.
+            missing_ids (Iterable[int]): IDs to cache as missing in the same round trip.
+            delta_ms (int): Milliseconds it took to load the rows, used for early refresh.
+
+        Raises:
+            RedisError: If an error occurs while storing URL data in Redis.
+        """
+        missing_ids = list(missing_ids)
+        if not urls and not missing_ids:
+            return
+        try:
+            pipeline = self.redis_manager.get_client().pipeline(transaction=False)
+            for url_data in urls:
+                await self._queue_store(pipeline, url_data, delta_ms)
+            for url_id in missing_ids:
+                await self._queue_missing(pipeline, url_id)
+            await pipeline.execute()
         except RedisError as e:
             self.logger.error("Error storing URL data in Redis: %s", str(e))
             raise e
 
-    def get_url_from_redis(self, url_id: int) -> dict:
+    @timed_redis("store_missing_url")
+    async def store_missing_url_in_redis(self, url_id: int):
+        """
+        Remember in Redis that a URL does not exist.
+
+        The marker expires after `negative_ttl` seconds so that a URL created
+        through another path becomes visible without explicit invalidation.
+
+        Args:
+            url_id (int): The ID of the URL.
+        """
+        try:
+            pipeline = self.redis_manager.get_client().pipeline(transaction=True)
+            await self._queue_missing(pipeline, url_id)
+            await pipeline.execute()
+        except RedisError as e:
+            self.logger.error("Error storing missing URL marker in Redis: %s", str(e))
+
+    def _queue_read(self, client, url_id: int, fields: Optional[Sequence[str]]):
+        key = f"url_data:{url_id}"
+        if fields is None:
+            return client.hgetall(key)
+        return client.hmget(key, [*fields, *META_FIELDS])
+
+    def _count(self, data) -> None:
+        if data is URL_NOT_FOUND:
+            self.stats.negative_hits += 1
+        elif data is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+
+    @timed_redis("get_url")
+    async def get_url_from_redis(self, url_id: int, fields: Optional[Sequence[str]] = None):
         """
         Retrieve URL data from Redis.
 
+        Returns None, so that the caller rebuilds the entry from the database,
+        on a miss or when the entry is due for refresh and this caller took the
+        rebuild lock. Callers given None must store the result (or the missing
+        marker), which releases the lock. A Redis failure is logged and
+        reported as a miss so callers can fall back to the database.
+
         Args:
             url_id (int): The ID of the URL.
+            fields (Sequence[str]): Columns to read with HMGET; all of them (HGETALL) if None.
 
         Returns:
-            dict: The retrieved URL data, or None if not found.
+            dict: The retrieved URL data, None if it must be loaded from the
+            database, or URL_NOT_FOUND if the URL is cached as missing.
         """
-        key = f"url_data:{url_id}"
-        value = self.redis_manager.get_client().get(key)
-        if value:
-            return json_loads(value)
-        return None
+        client = self.redis_manager.get_client()
+        try:
+            values = await self._queue_read(client, url_id, fields)
+            data, expires_at, delta_ms = _parse_entry(self.codec, values, fields)
+            if data is URL_NOT_FOUND or (data is not None and not self._should_refresh(expires_at, delta_ms)):
+                self._count(data)
+                return data
+            if await self._acquire(client, url_id):
+                if data is not None:
+                    self.stats.refreshes += 1
+                self.stats.misses += 1
+                return None
+            if data is not None:
+                # Another worker is rebuilding the entry: serve the stale copy.
+                self.stats.stale_hits += 1
+                self._count(data)
+                return data
+
+            deadline = monotonic() + self.lock_wait_ms / 1000
+            while monotonic() < deadline:
+                await sleep(LOCK_POLL_MS / 1000)
+                data, _, _ = _parse_entry(self.codec, await self._queue_read(client, url_id, fields), fields)
+                if data is not None:
+                    self._count(data)
+                    return data
+            self.stats.lock_timeouts += 1
+            self.stats.misses += 1
+            return None
+        except RedisError as e:
+            self.stats.errors += 1
+            self.logger.error("Error reading URL data from Redis: %s", str(e))
+            return None
 
-    def update_url_in_redis(self, url_id: int, new_data: dict):
+    @timed_redis("get_urls")
+    async def get_urls_from_redis(
+        self, url_ids: List[int], fields: Optional[Sequence[str]] = None
+    ) -> Dict[int, object]:
         """
-        Update URL data in Redis.
+        Retrieve many URLs from Redis with a single pipelined round trip.
+
+        Entries due for refresh are reported as misses, so they are reloaded
+        by the caller's single batched query. A Redis failure is logged and
+        reported as all misses.
+
+        Args:
+            url_ids (List[int]): The IDs of the URLs.
+            fields (Sequence[str]): Columns to read; all of them if None.
+
+        Returns:
+            Dict[int, object]: The cached URL data or URL_NOT_FOUND per ID;
+            IDs that are not cached are left out.
+        """
+        if not url_ids:
+            return {}
+        try:
+            pipeline = self.redis_manager.get_client().pipeline(transaction=False)
+            for url_id in url_ids:
+                self._queue_read(pipeline, url_id, fields)
+            entries = await pipeline.execute(raise_on_error=False)
+        except RedisError as e:
+            self.stats.errors += 1
+            self.logger.error("Error reading URL data from Redis: %s", str(e))
+            return {}
+        found = {}
+        for url_id, values in zip(url_ids, entries):
+            if isinstance(values, Exception):
+                self.stats.errors += 1
+                continue
+            data, expires_at, delta_ms = _parse_entry(self.codec, values, fields)
+            if data is not None and data is not URL_NOT_FOUND and self._should_refresh(expires_at, delta_ms):
+                self.stats.refreshes += 1
+                data = None
+            self._count(data)
+            if data is not None:
+                found[url_id] = data
+        return found
+
+    @timed_redis("update_url")
+    async def update_url_in_redis(self, url_id: int, new_data: dict, version: Optional[int] = None) -> bool:
+        """
+        Write the changed fields of a cached URL with a single HSET.
+
+        Nothing is written if the URL is not cached. When `version` is given,
+        the write is conditional: it only applies if it is newer than the
+        cached entry, so an update that loses a race cannot overwrite a later one.
 
         Args:
             url_id (int): The ID of the URL.
-            new_data (dict): The new data to update in Redis.
+            new_data (dict): The changed columns and their new values.
+            version (int): Version of the row after this update, if known.
+
+        Returns:
+            bool: True if the cached entry was updated.
 
         Raises:
             RedisError: If an error occurs while updating URL data in Redis.
         """
+        if not new_data:
+            return False
+        fields = [item for pair in _encode_fields(self.codec, new_data).items() for item in pair]
         try:
-            key = f"url_data:{url_id}"
-            value = json_dumps(new_data)
-            self.redis_manager.get_client().set(key, value)
+            client = self.redis_manager.get_client()
+            result = await client.register_script(_UPDATE_SCRIPT)(
+                keys=[f"url_data:{url_id}"],
+                args=["" if version is None else version, MISSING_FIELD, VERSION_FIELD, *fields],
+            )
+            return result >= 0
         except RedisError as e:
             self.logger.error("Error updating URL data in Redis: %s", str(e))
             raise e
 
-    def delete_url_from_redis(self, url_id: int):
+    @timed_redis("delete_url")
+    async def delete_url_from_redis(self, url_id: int):
         """
         Delete URL data from Redis.
 
@@ -93,7 +505,73 @@ class CrudRedis:
         """
         try:
             key = f"url_data:{url_id}"
-            self.redis_manager.get_client().delete(key)
+            await self.redis_manager.get_client().delete(key)
         except RedisError as e:
             self.logger.error("Error deleting URL data from Redis: %s", str(e))
             raise e
+
+    @timed_redis("delete_urls")
+    async def delete_urls_from_redis(self, url_ids: List[int]):
+        """
+        Delete many URLs from Redis with a single DEL.
+
+        Args:
+            url_ids (List[int]): The IDs of the URLs.
+
+        Raises:
+            RedisError: If an error occurs while deleting URL data from Redis.
+        """
+        if not url_ids:
+            return
+        try:
+            await self.redis_manager.get_client().delete(*(f"url_data:{url_id}" for url_id in url_ids))
+        except RedisError as e:
+            self.logger.error("Error deleting URL data from Redis: %s", str(e))
+            raise e
+
+    @timed_redis("get_user_version")
+    async def get_user_version(self, user_id: int) -> Optional[int]:
+        """
+        Get the version of a user as last seen by the API, for conditional GETs.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The stored version, or None if unknown or Redis is unavailable.
+        """
+        try:
+            version = await self.redis_manager.get_client().get(f"user_version:{user_id}")
+            return int(version) if version is not None else None
+        except RedisError as e:
+            self.logger.error("Error reading user version from Redis: %s", str(e))
+            return None
+
+    @timed_redis("store_user_version")
+    async def store_user_version(self, user_id: int, version: int):
+        """
+        Remember the version of a user unless a newer one is already stored.
+
+        Args:
+            user_id (int): The ID of the user.
+            version (int): The version read or written.
+        """
+        try:
+            await self.redis_manager.get_client().register_script(_USER_VERSION_SCRIPT)(
+                keys=[f"user_version:{user_id}"], args=[version, self.ttl]
+            )
+        except RedisError as e:
+            self.logger.error("Error storing user version in Redis: %s", str(e))
+
+    @timed_redis("delete_user_version")
+    async def delete_user_version(self, user_id: int):
+        """
+        Forget the version of a deleted user.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        try:
+            await self.redis_manager.get_client().delete(f"user_version:{user_id}")
+        except RedisError as e:
+            self.logger.error("Error deleting user version from Redis: %s", str(e))
@@ -0,0 +1,185 @@
+from asyncio import CancelledError, sleep
+from collections import OrderedDict
+from json import dumps as json_dumps
+from json import loads as json_loads
+from time import monotonic, time
+from typing import Optional
+from uuid import uuid4
+from redis import RedisError
+from app.api.modules.logger_modify import get_logger
+from app.api.modules.metrics.metrics import cache_collector, metrics
+from app.api.modules.redis_conf.redis_conf import RedisManager
+from app.api.settings import get_settings
+
+logger = get_logger(__name__)
+
+
+class LocalCache:
+    """
+    Per-worker LRU of URL rows, in front of the Redis cache.
+
+    Entries expire `ttl` seconds after being stored, which bounds staleness
+    if an invalidation message is lost. Invalidations bump `generation`;
+    a row read before an invalidation is not stored if the invalidation
+    arrived while the read was in flight (see `put`).
+
+    Attributes:
+        max_size (int): Largest number of URLs kept; 0 disables the cache.
+        ttl (float): Seconds an entry is served.
+        generation (int): Number of invalidations received so far.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl: float = 30.0) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int): Largest number of URLs kept; 0 disables the cache.
+            ttl (float): Seconds an entry is served.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lag_total_ms = 0.0
+        self.lag_max_ms = 0.0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def get(self, url_id: int) -> Optional[dict]:
+        """
+        Look up a URL.
+
+        Args:
+            url_id (int): The ID of the URL.
+
+        Returns:
+            dict: The cached row, or None.
+        """
+        entry = self._entries.get(url_id)
+        if entry is None or entry[1] < monotonic():
+            if entry is not None:
+                del self._entries[url_id]
+                self.evictions += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(url_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, url_id: int, url_data: dict, generation: int) -> None:
+        """
+        Store a URL row read from Redis or the database.
+
+        Args:
+            url_id (int): The ID of the URL.
+            url_data (dict): The full row.
+            generation (int): `generation` when the read started; the row is
+                dropped if an invalidation arrived since.
+        """
+        if self.max_size <= 0 or generation != self.generation:
+            return
+        self._entries[url_id] = (url_data, monotonic() + self.ttl)
+        self._entries.move_to_end(url_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, url_id: int, lag_ms: float = 0.0) -> None:
+        """
+        Drop a URL after it changed.
+
+        Args:
+            url_id (int): The ID of the URL.
+            lag_ms (float): Milliseconds between the change and this call.
+        """
+        self.generation += 1
+        self.invalidations += 1
+        self.lag_total_ms += lag_ms
+        self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+        self._entries.pop(url_id, None)
+
+    def clear(self) -> None:
+        """
+        Drop every entry, e.g. when invalidations may have been missed.
+        """
+        self.generation += 1
+        self._entries.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Get the current values of the counters.
+
+        Returns:
+            dict: Counters, size, hit ratio and the mean and max invalidation lag in ms.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidation_lag_ms": round(self.lag_total_ms / self.invalidations, 3) if self.invalidations else 0.0,
+            "invalidation_lag_max_ms": round(self.lag_max_ms, 3),
+        }
+
+
+settings = get_settings()
+# Identifies this worker's own messages, which it already applied.
+_worker_id = uuid4().hex
+# Process-wide L1 cache of url_data:* entries.
+url_local_cache = LocalCache(max_size=settings.l1_cache_size, ttl=settings.l1_cache_ttl)
+metrics.register_collector(cache_collector(url_local_cache, "url_local"))
+
+
+async def publish_invalidation(redis: RedisManager, url_id: int) -> None:
+    """
+    Drop a URL from the L1 cache of this worker and of every other worker.
+
+    Failures are logged; other workers then serve the old row until their
+    entry expires.
+
+    Args:
+        redis (RedisManager): The shared Redis manager.
+        url_id (int): The ID of the changed URL.
+    """
+    url_local_cache.invalidate(url_id)
+    try:
+        message = json_dumps({"id": url_id, "ts": time() * 1000, "src": _worker_id})
+        await redis.get_client().publish(get_settings().l1_invalidation_channel, message)
+    except RedisError as e:
+        logger.error("Error publishing URL invalidation: %s", str(e))
+
+
+async def listen_invalidations(redis: RedisManager) -> None:
+    """
+    Apply the invalidations published by every worker until cancelled.
+
+    Messages published while the subscription is down are lost, so the whole
+    L1 cache is cleared whenever the subscription is (re)established.
+
+    Args:
+        redis (RedisManager): The shared Redis manager.
+    """
+    channel = get_settings().l1_invalidation_channel
+    while True:
+        pubsub = redis.get_client().pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(channel)
+            url_local_cache.clear()
+            async for message in pubsub.listen():
+                payload = json_loads(message["data"])
+                if payload.get("src") == _worker_id:
+                    continue
+                url_local_cache.invalidate(payload["id"], lag_ms=max(0.0, time() * 1000 - payload["ts"]))
+        except CancelledError:
+            raise
+        except Exception as e:
+            logger.error("URL invalidation subscription lost: %s", str(e))
+            await sleep(1)
+        finally:
+            await pubsub.aclose()
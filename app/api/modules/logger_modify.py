@@ -1,48 +1,133 @@
-from logging import DEBUG
-from colorlog import StreamHandler, getLogger, ColoredFormatter
+from atexit import register as atexit_register
+from datetime import datetime, timezone
+from json import dumps as json_dumps
+from logging import WARNING, Filter, Formatter, Logger, LogRecord, StreamHandler, getLogger
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from random import random
+from threading import Lock
+from typing import Dict, Optional
+from colorlog import ColoredFormatter
+from app.api.settings import get_settings
 
+# Logger every module logger descends from.
+ROOT_LOGGER = "app"
 
-class ColoredLogger:
+_listener: Optional[QueueListener] = None
+_setup_lock = Lock()
+
+
+class JsonFormatter(Formatter):
+    """
+    Formats records as one JSON object per line.
+
+    Fields passed through `extra` are included next to the standard ones.
     """
-    A utility class for creating and configuring colored loggers.
 
-    This class provides a convenient way to create and configure a logger with
-    colored output using the `colorlog` library.
+    _standard = set(LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "sample_rate"}
+
+    def format(self, record: LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._standard:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json_dumps(entry, default=str)
+
+
+class SamplingFilter(Filter):
+    """
+    Keeps only a fraction of high-volume messages.
+
+    The rate of a record is taken from `extra={"sample_rate": ...}` at the call
+    site, overridden by `rates`, which maps message templates (the first
+    argument of the logging call) to the fraction to keep. Warnings and
+    errors are never sampled.
 
     Attributes:
-        logger (Logger): The configured logger instance.
+        rates (Dict[str, float]): Fraction kept per message template.
+    """
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
 
-    Methods:
-        get_logger(): Get the configured logger instance.
+    def filter(self, record: LogRecord) -> bool:
+        if record.levelno >= WARNING:
+            return True
+        rate = getattr(record, "sample_rate", 1.0)
+        if isinstance(record.msg, str):
+            rate = self.rates.get(record.msg, rate)
+        return rate >= 1.0 or random() < rate
+
+
+def setup_logging() -> None:
+    """
+    Configure the `app` logger once per process.
+
+    Records are formatted by a single handler running on a QueueListener
+    thread; the logging call itself only filters and enqueues the record,
+    so writing to stdout never happens in a request. Levels, format and
+    sampling come from the LOG_* settings.
     """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        settings = get_settings()
 
-    def __init__(self):
-        """
-        Initialize the ColoredLogger instance.
+        output = StreamHandler()
+        if settings.log_format == "color":
+            output.setFormatter(ColoredFormatter("%(log_color)s%(levelname)s:%(name)s:%(message)s"))
+        else:
+            output.setFormatter(JsonFormatter())
 
-        This constructor sets up the logger with a colored formatter and the
-        desired log level.
+        log_queue = SimpleQueue()
+        handler = QueueHandler(log_queue)
+        handler.addFilter(SamplingFilter(settings.log_sample_rates))
 
-        Args:
-            None
+        root = getLogger(ROOT_LOGGER)
+        for previous in [h for h in root.handlers if isinstance(h, QueueHandler)]:
+            root.removeHandler(previous)
+        root.setLevel(settings.log_level.upper())
+        root.addHandler(handler)
+        root.propagate = False
+        for item in settings.log_levels.split(","):
+            if "=" in item:
+                name, level = item.split("=", 1)
+                getLogger(name.strip()).setLevel(level.strip().upper())
 
-        Returns:
-            None
-        """
-        handler = StreamHandler()
-        handler.setFormatter(
-            ColoredFormatter("%(log_color)s%(levelname)s:%(name)s:%(message)s")
-        )
+        _listener = QueueListener(log_queue, output)
+        _listener.start()
+        atexit_register(shutdown_logging)
 
-        self.logger = getLogger(__name__)
-        self.logger.setLevel(DEBUG)
-        self.logger.addHandler(handler)
 
-    def get_logger(self):
-        """
-        Get the configured logger instance.
+def shutdown_logging() -> None:
+    """
+    Flush the queued records and stop the listener thread.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
 
-        Returns:
-            Logger: The configured logger instance.
-        """
-        return self.logger
+
+def get_logger(name: str) -> Logger:
+    """
+    Get a module logger under the shared logging setup.
+
+    Args:
+        name (str): Usually `__name__` of the calling module.
+
+    Returns:
+        Logger: The logger, configured on first use.
+    """
+    setup_logging()
+    return getLogger(name if name.startswith(ROOT_LOGGER + ".") else f"{ROOT_LOGGER}.{name}")
@@ -0,0 +1,456 @@
+from asyncio import CancelledError, sleep
+from bisect import bisect_left
+from functools import wraps
+from json import dumps as json_dumps
+from json import loads as json_loads
+from time import perf_counter, time
+from typing import Callable, Dict, Iterable, List, Tuple
+from uuid import uuid4
+from redis import RedisError
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.api.modules.logger_modify import get_logger
+from app.api.modules.metrics.request_stats import current_request, log_slow_query
+from app.api.modules.redis_conf.redis_conf import RedisManager
+from app.api.settings import get_settings
+
+logger = get_logger(__name__)
+
+# Upper bounds, in seconds, of the buckets of every latency histogram.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Type and help text of every exported metric.
+DESCRIPTIONS: Dict[str, Tuple[str, str]] = {
+    "http_request_duration_seconds": ("histogram", "Time to answer a request, per route template."),
+    "db_query_duration_seconds": ("histogram", "Time spent in cursor.execute, per pool and statement type."),
+    "redis_operation_duration_seconds": ("histogram", "Duration of a CrudRedis operation, its Redis round trips included."),
+    "db_pool_size": ("gauge", "Connections kept open by the pool."),
+    "db_pool_checked_out": ("gauge", "Connections currently handed out to sessions."),
+    "db_pool_overflow": ("gauge", "Connections open above the pool size."),
+    "db_pool_checkouts_total": ("counter", "Connections handed out to sessions."),
+    "db_pool_connects_total": ("counter", "New DBAPI connections opened by the pool."),
+    "db_pool_invalidated_total": ("counter", "Connections discarded after an error or failed pre-ping."),
+    "cache_hits_total": ("counter", "Lookups answered by the cache."),
+    "cache_misses_total": ("counter", "Lookups the cache could not answer."),
+    "cache_hit_ratio": ("gauge", "Hits over lookups since the workers started."),
+}
+
+# Statement types of the db_query_duration_seconds label, by first keyword;
+# anything else (DDL, CTEs, transaction control) is "other".
+_STATEMENT_TYPES = {"SELECT": "select", "INSERT": "insert", "UPDATE": "update", "DELETE": "delete"}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Bucketed distribution of observed values.
+
+    `observe` only bisects LATENCY_BUCKETS and bumps two numbers, so it can be
+    called on every query and Redis round trip. Buckets are stored
+    non-cumulative and summed when rendered.
+
+    Attributes:
+        counts (List[int]): Observations per bucket, the last one past every bound.
+        total (float): Sum of the observed values.
+    """
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty histogram.
+        """
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Record one value.
+
+        Args:
+            value (float): The value, in seconds.
+        """
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+
+
+class MetricsRegistry:
+    """
+    The metrics of this worker.
+
+    Histograms are updated as events happen. Counters and gauges already
+    kept elsewhere (pool and cache statistics) are read by collectors only
+    when a snapshot is taken, so they cost nothing per event.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes a registry without metrics.
+        """
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.collectors: List[Callable[[], Iterable[Tuple[str, Labels, float]]]] = []
+
+    def histogram(self, name: str, labels: Labels) -> Histogram:
+        """
+        Get the histogram of a metric and label set, creating it on first use.
+
+        Args:
+            name (str): Name of the metric, a key of DESCRIPTIONS.
+            labels (Labels): (name, value) pairs of the series.
+
+        Returns:
+            Histogram: The histogram of the series.
+        """
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, Labels, float]]]) -> None:
+        """
+        Add a function returning (name, labels, value) samples at snapshot time.
+
+        Args:
+            collector (Callable): The function.
+        """
+        self.collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        """
+        Get every series of this worker in a JSON-compatible form.
+
+        Returns:
+            dict: `histograms` as [name, labels, counts, sum] and `samples` as [name, labels, value].
+        """
+        return {
+            "histograms": [
+                [name, list(labels), list(histogram.counts), histogram.total]
+                for (name, labels), histogram in list(self.histograms.items())
+            ],
+            "samples": [[name, list(labels), value] for collector in self.collectors for name, labels, value in collector()],
+        }
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Iterable) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshots: Iterable[dict]) -> str:
+    """
+    Merge the snapshots of several workers into the Prometheus text format.
+
+    Histograms, counters and gauges of the same series are summed, so the
+    pool gauges give the connections of every worker together. Hit ratios
+    are computed from the summed cache counters.
+
+    Args:
+        snapshots (Iterable[dict]): Results of `MetricsRegistry.snapshot`.
+
+    Returns:
+        str: The exposition, version 0.0.4.
+    """
+    histograms: Dict[Tuple[str, Labels], list] = {}
+    samples: Dict[Tuple[str, Labels], float] = {}
+    for snapshot in snapshots:
+        for name, labels, counts, total in snapshot["histograms"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+        for name, labels, value in snapshot["samples"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            samples[key] = samples.get(key, 0) + value
+
+    for (name, labels), hits in list(samples.items()):
+        if name == "cache_hits_total":
+            lookups = hits + samples.get(("cache_misses_total", labels), 0)
+            samples[("cache_hit_ratio", labels)] = round(hits / lookups, 4) if lookups else 0.0
+
+    lines = []
+    for metric, (kind, help_text) in DESCRIPTIONS.items():
+        if kind == "histogram":
+            series = sorted((labels, merged) for (name, labels), merged in histograms.items() if name == metric)
+        else:
+            series = sorted((labels, value) for (name, labels), value in samples.items() if name == metric)
+        if not series:
+            continue
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{metric}{_labels(labels)} {_number(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_labels((*labels, ('le', bound)))} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{metric}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# Process-wide registry, and the ID under which this worker publishes it.
+metrics = MetricsRegistry()
+_worker_id = uuid4().hex
+
+
+def pool_collector(stats, pool: str) -> Callable[[], List[Tuple[str, Labels, float]]]:
+    """
+    Build a collector exporting the counters and gauges of a PoolStats.
+
+    Args:
+        stats (PoolStats): The statistics of the pool.
+        pool (str): Value of the `pool` label.
+
+    Returns:
+        Callable: The collector, for `MetricsRegistry.register_collector`.
+    """
+    labels = (("pool", pool),)
+
+    def collect():
+        snapshot = stats.snapshot()
+        return [
+            ("db_pool_size", labels, snapshot["size"]),
+            ("db_pool_checked_out", labels, snapshot["checked_out"]),
+            ("db_pool_overflow", labels, snapshot["overflow"]),
+            ("db_pool_checkouts_total", labels, snapshot["checkouts"]),
+            ("db_pool_connects_total", labels, snapshot["connects"]),
+            ("db_pool_invalidated_total", labels, snapshot["invalidated"]),
+        ]
+
+    return collect
+
+
+def cache_collector(stats, cache: str) -> Callable[[], List[Tuple[str, Labels, float]]]:
+    """
+    Build a collector exporting the hits and misses of a cache.
+
+    Args:
+        stats: An object with `hits` and `misses` counters; `negative_hits`, if
+            present, count as hits.
+        cache (str): Value of the `cache` label.
+
+    Returns:
+        Callable: The collector, for `MetricsRegistry.register_collector`.
+    """
+    labels = (("cache", cache),)
+
+    def collect():
+        hits = stats.hits + getattr(stats, "negative_hits", 0)
+        return [("cache_hits_total", labels, hits), ("cache_misses_total", labels, stats.misses)]
+
+    return collect
+
+
+def observe_engine(engine: Engine, pool: str) -> None:
+    """
+    Time every statement an engine executes.
+
+    Each statement is also counted in the statistics of the current request
+    (see `request_stats`) and, past SLOW_QUERY_MS, written to the slow-query
+    log. The start time is kept on the execution context and the statement type
+    is read from its first six characters, which keeps both listeners to a
+    few attribute and dict operations.
+
+    Args:
+        engine (Engine): The (sync) engine to instrument.
+        pool (str): Value of the `pool` label, e.g. "primary" or "replica0".
+    """
+    series = {
+        keyword: metrics.histogram("db_query_duration_seconds", (("pool", pool), ("type", statement_type)))
+        for keyword, statement_type in _STATEMENT_TYPES.items()
+    }
+    other = metrics.histogram("db_query_duration_seconds", (("pool", pool), ("type", "other")))
+
+    slow = get_settings().slow_query_ms / 1000 or float("inf")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request.get()
+        if stats is not None and stats.budget is not None:
+            stats.check_budget(statement)
+        context._metrics_started = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - context._metrics_started
+        series.get(statement[:6], other).observe(elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_time += elapsed
+        if elapsed >= slow:
+            log_slow_query(statement, parameters, executemany, elapsed)
+
+
+def timed_redis(operation: str):
+    """
+    Decorate a coroutine method so its duration feeds redis_operation_duration_seconds
+    and the statistics of the current request.
+
+    Args:
+        operation (str): Value of the `operation` label.
+
+    Returns:
+        Callable: The decorator.
+    """
+    histogram = metrics.histogram("redis_operation_duration_seconds", (("operation", operation),))
+
+    def decorator(method):
+        @wraps(method)
+        async def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - started
+                histogram.observe(elapsed)
+                stats = current_request.get()
+                if stats is not None:
+                    stats.redis_calls += 1
+                    stats.redis_time += elapsed
+
+        return wrapper
+
+    return decorator
+
+
+def route_template(scope: dict) -> str:
+    """
+    Get the template of the route that handled a request.
+
+    Args:
+        scope (dict): The ASGI scope, after routing.
+
+    Returns:
+        str: The template, e.g. `/urls/url/{url_id}`, or "unmatched".
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    path = scope["path"]
+    regex = getattr(route, "path_regex", None)
+    if regex is None or regex.match(path):
+        return template
+    # Routes of a router included with a prefix may be reported without it.
+    for index in range(1, len(path)):
+        if path[index] == "/" and regex.match(path[index:]):
+            return path[:index] + template
+    return template
+
+
+class RouteMetrics:
+    """
+    ASGI middleware timing each request under the template of its route.
+
+    Labels use the route template (e.g. `/urls/url/{url_id}`), not the path,
+    so the number of series stays bounded; unmatched paths share the
+    "unmatched" route.
+    """
+
+    def __init__(self, app) -> None:
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The ASGI application to time.
+        """
+        self.app = app
+        self._series: Dict[Tuple[str, str, int], Histogram] = {}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            key = (scope["method"], route_template(scope), status)
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = metrics.histogram(
+                    "http_request_duration_seconds", (("method", key[0]), ("route", key[1]), ("status", str(status)))
+                )
+            histogram.observe(perf_counter() - started)
+
+
+async def publish_metrics(redis: RedisManager) -> None:
+    """
+    Publish this worker's snapshot to Redis every METRICS_PUBLISH_INTERVAL seconds until cancelled.
+
+    Every worker writes its snapshot to a field of the METRICS_KEY hash, so
+    whichever worker answers /metrics can merge all of them.
+
+    Args:
+        redis (RedisManager): The shared Redis manager.
+    """
+    settings = get_settings()
+    while True:
+        try:
+            payload = json_dumps({"ts": time(), "snapshot": metrics.snapshot()})
+            await redis.get_client().hset(settings.metrics_key, _worker_id, payload)
+        except CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error publishing metrics: %s", str(e))
+        await sleep(settings.metrics_publish_interval)
+
+
+async def collect_snapshots(redis: RedisManager) -> List[dict]:
+    """
+    Get the snapshots of every live worker, this one read live.
+
+    Snapshots not refreshed for three publish intervals belong to stopped
+    workers and are removed. Without Redis, only this worker is reported.
+
+    Args:
+        redis (RedisManager): The shared Redis manager.
+
+    Returns:
+        List[dict]: One snapshot per worker.
+    """
+    settings = get_settings()
+    snapshots = [metrics.snapshot()]
+    try:
+        client = redis.get_client()
+        published = await client.hgetall(settings.metrics_key)
+        cutoff = time() - 3 * settings.metrics_publish_interval
+        stale = []
+        for worker_id, payload in published.items():
+            worker_id = worker_id.decode() if isinstance(worker_id, bytes) else worker_id
+            if worker_id == _worker_id:
+                continue
+            entry = json_loads(payload)
+            if entry["ts"] < cutoff:
+                stale.append(worker_id)
+            else:
+                snapshots.append(entry["snapshot"])
+        if stale:
+            await client.hdel(settings.metrics_key, *stale)
+    except RedisError as e:
+        logger.error("Error reading the metrics of other workers: %s", str(e))
+    return snapshots
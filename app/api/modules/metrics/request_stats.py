@@ -0,0 +1,216 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Iterator, Optional
+from app.api.modules.logger_modify import get_logger
+from app.api.settings import get_settings
+
+logger = get_logger(__name__)
+# Separate logger so slow queries can be routed or silenced with LOG_LEVELS.
+slow_query_logger = get_logger("slow_queries")
+
+# Longest statement text written to the slow-query log.
+MAX_LOGGED_STATEMENT = 2000
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised, in strict mode, by the statement that takes a request over QUERY_BUDGET.
+    """
+
+
+class RequestStats:
+    """
+    SQL statements and CrudRedis operations of the request being handled.
+
+    Attributes:
+        queries (int): Statements executed.
+        query_time (float): Seconds spent executing them.
+        redis_calls (int): CrudRedis operations awaited.
+        redis_time (float): Seconds spent in them.
+        budget (int): Statements allowed before the request fails, in strict mode; None otherwise.
+        refused (str): The first statement refused for going over the budget, if any.
+    """
+
+    __slots__ = ("queries", "query_time", "redis_calls", "redis_time", "budget", "refused")
+
+    def __init__(self, budget: Optional[int] = None) -> None:
+        """
+        Initializes the counters to zero.
+
+        Args:
+            budget (int): Statements allowed before the request fails; None to never fail.
+        """
+        self.queries = 0
+        self.query_time = 0.0
+        self.redis_calls = 0
+        self.redis_time = 0.0
+        self.budget = budget
+        self.refused: Optional[str] = None
+
+    def check_budget(self, statement: str) -> None:
+        """
+        Fail before a statement that would go over the budget.
+
+        Args:
+            statement (str): The statement about to run.
+
+        Raises:
+            QueryBudgetExceeded: If the request already ran `budget` statements.
+        """
+        if self.queries >= self.budget:
+            if self.refused is None:
+                self.refused = statement
+            raise self.budget_error(statement)
+
+    def budget_error(self, statement: str) -> QueryBudgetExceeded:
+        """
+        Build the error reporting a statement refused for going over the budget.
+
+        Args:
+            statement (str): The refused statement.
+
+        Returns:
+            QueryBudgetExceeded: The error to raise.
+        """
+        return QueryBudgetExceeded(f"Query budget of {self.budget} exceeded by: {statement[:200]}")
+
+    def server_timing(self, total: float) -> str:
+        """
+        Build the Server-Timing header value.
+
+        Args:
+            total (float): Seconds the request took so far.
+
+        Returns:
+            str: The `db`, `redis` and `app` metrics, durations in ms.
+        """
+        return (
+            f'db;dur={self.query_time * 1000:.2f};desc="{self.queries} queries", '
+            f'redis;dur={self.redis_time * 1000:.2f};desc="{self.redis_calls} calls", '
+            f"app;dur={total * 1000:.2f}"
+        )
+
+
+# Statistics of the request handled by the current task, None outside requests.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+@contextmanager
+def query_budget(budget: Optional[int] = None) -> Iterator[RequestStats]:
+    """
+    Count, and optionally limit, the statements run inside a block, as a request would.
+
+    Meant for tests of repositories and controllers, e.g.
+    `with query_budget(2): await repo.list_user_urls(...)`.
+
+    Args:
+        budget (int): Statements allowed before QueryBudgetExceeded; None to only count.
+
+    Yields:
+        RequestStats: The counters of the block.
+    """
+    stats = RequestStats(budget)
+    token = current_request.set(stats)
+    try:
+        yield stats
+    finally:
+        current_request.reset(token)
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {key: _redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact(item) for item in value]
+    return None if value is None else f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters, executemany: bool = False):
+    """
+    Replace the bound values of a statement by their type names.
+
+    Args:
+        parameters: The DBAPI parameters (a sequence or a mapping).
+        executemany (bool): True if `parameters` holds one entry per row.
+
+    Returns:
+        The parameters with every value as e.g. "<str>", keeping only the first row of an executemany.
+    """
+    if executemany:
+        return {"rows": len(parameters), "first": _redact(parameters[0]) if parameters else None}
+    return _redact(parameters)
+
+
+def log_slow_query(statement: str, parameters, executemany: bool, elapsed: float) -> None:
+    """
+    Write a statement slower than SLOW_QUERY_MS to the slow-query log.
+
+    Args:
+        statement (str): The SQL text, with placeholders.
+        parameters: The DBAPI parameters; only their types are logged.
+        executemany (bool): True if `parameters` holds one entry per row.
+        elapsed (float): Seconds the statement took.
+    """
+    if len(statement) > MAX_LOGGED_STATEMENT:
+        statement = statement[:MAX_LOGGED_STATEMENT] + "..."
+    slow_query_logger.warning(
+        "Slow query (%.1f ms)",
+        elapsed * 1000,
+        extra={"statement": statement, "parameters": redact_parameters(parameters, executemany)},
+    )
+
+
+class RequestTiming:
+    """
+    ASGI middleware counting the SQL statements and CrudRedis operations of each request.
+
+    The totals are sent in a Server-Timing header (when SERVER_TIMING is on).
+    A request running more than QUERY_BUDGET statements is logged, or, with
+    QUERY_BUDGET_STRICT, fails at the statement that goes over it. The
+    middleware raises QueryBudgetExceeded again when the response starts, in
+    case the handler caught the first one, so a test client always sees it
+    and N+1 patterns are caught before they reach production.
+    """
+
+    def __init__(self, app) -> None:
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The ASGI application to instrument.
+        """
+        settings = get_settings()
+        self.app = app
+        self.server_timing = settings.server_timing
+        self.budget = settings.query_budget or None
+        self.strict = settings.query_budget_strict
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = perf_counter()
+        stats = RequestStats(self.budget if self.strict else None)
+        token = current_request.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and stats.refused is not None:
+                raise stats.budget_error(stats.refused)
+            if message["type"] == "http.response.start" and self.server_timing:
+                header = stats.server_timing(perf_counter() - started).encode("latin-1")
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            if self.budget and not self.strict and stats.queries > self.budget:
+                logger.warning(
+                    "Request %s %s ran %d queries, over the budget of %d",
+                    scope["method"],
+                    scope["path"],
+                    stats.queries,
+                    self.budget,
+                )
@@ -0,0 +1,115 @@
+from asyncio import get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from hmac import compare_digest
+from typing import List, Optional, Tuple
+from passlib.context import CryptContext
+from app.api.settings import get_settings
+
+
+class PasswordPoolBusy(Exception):
+    """
+    Raised when the password pool already has `max_pending` jobs.
+    """
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords off the event loop.
+
+    The KDF runs in a bounded thread pool (argon2-cffi and bcrypt release the
+    GIL while hashing), so a slow hash never blocks other requests. At most
+    `max_pending` jobs may be running or queued; further calls fail fast with
+    PasswordPoolBusy instead of piling up behind a login storm.
+
+    The first scheme hashes new passwords; the others are still verified and
+    rehashed with the first one on the next successful login. Rows holding a
+    plaintext password (written before hashing was introduced) are verified
+    by constant-time comparison and rehashed the same way.
+
+    Attributes:
+        context (CryptContext): The passlib context.
+        max_pending (int): Largest number of jobs running or waiting.
+    """
+
+    def __init__(self, schemes: List[str], max_workers: int = 4, max_pending: int = 32) -> None:
+        """
+        Initializes a new instance of PasswordHasher.
+
+        Args:
+            schemes (List[str]): passlib schemes, preferred first.
+            max_workers (int): Threads running the KDF.
+            max_pending (int): Largest number of jobs running or waiting.
+        """
+        self.context = CryptContext(schemes=schemes, deprecated="auto")
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password")
+
+    async def _run(self, function, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolBusy("Too many password operations in progress")
+        self.pending += 1
+        try:
+            return await get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password with the preferred scheme.
+
+        Args:
+            password (str): The plaintext password.
+
+        Returns:
+            str: The hash to store.
+
+        Raises:
+            PasswordPoolBusy: If the pool is full.
+        """
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password against the stored value.
+
+        Without a stored value (an unknown user) a dummy hash is still verified
+        in the pool, so the response time does not reveal whether the user exists.
+
+        Args:
+            password (str): The plaintext password given by the user.
+            stored (str): The value of the `password` column.
+
+        Returns:
+            Tuple[bool, Optional[str]]: Whether the password matches, and a new
+                hash to store when the stored value is plaintext or uses an
+                outdated scheme (None otherwise).
+
+        Raises:
+            PasswordPoolBusy: If the pool is full.
+        """
+        if not stored:
+            await self._run(self.context.dummy_verify)
+            return False, None
+        if self.context.identify(stored, required=False) is None:
+            if not compare_digest(password.encode(), stored.encode()):
+                return False, None
+            return True, await self.hash(password)
+        return await self._run(self.context.verify_and_update, password, stored)
+
+    def shutdown(self) -> None:
+        """
+        Stop the worker threads.
+        """
+        self._executor.shutdown(wait=False)
+
+
+settings = get_settings()
+# Process-wide hasher shared by every request.
+password_hasher = PasswordHasher(
+    [scheme.strip() for scheme in settings.password_schemes.split(",") if scheme.strip()],
+    max_workers=settings.password_hash_workers,
+    max_pending=settings.password_max_pending,
+)
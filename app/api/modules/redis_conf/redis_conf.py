@@ -1,4 +1,4 @@
-from redis import StrictRedis
+from redis.asyncio import ConnectionPool, Redis
 
 
 class RedisManager:
@@ -6,27 +6,47 @@ class RedisManager:
     Class for managing the global Redis client instance.
 
     This class provides a centralized way to configure and obtain the Redis client
-    instance for use in different parts of the project.
+    instance for use in different parts of the project. A single instance owns a
+    bounded connection pool and is meant to be shared by the whole process; it is
+    created by the application lifespan and closed on shutdown.
 
     Args:
         host (str): The host where the Redis server is running. Default is 'localhost'.
         port (int): The port on which the Redis server is listening. Default is 6379.
         db (int): The Redis database number to use. Default is 0.
+        max_connections (int): Maximum number of pooled connections. Default is 50.
+        socket_timeout (float): Seconds to wait for a command reply. Default is 1.0.
+        socket_connect_timeout (float): Seconds to wait for a new connection. Default is 1.0.
+        health_check_interval (int): Seconds of idleness after which a pooled
+            connection is pinged before use. Default is 30.
+        socket_keepalive (bool): Enable TCP keepalive on pooled sockets. Default is True.
 
     Attributes:
-        redis_client (redis.StrictRedis): The Redis client instance.
+        pool (redis.asyncio.ConnectionPool): The shared connection pool.
+        redis_client (redis.asyncio.Redis): The Redis client instance.
 
     Example:
-        # Create a global instance of the RedisManager class
-        redis_manager = RedisManager()
+        # Create the process-wide instance from the settings
+        redis_manager = RedisManager.from_settings(get_settings())
 
-        # Get the Redis client from the global instance
+        # Get the Redis client from the shared instance
         redis_client = redis_manager.get_client()
 
-        # Now you can use redis_client to perform operations on Redis
+        # Release the pooled connections on shutdown
+        await redis_manager.close()
     """
 
-    def __init__(self, host="localhost", port=6379, db=0):
+    def __init__(
+        self,
+        host="localhost",
+        port=6379,
+        db=0,
+        max_connections=50,
+        socket_timeout=1.0,
+        socket_connect_timeout=1.0,
+        health_check_interval=30,
+        socket_keepalive=True,
+    ):
         """
         Initialize a new instance of RedisManager.
 
@@ -34,18 +54,60 @@ class RedisManager:
             host (str): The host where the Redis server is running. Default is 'localhost'.
             port (int): The port on which the Redis server is listening. Default is 6379.
             db (int): The Redis database number to use. Default is 0.
+            max_connections (int): Maximum number of pooled connections. Default is 50.
+            socket_timeout (float): Seconds to wait for a command reply. Default is 1.0.
+            socket_connect_timeout (float): Seconds to wait for a new connection. Default is 1.0.
+            health_check_interval (int): Seconds between connection health checks. Default is 30.
+            socket_keepalive (bool): Enable TCP keepalive on pooled sockets. Default is True.
         """
-        self.redis_client = StrictRedis(host=host, port=port, db=db)
+        self.pool = ConnectionPool(
+            host=host,
+            port=port,
+            db=db,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
+            health_check_interval=health_check_interval,
+            socket_keepalive=socket_keepalive,
+        )
+        self.redis_client = Redis(connection_pool=self.pool)
+
+    @classmethod
+    def from_settings(cls, settings, socket_timeout=None):
+        """
+        Create a RedisManager configured from the application settings.
+
+        Args:
+            settings (Settings): The configuration holding the redis_* values.
+            socket_timeout (float): Overrides `redis_socket_timeout`, e.g. for clients
+                issuing blocking commands that wait longer than it.
+
+        Returns:
+            RedisManager: A manager using the configured pool settings.
+        """
+        return cls(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            max_connections=settings.redis_max_connections,
+            socket_timeout=settings.redis_socket_timeout if socket_timeout is None else socket_timeout,
+            socket_connect_timeout=settings.redis_connect_timeout,
+            health_check_interval=settings.redis_health_check_interval,
+            socket_keepalive=settings.redis_socket_keepalive,
+        )
 
     def get_client(self):
         """
         Get the Redis client instance.
 
         Returns:
-            redis.StrictRedis: The Redis client instance.
+            redis.asyncio.Redis: The Redis client instance.
         """
         return self.redis_client
 
-
-# # Create a global instance of the RedisManager class
-# redis_manager = RedisManager()
+    async def close(self):
+        """
+        Close the client and disconnect every pooled connection.
+        """
+        await self.redis_client.aclose()
+        await self.pool.disconnect()
@@ -0,0 +1,158 @@
+from collections import defaultdict
+from math import log
+from re import compile as re_compile
+from threading import RLock
+from typing import Dict, List, Optional, Set, Tuple
+
+# Weight of each indexed field, mirroring the A/B/C weights of the tsvector.
+FIELD_WEIGHTS = {"title": 1.0, "author": 0.4, "description": 0.2}
+
+# Minimum title similarity for a fuzzy match, as pg_trgm.similarity_threshold.
+SIMILARITY_THRESHOLD = 0.3
+
+_word = re_compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text (str): The text to split, or None.
+
+    Returns:
+        List[str]: The tokens in order of appearance.
+    """
+    return _word.findall(text.lower()) if text else []
+
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    """
+    Compute the trigram set of a text the way pg_trgm does.
+
+    Each word is lowercased and padded with two spaces in front and one behind.
+
+    Args:
+        text (str): The text, or None.
+
+    Returns:
+        Set[str]: The trigrams of every word.
+    """
+    grams = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class InvertedIndex:
+    """
+    In-process full-text index over URL title, author and description.
+
+    This is the pure-Python counterpart of the Postgres tsvector/pg_trgm search,
+    used when no Postgres is available. Documents match when they contain a
+    query token or when their title is similar enough to the query; matches
+    are ranked by weighted TF-IDF plus title trigram similarity.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty index.
+        """
+        self._lock = RLock()
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._title_grams: Dict[str, Set[int]] = defaultdict(set)
+        self._docs: Dict[int, Tuple[Set[str], Set[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc_id: int, title: str = None, author: str = None, description: str = None) -> None:
+        """
+        Index a URL, replacing any previous version of it.
+
+        Args:
+            doc_id (int): The ID of the URL.
+            title (str): The URL's title.
+            author (str): The URL's author.
+            description (str): The URL's description.
+        """
+        weights: Dict[str, float] = defaultdict(float)
+        for field, text in (("title", title), ("author", author), ("description", description)):
+            for token in tokenize(text):
+                weights[token] += FIELD_WEIGHTS[field]
+        grams = trigrams(title)
+        with self._lock:
+            self.remove(doc_id)
+            for token, weight in weights.items():
+                self._postings[token][doc_id] = weight
+            for gram in grams:
+                self._title_grams[gram].add(doc_id)
+            self._docs[doc_id] = (set(weights), grams)
+
+    def remove(self, doc_id: int) -> None:
+        """
+        Drop a URL from the index if present.
+
+        Args:
+            doc_id (int): The ID of the URL.
+        """
+        with self._lock:
+            entry = self._docs.pop(doc_id, None)
+            if entry is None:
+                return
+            tokens, grams = entry
+            for token in tokens:
+                postings = self._postings[token]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[token]
+            for gram in grams:
+                ids = self._title_grams[gram]
+                ids.discard(doc_id)
+                if not ids:
+                    del self._title_grams[gram]
+
+    def search(self, query: str, limit: int = 20, after: Optional[Tuple[float, int]] = None) -> List[Tuple[float, int]]:
+        """
+        Rank the URLs matching a query.
+
+        Results are ordered by (score DESC, id DESC) and can be paginated by
+        passing the (score, id) of the last result of the previous page.
+
+        Args:
+            query (str): The search text.
+            limit (int): Maximum number of results.
+            after (Tuple[float, int]): Key of the last result of the previous page, or None.
+
+        Returns:
+            List[Tuple[float, int]]: (score, id) pairs of the page.
+        """
+        tokens = set(tokenize(query))
+        query_grams = trigrams(query)
+        with self._lock:
+            total = len(self._docs) or 1
+            scores: Dict[int, float] = defaultdict(float)
+            for token in tokens:
+                postings = self._postings.get(token, {})
+                idf = log(1 + total / len(postings)) if postings else 0.0
+                for doc_id, weight in postings.items():
+                    scores[doc_id] += weight * idf
+
+            candidates: Set[int] = set()
+            for gram in query_grams:
+                candidates.update(self._title_grams.get(gram, ()))
+            for doc_id in candidates:
+                title_grams = self._docs[doc_id][1]
+                similarity = len(title_grams & query_grams) / len(title_grams | query_grams)
+                if similarity >= SIMILARITY_THRESHOLD or doc_id in scores:
+                    scores[doc_id] += similarity
+
+        ranked = sorted(((round(score, 6), doc_id) for doc_id, score in scores.items()), reverse=True)
+        if after is not None:
+            ranked = [key for key in ranked if key < tuple(after)]
+        return ranked[:limit]
+
+
+# Process-wide index used when SEARCH_BACKEND is "memory".
+url_search_index = InvertedIndex()
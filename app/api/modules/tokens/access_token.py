@@ -2,12 +2,15 @@ import datetime
 from functools import wraps
 import jwt
 from fastapi import Header, HTTPException, Depends, FastAPI
+from app.api.modules.metrics.metrics import cache_collector, metrics
+from app.api.modules.tokens.token_cache import TokenCache
+from app.api.settings import get_settings
 
 class JWTAuthentication:
     """
     Helper class for JWT token authentication.
     """
-    def __init__(self, secret_key: str, algorithm: str, expire_minutes: int):
+    def __init__(self, secret_key: str, algorithm: str, expire_minutes: int, cache_size: int = 10000):
         """
         Initialize JWTAuthentication instance.
 
@@ -15,10 +18,25 @@ class JWTAuthentication:
             secret_key (str): Secret key for JWT encoding and decoding.
             algorithm (str): Algorithm used for JWT encoding and decoding.
             expire_minutes (int): Token expiration time in minutes.
+            cache_size (int): Verified tokens kept in memory; 0 disables the cache.
         """
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.expire_minutes = expire_minutes
+        self.cache = TokenCache(max_size=cache_size)
+
+    def rotate_secret(self, secret_key: str) -> None:
+        """
+        Replace the signing secret.
+
+        Tokens verified with the previous secret are dropped from the cache,
+        so they are checked against the new one.
+
+        Args:
+            secret_key (str): The new secret key.
+        """
+        self.secret_key = secret_key
+        self.cache.clear()
 
     def create_token(self, data: dict) -> str:
         """
@@ -41,6 +59,9 @@ class JWTAuthentication:
         """
         Verify and decode a JWT token.
 
+        Tokens that already passed verification are answered from the cache
+        until their expiry.
+
         Args:
             token (str): JWT token to be verified.
 
@@ -50,8 +71,12 @@ class JWTAuthentication:
         Raises:
             HTTPException: If token is expired or invalid.
         """
+        payload = self.cache.get(token)
+        if payload is not None:
+            return payload
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            self.cache.put(token, payload)
             return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token has expired")
@@ -59,7 +84,10 @@ class JWTAuthentication:
             raise HTTPException(status_code=401, detail="Invalid token")
 
 # Initialize JWTAuthentication instance
-auth = JWTAuthentication(secret_key="secret", algorithm="HS256", expire_minutes=30)
+auth = JWTAuthentication(
+    secret_key="secret", algorithm="HS256", expire_minutes=30, cache_size=get_settings().token_cache_size
+)
+metrics.register_collector(cache_collector(auth.cache, "token"))
 
 def get_current_user(authorization: str = Header(...)):
     """
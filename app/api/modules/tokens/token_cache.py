@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from hashlib import sha256
+from math import inf
+from threading import Lock
+from time import time
+from typing import Optional
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified JWT claims.
+
+    Entries are keyed by the SHA-256 of the token, so raw tokens are never
+    kept in memory, and expire at the token's `exp` claim: an expired token
+    is never answered from the cache and falls back to full verification,
+    which rejects it.
+
+    Attributes:
+        max_size (int): Largest number of tokens kept.
+        hits (int): Verifications answered from the cache.
+        misses (int): Verifications that had to decode the token.
+        evictions (int): Entries dropped because they expired or the cache was full.
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int): Largest number of tokens kept; 0 disables the cache.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """
+        Look up the claims of a verified token.
+
+        Args:
+            token (str): The raw JWT.
+
+        Returns:
+            dict: A copy of the claims, or None if the token is not cached or has expired.
+        """
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if time() >= expires_at:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, token: str, claims: dict) -> None:
+        """
+        Remember the claims of a token that passed verification.
+
+        Args:
+            token (str): The raw JWT.
+            claims (dict): Its decoded payload.
+        """
+        if self.max_size <= 0:
+            return
+        key = self._key(token)
+        expires_at = claims.get("exp", inf)
+        with self._lock:
+            self._entries[key] = (dict(claims), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drop every entry, e.g. after the signing secret changed.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Get the current values of the counters.
+
+        Returns:
+            dict: The counters, the number of cached tokens and the hit ratio.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,62 @@
+from fastapi import APIRouter
+from app.api.connections.db import pool_stats, replica_pool_stats
+from app.api.modules.admission.admission_control import admission_stats
+from app.api.modules.crud_reddis.crud_redis_basic import url_cache_stats
+from app.api.modules.crud_reddis.local_cache import url_local_cache
+from app.api.modules.tokens.access_token import auth
+
+router = APIRouter()
+
+"""
+Module for operational routes reporting the state of the service.
+"""
+
+
+@router.get("/cache", response_model=dict)
+async def cache_stats():
+    """
+    Get the hit/miss counters of the URL cache.
+
+    Returns:
+        dict: Redis cache counters and hit ratio for this worker, with the
+        counters of its in-memory cache under `local`.
+    """
+    stats = url_cache_stats.snapshot()
+    stats["local"] = url_local_cache.snapshot()
+    return stats
+
+
+@router.get("/tokens", response_model=dict)
+async def token_cache_stats():
+    """
+    Get the counters of the verified-token cache.
+
+    Returns:
+        dict: Hits, misses, evictions, size and hit ratio for this worker.
+    """
+    return auth.cache.snapshot()
+
+
+@router.get("/pool", response_model=dict)
+async def database_pool_stats():
+    """
+    Get checkout/checkin counters and occupancy of the database pools.
+
+    Returns:
+        dict: Counters and gauges of the primary pool, with one entry per
+        replica pool under `replicas`.
+    """
+    stats = pool_stats.snapshot()
+    stats["replicas"] = [replica.snapshot() for replica in replica_pool_stats]
+    return stats
+
+
+@router.get("/admission", response_model=dict)
+async def admission_control_stats():
+    """
+    Get the counters of the admission control.
+
+    Returns:
+        dict: Requests in flight, shed and rate limited (per router prefix) for this worker.
+    """
+    return admission_stats.snapshot()
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from app.api.modules.metrics.metrics import collect_snapshots, render
+
+router = APIRouter()
+
+"""
+Module for the Prometheus scrape endpoint.
+"""
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(request: Request):
+    """
+    Get the metrics of every worker in the Prometheus text format.
+
+    Any worker can be scraped: it merges its own metrics with those the
+    other workers published to Redis.
+
+    Returns:
+        PlainTextResponse: The exposition, version 0.0.4.
+    """
+    snapshots = await collect_snapshots(request.app.state.redis_manager)
+    return PlainTextResponse(render(snapshots), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,26 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.api.connections.instace import get_db
-from app.api.controllers.controller_url import UrlController
-from app.api.modules.logger_modify import ColoredLogger
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from app.api.connections.instace import get_db, get_redis_manager
+from fastapi.responses import StreamingResponse
+from app.api.controllers.controller_url import EXPORT_FORMATS, UrlController, export_urls, select_fields
+from app.api.models.schemas import (
+    BulkCreateResponse,
+    UrlBatchResponse,
+    UrlCreatedResponse,
+    UrlDeletedResponse,
+    UrlPageResponse,
+    UrlResponse,
+    UrlSchema,
+    UrlSearchResponse,
+)
+from app.api.modules.crud_postgresql.versioning import VersionConflict, etag_matches, make_etag, parse_if_match
+from app.api.modules.logger_modify import get_logger
 from app.api.modules.redis_conf.redis_conf import RedisManager
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.modules.tokens.access_token import get_current_user, auth_required
+from app.api.settings import get_settings
 
 
 router = APIRouter()
-logger = ColoredLogger().get_logger()
+logger = get_logger(__name__)
 
 """
 Module for URL-related routes.
 """
 
 
-@router.post("/url/", response_model=dict)
+@router.post("/url/", response_model=UrlCreatedResponse)
 @auth_required
-def create_url(
+async def create_url(
     url_data: dict,
-    redis_manager: RedisManager = Depends(RedisManager),
-    db: Session = Depends(get_db),
+    redis_manager: RedisManager = Depends(get_redis_manager),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -28,8 +42,8 @@ def create_url(
 
     Args:
         url_data (dict): Data to create the URL.
-        redis_manager (RedisManager, optional): Redis manager instance. Defaults to using dependency.
-        db (Session, optional): Database session. Defaults to using dependency.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
 
     Returns:
         dict: Created URL information.
@@ -38,52 +52,215 @@ def create_url(
         HTTPException: If an error occurs during creation.
     """
     try:
-        controller = UrlController(db, redis_manager)
-        url = controller.create_url(url_data)
+        controller = UrlController(db, redis_manager, actor=current_user.get("sub"))
+        url = await controller.create_url(url_data)
         return url
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/url/{url_id}", response_model=dict)
+@router.post("/bulk", response_model=BulkCreateResponse, response_model_exclude_unset=True)
+@auth_required
+async def create_urls(
+    urls: List[dict],
+    redis_manager: RedisManager = Depends(get_redis_manager),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Create many URLs in one request.
+
+    Args:
+        urls (List[dict]): Data of the URLs to create.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
+
+    Returns:
+        dict: Per-item results in input order, with created and failed counts.
+
+    Raises:
+        HTTPException: If the batch is too large or an error occurs during creation.
+    """
+    try:
+        controller = UrlController(db, redis_manager, actor=current_user.get("sub"))
+        return await controller.create_urls(urls)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@router.get("", response_model=Union[UrlBatchResponse, UrlPageResponse])
+@auth_required
+async def read_urls(
+    ids: Optional[str] = Query(None, description="Comma-separated URL IDs, e.g. 1,2,3"),
+    sort: str = Query("id", description="Listing order: id or rating"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    redis_manager: RedisManager = Depends(get_redis_manager),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Get information about many URLs by their IDs, or list URLs page by page.
+
+    Args:
+        ids (str, optional): Comma-separated IDs of the URLs to retrieve. When
+            omitted, URLs are listed with keyset pagination instead.
+        sort (str, optional): Listing order, "id" or "rating". Defaults to "id".
+        cursor (str, optional): Cursor of the page to list. Defaults to the first page.
+        limit (int, optional): Page size. Defaults to 50.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
+
+    Returns:
+        dict: URL information in requested order, with null for unknown IDs, or
+        a page of URLs with the cursor of the next page.
+
+    Raises:
+        HTTPException: If the parameters are invalid or an error occurs during retrieval.
+    """
+    controller = UrlController(db, redis_manager)
+    if ids is None:
+        try:
+            return await controller.list_urls(sort=sort, cursor=cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        url_ids = [int(url_id) for url_id in ids.split(",") if url_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma-separated list of integers")
+    try:
+        return await controller.read_urls(url_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@router.get("/export")
 @auth_required
-def read_url(
+async def export_url_catalog(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    user_id: Optional[int] = Query(None, description="Only export the URLs of this user"),
+    since_id: Optional[int] = Query(None, description="Only export URLs with a greater ID"),
+    db: AsyncSession = Depends(get_db, scope="request"),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Export the URL catalog as a stream.
+
+    Args:
+        export_format (str, optional): "ndjson" (one JSON object per line) or "csv". Defaults to "ndjson".
+        user_id (int, optional): Only export the URLs of this user.
+        since_id (int, optional): Watermark for incremental exports; only greater IDs are exported.
+        db (AsyncSession, optional): Database session, kept open until the stream ends. Defaults to using dependency.
+
+    Returns:
+        StreamingResponse: The URLs in ID order.
+    """
+    return StreamingResponse(
+        export_urls(db, export_format, user_id=user_id, since_id=since_id),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="urls.{export_format}"'},
+    )
+
+
+@router.get("/search", response_model=UrlSearchResponse)
+@auth_required
+async def search_urls(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    redis_manager: RedisManager = Depends(get_redis_manager),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Search URLs by relevance over title, description and author.
+
+    Args:
+        q (str): Search text; misspelled titles are matched by similarity.
+        cursor (str, optional): Cursor of the page to list. Defaults to the first page.
+        limit (int, optional): Page size. Defaults to 20.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
+
+    Returns:
+        dict: Matching URLs with their score, best first, and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is invalid or an error occurs during the search.
+    """
+    try:
+        controller = UrlController(db, redis_manager)
+        return await controller.search_urls(q, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/url/{url_id}", response_model=UrlResponse, response_model_exclude_unset=True)
+@auth_required
+async def read_url(
     url_id: int,
-    redis_manager: RedisManager = Depends(RedisManager),
-    db: Session = Depends(get_db),
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    if_none_match: Optional[str] = Header(None, description="ETag of the copy the client holds"),
+    redis_manager: RedisManager = Depends(get_redis_manager),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """
     Get information about a URL by its ID.
 
+    The response carries an ETag built from the URL's version, which is
+    cached with the URL. If it matches If-None-Match, 304 is answered
+    without serializing the URL.
+
     Args:
         url_id (int): ID of the URL to retrieve.
-        redis_manager (RedisManager, optional): Redis manager instance. Defaults to using dependency.
-        db (Session, optional): Database session. Defaults to using dependency.
+        response (Response): The response, to set the ETag and Cache-Control headers.
+        fields (str, optional): Comma-separated columns to return. Defaults to all of them.
+        if_none_match (str, optional): ETag of the copy the client holds.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
 
     Returns:
-        dict: URL information.
+        dict: URL information, or an empty 304 response.
 
     Raises:
-        HTTPException: If URL is not found or an error occurs during retrieval.
+        HTTPException: If a field is unknown, the URL is not found or an error occurs during retrieval.
     """
+    try:
+        selected = select_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The version is needed for the ETag even when it was not asked for.
+    read_fields = selected if selected is None or "version" in selected else [*selected, "version"]
     try:
         controller = UrlController(db, redis_manager)
-        url = controller.read_url(url_id)
-        return url
+        url = await controller.read_url(url_id, fields=read_fields)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    etag = make_etag(url["result"].get("version"), selected)
+    cache_control = get_settings().cache_control
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    if read_fields is not selected:
+        url = {"result": {field: value for field, value in url["result"].items() if field != "version"}}
+    if etag:
+        response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return url
+
 
-@router.put("/url/{url_id}", response_model=dict)
+@router.put("/url/{url_id}", response_model=UrlSchema)
 @auth_required
-def update_url(
+async def update_url(
     url_id: int,
     url_data: dict,
-    redis_manager: RedisManager = Depends(RedisManager),
-    db: Session = Depends(get_db),
+    if_match: Optional[str] = Header(None, description="Version the URL must still have"),
+    redis_manager: RedisManager = Depends(get_redis_manager),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -92,31 +269,44 @@ def update_url(
     Args:
         url_id (int): ID of the URL to update.
         url_data (dict): New data for the URL.
-        redis_manager (RedisManager, optional): Redis manager instance. Defaults to using dependency.
-        db (Session, optional): Database session. Defaults to using dependency.
+        if_match (str, optional): Version the URL must still have. Defaults to updating unconditionally.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
 
     Returns:
-        dict: Status message or updated URL information.
+        dict: The updated URL, with its new version.
 
     Raises:
-        HTTPException: If URL is not found or an error occurs during update.
+        HTTPException: If If-Match is invalid or outdated, a field cannot be updated, the URL is not found
+            or an error occurs during update.
     """
     try:
-        controller = UrlController(db, redis_manager)
-        updated = controller.update_url(url_id, url_data)
-        if updated:
-            return {"message": "URL updated successfully"}
-        raise HTTPException(status_code=404, detail="URL not found")
+        expected_version = parse_if_match(if_match)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        controller = UrlController(db, redis_manager, actor=current_user.get("sub"))
+        updated = await controller.update_url(url_id, url_data, expected_version=expected_version)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except VersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if updated is None:
+        raise HTTPException(status_code=404, detail="URL not found")
+    return updated
 
 
-@router.delete("/url/{url_id}", response_model=dict)
+@router.delete("/url/{url_id}", response_model=UrlDeletedResponse)
 @auth_required
-def delete_url(
+async def delete_url(
     url_id: int,
-    redis_manager: RedisManager = Depends(RedisManager),
-    db: Session = Depends(get_db),
+    if_match: Optional[str] = Header(None, description="Version the URL must still have"),
+    redis_manager: RedisManager = Depends(get_redis_manager),
+    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -124,20 +314,29 @@ def delete_url(
 
     Args:
         url_id (int): ID of the URL to delete.
-        redis_manager (RedisManager, optional): Redis manager instance. Defaults to using dependency.
-        db (Session, optional): Database session. Defaults to using dependency.
+        if_match (str, optional): Version the URL must still have. Defaults to deleting unconditionally.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
 
     Returns:
-        dict: Status message indicating success or failure.
+        dict: The ID of the deleted URL and a status message.
 
     Raises:
-        HTTPException: If URL is not found or an error occurs during deletion.
+        HTTPException: If If-Match is invalid or outdated, the URL is not found or an error occurs during deletion.
     """
     try:
-        controller = UrlController(db, redis_manager)
-        deleted = controller.delete_url(url_id)
-        if deleted:
-            return {"message": "URL deleted successfully"}
-        raise HTTPException(status_code=404, detail="URL not found")
+        expected_version = parse_if_match(if_match)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        controller = UrlController(db, redis_manager, actor=current_user.get("sub"))
+        deleted = await controller.delete_url(url_id, expected_version=expected_version)
+    except VersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="URL not found")
+    return {"id": url_id, "message": "URL deleted successfully"}
@@ -1,41 +1,32 @@
-from fastapi import APIRouter, Depends, Form, HTTPException, Header, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Form, HTTPException, Header, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.api.connections.instace import get_db
-from app.api.models.model import User
-from app.api.modules.logger_modify import ColoredLogger
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.connections.instace import get_db, get_redis_manager
+from app.api.models.schemas import UrlPageResponse, UserSchema
+from app.api.modules.crud_postgresql.versioning import VersionConflict, etag_matches, make_etag, parse_if_match
+from app.api.modules.logger_modify import get_logger
+from app.api.modules.passwords.password_hasher import PasswordPoolBusy, password_hasher
 from app.api.modules.redis_conf.redis_conf import RedisManager
 from app.api.controllers.controller_users import UserController
-from app.api.modules.crud_reddis.crud_redis_basic import CrudRedis
+from app.api.controllers.controller_url import UrlController
 from app.api.modules.tokens.access_token import get_current_user, auth_required, auth
+from app.api.settings import get_settings
 
 router = APIRouter()
-logger = ColoredLogger().get_logger()
+logger = get_logger(__name__)
 
 """
 Module for user-related routes.
 """
 
 
-def get_redis_manager(redis: RedisManager = Depends(RedisManager)):
-    """
-    Get a Redis manager instance using dependency injection.
-
-    Args:
-        redis (RedisManager, optional): Redis manager instance. Defaults to using dependency.
-
-    Returns:
-        CrudRedis: Redis manager instance.
-    """
-    return CrudRedis(redis)
-
-
-@router.post("/user/", response_model=dict)
+@router.post("/user/", response_model=UserSchema)
 @auth_required
-def create_user(
+async def create_user(
     user_data: dict = Form(...),
-    db: Session = Depends(get_db),
-    redis_manager: CrudRedis = Depends(get_redis_manager),
+    db: AsyncSession = Depends(get_db),
+    redis_manager: RedisManager = Depends(get_redis_manager),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -43,59 +34,119 @@ def create_user(
 
     Args:
         user_data (dict): Data to create the user.
-        db (Session, optional): Database session. Defaults to using dependency.
-        redis_manager (CrudRedis, optional): Redis manager instance. Defaults to using dependency.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
 
     Returns:
-        dict: Created user information.
+        UserSchema: Created user information, without the password.
 
     Raises:
         HTTPException: If an error occurs during creation.
     """
     try:
         controller = UserController(db, redis_manager)
-        return controller.create_user(user_data)
+        return await controller.create_user(user_data)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many password operations", headers={"Retry-After": "1"})
     except Exception as e:
         logger.error("Error creating user: %s", str(e))
         raise HTTPException(status_code=500, detail="Error creating user")
 
 
-@router.get("/user/{user_id}", response_model=dict)
+@router.get("/user/{user_id}", response_model=UserSchema)
 @auth_required
-def read_user(
+async def read_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    redis_manager: CrudRedis = Depends(get_redis_manager),
+    response: Response,
+    if_none_match: Optional[str] = Header(None, description="ETag of the copy the client holds"),
+    db: AsyncSession = Depends(get_db),
+    redis_manager: RedisManager = Depends(get_redis_manager),
     current_user: dict = Depends(get_current_user),
 ):
     """
     Get information about a user by its ID.
 
+    The response carries the user's version as its ETag. If it matches
+    If-None-Match, 304 is answered from the version kept in Redis, without
+    querying the database.
+
     Args:
         user_id (int): ID of the user to retrieve.
-        db (Session, optional): Database session. Defaults to using dependency.
-        redis_manager (CrudRedis, optional): Redis manager instance. Defaults to using dependency.
+        response (Response): The response, to set the ETag and Cache-Control headers.
+        if_none_match (str, optional): ETag of the copy the client holds.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
 
     Returns:
-        dict: User information.
+        UserSchema: User information, without the password, or an empty 304 response.
 
     Raises:
         HTTPException: If user is not found or an error occurs during retrieval.
     """
+    cache_control = get_settings().cache_control
     try:
         controller = UserController(db, redis_manager)
-        return controller.read_user(user_id)
+        if if_none_match:
+            etag = make_etag(await controller.cached_version(user_id))
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+        user = await controller.read_user(user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Error reading user: %s", str(e))
         raise HTTPException(status_code=500, detail="Error reading user")
+    etag = make_etag(user.version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return user
+
+
+@router.get("/{user_id}/urls", response_model=UrlPageResponse)
+@auth_required
+async def read_user_urls(
+    user_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    redis_manager: RedisManager = Depends(get_redis_manager),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    List the URLs of a user page by page.
+
+    Args:
+        user_id (int): ID of the owner.
+        cursor (str, optional): Cursor of the page to list. Defaults to the first page.
+        limit (int, optional): Page size. Defaults to 50.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
+
+    Returns:
+        dict: A page of URLs and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is invalid or an error occurs during retrieval.
+    """
+    try:
+        controller = UrlController(db, redis_manager)
+        return await controller.list_user_urls(user_id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.put("/user/{user_id}", response_model=bool)
 @auth_required
-def update_user(
+async def update_user(
     user_id: int,
     new_data: dict,
-    db: Session = Depends(get_db),
+    if_match: Optional[str] = Header(None, description="Version the user must still have"),
+    db: AsyncSession = Depends(get_db),
+    redis_manager: RedisManager = Depends(get_redis_manager),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -104,17 +155,27 @@ def update_user(
     Args:
         user_id (int): ID of the user to update.
         new_data (dict): New data for the user.
-        db (Session, optional): Database session. Defaults to using dependency.
+        if_match (str, optional): Version the user must still have. Defaults to updating unconditionally.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
 
     Returns:
         bool: True if user is updated successfully, False otherwise.
 
     Raises:
-        HTTPException: If user is not found or an error occurs during update.
+        HTTPException: If If-Match is invalid or outdated, or an error occurs during update.
     """
     try:
-        controller = UserController(db, get_redis_manager())
-        return controller.update_user(user_id, new_data)
+        expected_version = parse_if_match(if_match)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        controller = UserController(db, redis_manager)
+        return await controller.update_user(user_id, new_data, expected_version=expected_version)
+    except VersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many password operations", headers={"Retry-After": "1"})
     except Exception as e:
         logger.error("Error updating user: %s", str(e))
         raise HTTPException(status_code=500, detail="Error updating user")
@@ -124,7 +185,9 @@ def update_user(
 @auth_required
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    if_match: Optional[str] = Header(None, description="Version the user must still have"),
+    db: AsyncSession = Depends(get_db),
+    redis_manager: RedisManager = Depends(get_redis_manager),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -132,30 +195,49 @@ async def delete_user(
 
     Args:
         user_id (int): ID of the user to delete.
+        if_match (str, optional): Version the user must still have. Defaults to deleting unconditionally.
         current_user (dict): Decoded JWT payload of the current user.
-        db (Session, optional): Database session. Defaults to using dependency.
+        db (AsyncSession, optional): Database session. Defaults to using dependency.
+        redis_manager (RedisManager, optional): Shared Redis manager. Defaults to using dependency.
 
     Returns:
         bool: True if user is deleted successfully, False otherwise.
 
     Raises:
-        HTTPException: If user is not found or an error occurs during deletion.
+        HTTPException: If If-Match is invalid or outdated, or an error occurs during deletion.
     """
     try:
-        controller = UserController(db, get_redis_manager())
-        return controller.delete_user(user_id)
+        expected_version = parse_if_match(if_match)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        controller = UserController(db, redis_manager)
+        return await controller.delete_user(user_id, expected_version=expected_version)
+    except VersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except Exception as e:
         logger.error("Error deleting user: %s", str(e))
         raise HTTPException(status_code=500, detail="Error deleting user")
 
 
 @router.post("/login")
-def login(
-    username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)
+async def login(
+    username: str = Form(...),
+    password: str = Form(...),
+    db: AsyncSession = Depends(get_db),
+    redis_manager: RedisManager = Depends(get_redis_manager),
 ):
-    user = db.query(User).filter(User.username == username).first()
-    if user is None or user.password != password:
+    controller = UserController(db, redis_manager)
+    user = await controller.user_repo.read_user_by_username(username)
+    try:
+        valid, new_hash = await password_hasher.verify(password, user.password if user else None)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many password operations", headers={"Retry-After": "1"})
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Plaintext or outdated hash: store it with the preferred scheme.
+        await controller.rehash_password(user, new_hash)
 
     token = auth.create_token({"sub": username})
     return {"access_token": token, "token_type": "bearer"}
@@ -0,0 +1,178 @@
+from functools import lru_cache
+from os import getenv
+from typing import Dict, List
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """
+    Runtime configuration of the API.
+
+    Every field can be set through an environment variable of the same name
+    (case-insensitive), or through a dotenv file whose path is given by
+    BOOKAPI_ENV_FILE (defaults to `.env` in the working directory). Environment
+    variables take precedence over the file.
+
+    Attributes:
+        database_url (str): SQLAlchemy URL of the primary database.
+        db_pool_size (int): Connections kept open in the engine pool.
+        db_max_overflow (int): Extra connections allowed above `db_pool_size` during bursts.
+        db_pool_timeout (float): Seconds a request waits for a free connection before failing.
+        db_pool_recycle (int): Seconds after which a pooled connection is replaced.
+        db_pool_pre_ping (bool): Test connections for liveness on checkout.
+        db_statement_timeout_ms (int): Postgres `statement_timeout` for every connection, 0 disables it.
+        db_replica_urls (str): Comma-separated SQLAlchemy URLs of read replicas, empty for none.
+        db_replica_strategy (str): How reads are spread over replicas, "round_robin" or "least_latency".
+        db_read_your_writes_window (float): Seconds a client keeps reading from the primary after a write.
+        bulk_max_items (int): Largest number of URLs accepted by one bulk request.
+        bulk_copy_threshold (int): Batch size from which bulk inserts use COPY.
+        multi_get_max_ids (int): Largest number of IDs accepted by one multi-get request.
+        export_batch_size (int): Rows fetched per round trip by the streaming export.
+        search_backend (str): "postgres" for tsvector/pg_trgm search, or "memory" for the
+            in-process inverted index (testing without Postgres).
+        token_cache_size (int): Verified JWTs kept in memory per worker, 0 disables the cache.
+        password_schemes (str): Comma-separated passlib schemes; the first hashes new passwords,
+            the others are still accepted and upgraded on login.
+        password_hash_workers (int): Threads hashing and verifying passwords per worker.
+        password_max_pending (int): Password operations running or queued before answering 503.
+        url_cache_ttl (int): Seconds a cached URL is fresh.
+        url_cache_ttl_jitter (float): Random spread applied to `url_cache_ttl`, as a fraction (0.1 is ±10%).
+        url_cache_stale_ttl (int): Seconds an expired URL stays in Redis to be served while it is rebuilt.
+        url_cache_negative_ttl (int): Seconds an unknown URL ID is cached as missing.
+        url_cache_xfetch_beta (float): Eagerness of early refresh; 0 refreshes only at expiry.
+        url_cache_lock_ms (int): Lifetime of the lock held by the worker rebuilding an entry.
+        url_cache_lock_wait_ms (int): Milliseconds a cold miss waits for another worker's rebuild.
+        url_cache_codec (str): Serializer of cached values: "json" (readable by every release),
+            "orjson" or "msgpack".
+        url_cache_compression (str): "zstd" or "lz4" to compress large cached values, "" for none.
+        url_cache_compression_threshold (int): Smallest value, in bytes, that is compressed.
+        max_in_flight (int): Requests a worker handles at once before answering 503; 0 disables the cap.
+        rate_limits (Dict[str, int]): Requests per subject and window, per router prefix
+            (e.g. {"/urls": 600}); prefixes not listed are not limited.
+        rate_limit_window (int): Length in seconds of the rate limit sliding window.
+        cache_control (str): Cache-Control header of the URL and user reads, which carry an ETag.
+        l1_cache_size (int): URLs kept in memory by each worker in front of Redis, 0 disables it.
+        l1_cache_ttl (float): Seconds a worker serves a URL from memory; bounds staleness if an
+            invalidation is lost.
+        l1_invalidation_channel (str): Redis pub/sub channel carrying URL invalidations.
+        metrics_key (str): Redis hash where every worker publishes its metrics for /metrics.
+        metrics_publish_interval (float): Seconds between two publications of a worker's metrics.
+        server_timing (bool): Send the SQL and Redis time of each request in a Server-Timing header.
+        slow_query_ms (float): Statements slower than this go to the slow-query log; 0 disables it.
+        query_budget (int): SQL statements a request may run before a warning is logged; 0 disables it.
+        query_budget_strict (bool): Fail requests going over `query_budget` instead, for tests.
+        audit_enabled (bool): Publish URL mutations to the audit stream.
+        audit_stream (str): Redis Stream receiving the audit events.
+        audit_stream_maxlen (int): Approximate number of events kept in the stream.
+        audit_group (str): Consumer group of the audit workers.
+        audit_batch_size (int): Events read and inserted at a time by a worker.
+        audit_block_ms (int): Milliseconds a worker waits for new events.
+        audit_claim_idle_ms (int): Milliseconds after which events pending on another worker are taken over.
+        log_level (str): Level of the `app` loggers.
+        log_levels (str): Per-logger overrides, e.g. "app.api.routers=WARNING,app.api.tools=DEBUG".
+        log_format (str): "json" (one object per line) or "color" for local development.
+        log_sample_rates (Dict[str, float]): Fraction of records kept per message template, as
+            JSON, e.g. '{"URL retrieved: %s": 0.01}'. Warnings and errors are always kept.
+        redis_host (str): The host where the Redis server is running.
+        redis_port (int): The port on which the Redis server is listening.
+        redis_db (int): The Redis database number to use.
+        redis_max_connections (int): Maximum number of pooled Redis connections.
+        redis_socket_timeout (float): Seconds to wait for a Redis reply.
+        redis_connect_timeout (float): Seconds to wait for a new Redis connection.
+        redis_health_check_interval (int): Seconds between Redis connection health checks.
+        redis_socket_keepalive (bool): Enable TCP keepalive on Redis sockets.
+    """
+
+    model_config = SettingsConfigDict(env_file_encoding="utf-8", extra="ignore")
+
+    database_url: str = "postgresql+asyncpg://postgres@localhost/urluser"
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 5.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 5000
+    db_replica_urls: str = ""
+    db_replica_strategy: str = "round_robin"
+    db_read_your_writes_window: float = 5.0
+
+    bulk_max_items: int = 10000
+    bulk_copy_threshold: int = 5000
+    multi_get_max_ids: int = 500
+    search_backend: str = "postgres"
+    export_batch_size: int = 1000
+    token_cache_size: int = 10000
+    password_schemes: str = "argon2,bcrypt"
+    password_hash_workers: int = 4
+    password_max_pending: int = 32
+
+    url_cache_ttl: int = 3600
+    url_cache_ttl_jitter: float = 0.1
+    url_cache_stale_ttl: int = 300
+    url_cache_negative_ttl: int = 60
+    url_cache_xfetch_beta: float = 1.0
+    url_cache_lock_ms: int = 2000
+    url_cache_lock_wait_ms: int = 200
+    url_cache_codec: str = "json"
+    url_cache_compression: str = ""
+    url_cache_compression_threshold: int = 1024
+
+    max_in_flight: int = 256
+    rate_limits: Dict[str, int] = {"/urls": 600, "/users": 120}
+    rate_limit_window: int = 60
+
+    cache_control: str = "private, no-cache"
+
+    l1_cache_size: int = 5000
+    l1_cache_ttl: float = 30.0
+    l1_invalidation_channel: str = "url_cache:invalidate"
+
+    metrics_key: str = "metrics:workers"
+    metrics_publish_interval: float = 5.0
+    server_timing: bool = True
+    slow_query_ms: float = 200.0
+    query_budget: int = 0
+    query_budget_strict: bool = False
+
+    audit_enabled: bool = True
+    audit_stream: str = "audit:urls"
+    audit_stream_maxlen: int = 1000000
+    audit_group: str = "audit-writers"
+    audit_batch_size: int = 1000
+    audit_block_ms: int = 5000
+    audit_claim_idle_ms: int = 60000
+
+    log_level: str = "INFO"
+    log_levels: str = ""
+    log_format: str = "json"
+    log_sample_rates: Dict[str, float] = {}
+
+    redis_host: str = "localhost"
+    redis_port: int = 6379
+    redis_db: int = 0
+    redis_max_connections: int = 50
+    redis_socket_timeout: float = 1.0
+    redis_connect_timeout: float = 1.0
+    redis_health_check_interval: int = 30
+    redis_socket_keepalive: bool = True
+
+    @property
+    def replica_urls(self) -> List[str]:
+        """
+        The configured replica URLs as a list.
+
+        Returns:
+            List[str]: One URL per replica.
+        """
+        return [url.strip() for url in self.db_replica_urls.split(",") if url.strip()]
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Load the settings once per process.
+
+    Returns:
+        Settings: The configuration read from the environment and the dotenv file.
+    """
+    return Settings(_env_file=getenv("BOOKAPI_ENV_FILE", ".env"))
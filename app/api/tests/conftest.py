@@ -0,0 +1,90 @@
+import asyncio
+from os import getenv
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.api.connections.db import Base
+from app.api.connections.instace import get_db
+from app.api.modules.tokens.access_token import auth
+from app.api.routers.url_routers import router as url_router
+from app.api.routers.user_routers import router as user_router
+
+
+class FakeRedisManager:
+    """
+    Stands in for RedisManager with an in-memory Redis (with Lua scripting).
+    """
+
+    def __init__(self, client=None) -> None:
+        self.client = client or fakeredis.FakeAsyncRedis()
+
+    def get_client(self):
+        return self.client
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def redis_manager():
+    return FakeRedisManager()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A local SQLite database with the schema, opened with aiosqlite. NullPool
+    # keeps connections from outliving the event loop of each asyncio.run.
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+
+    async def create_schema():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+
+@pytest.fixture
+def api(session_factory, redis_manager):
+    # The URL and user routes on the SQLite database and the in-memory Redis,
+    # with a token of an admin sent on every request.
+    app = FastAPI()
+    app.include_router(user_router, prefix="/users")
+    app.include_router(url_router, prefix="/urls")
+    app.state.redis_manager = redis_manager
+
+    async def get_test_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_test_db
+    token = auth.create_token({"sub": "admin", "role": "admin"})
+    with TestClient(app, headers={"Authorization": f"Bearer {token}"}) as client:
+        yield client
+
+# Database used by the tests of Postgres-only paths (COPY); they are skipped
+# when it cannot be reached.
+POSTGRES_TEST_URL = getenv("POSTGRES_TEST_URL", "postgresql+asyncpg://postgres@localhost/urluser")
+
+
+@pytest.fixture
+def postgres_engine():
+    asyncpg = pytest.importorskip("asyncpg")
+    engine = create_async_engine(POSTGRES_TEST_URL, poolclass=NullPool)
+
+    async def reset_schema():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    try:
+        asyncio.run(reset_schema())
+    except (OSError, asyncpg.PostgresError) as e:
+        pytest.skip(f"Postgres is not available: {e}")
+    yield engine
+    asyncio.run(engine.dispose())
@@ -0,0 +1,59 @@
+import asyncio
+from time import time
+import jwt
+import pytest
+from app.api.modules.admission.admission_control import AdmissionControl, limit_for, subject_of
+from app.api.modules.tokens.access_token import auth
+
+
+def test_limits_apply_per_router_prefix():
+    limits = {"/urls": 600, "/users": 120}
+
+    assert limit_for("/urls/url/1", limits) == ("/urls", 600)
+    assert limit_for("/users", limits) == ("/users", 120)
+    assert limit_for("/urlsx", limits) is None
+    assert limit_for("/health/cache", limits) is None
+
+
+def test_requests_over_the_in_flight_cap_are_shed():
+    release = asyncio.Event()
+    statuses = []
+
+    async def app(scope, receive, send):
+        await release.wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append((message["status"], dict(message["headers"]).get(b"retry-after")))
+
+    async def run():
+        middleware = AdmissionControl(app)
+        middleware.max_in_flight = 1
+        middleware.limits = {}
+        scope = {"type": "http", "path": "/urls/url/1", "headers": []}
+        first = asyncio.create_task(middleware(scope, None, send))
+        await asyncio.sleep(0)
+        await middleware(scope, None, send)
+        release.set()
+        await first
+        return middleware.stats.snapshot()
+
+    stats = asyncio.run(run())
+
+    assert statuses == [(503, b"1")]
+    assert stats["shed"] >= 1
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        jwt.encode({"sub": "early", "nbf": int(time()) + 3600}, auth.secret_key, algorithm=auth.algorithm),
+        jwt.encode({"sub": "other", "aud": "elsewhere"}, auth.secret_key, algorithm=auth.algorithm),
+        "not.a.token",
+    ],
+)
+def test_unusable_tokens_are_limited_by_address(token):
+    scope = {"headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("10.0.0.1", 1234)}
+
+    assert subject_of(scope) == "ip:10.0.0.1"
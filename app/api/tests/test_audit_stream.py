@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from app.api.modules.crud_reddis.audit_stream import AuditStream
+from app.api.settings import get_settings
+from app.api.tests.conftest import FakeRedisManager
+from app.api.tools import audit_worker
+from app.api.tools.audit_worker import to_row
+
+
+def test_events_round_trip_to_audit_rows():
+    audit = AuditStream(redis=None, actor="editor")
+    entry = audit.event("update", 7, {"id": 7, "rating": 5})
+
+    fields = {key.encode(): str(value).encode() for key, value in entry.items()}
+    row = to_row(b"1700000000123-4", fields)
+
+    assert row == {
+        "event_id": "1700000000123-4",
+        "created_at": datetime(2023, 11, 14, 22, 13, 20, 123000, tzinfo=timezone.utc),
+        "action": "update",
+        "url_id": 7,
+        "actor": "editor",
+        "data": {"rating": 5},
+    }
+
+
+def test_delete_events_carry_no_data():
+    row = to_row("1700000000000-0", AuditStream(redis=None).event("delete", 7))
+
+    assert row["data"] is None
+    assert row["actor"] is None
+
+
+class FlakyRedis:
+    # Fails the first blocking read of new entries with `error`.
+    def __init__(self, client, error) -> None:
+        self.client = client
+        self.error = error
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def xreadgroup(self, group, consumer, streams, **kwargs):
+        if self.error is not None and ">" in streams.values():
+            error, self.error = self.error, None
+            raise error
+        return await self.client.xreadgroup(group, consumer, streams, **kwargs)
+
+
+class FakeAuditRepository:
+    stored = []
+
+    def __init__(self, db) -> None:
+        pass
+
+    async def ensure_partitions(self):
+        pass
+
+    async def insert_events(self, rows):
+        self.stored.extend(rows)
+
+
+async def _noop():
+    pass
+
+
+class FakeDBContext:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+@pytest.mark.parametrize("error", [RedisTimeoutError("Timeout reading"), RedisConnectionError("Connection reset")])
+def test_worker_survives_redis_read_errors(monkeypatch, error):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "audit_block_ms", 10)
+    monkeypatch.setattr(settings, "audit_claim_idle_ms", 0)
+    monkeypatch.setattr(audit_worker, "RECONNECT_DELAY", 0)
+    monkeypatch.setattr(audit_worker, "DBContext", FakeDBContext)
+    monkeypatch.setattr(audit_worker, "AuditRepository", FakeAuditRepository)
+    monkeypatch.setattr(audit_worker, "engine", SimpleNamespace(dispose=_noop))
+    FakeAuditRepository.stored = []
+    client = fakeredis.FakeAsyncRedis()
+    manager = FakeRedisManager(FlakyRedis(client, error))
+    monkeypatch.setattr(audit_worker.RedisManager, "from_settings", classmethod(lambda cls, *args, **kwargs: manager))
+
+    async def scenario():
+        # An event left pending by a consumer that died.
+        await client.xgroup_create(settings.audit_stream, settings.audit_group, id="0", mkstream=True)
+        await client.xadd(settings.audit_stream, AuditStream(redis=None).event("delete", 7))
+        await client.xreadgroup(settings.audit_group, "dead", {settings.audit_stream: ">"})
+        return await audit_worker.run_worker("alive", once=True)
+
+    assert asyncio.run(scenario()) == 1
+    assert [row["url_id"] for row in FakeAuditRepository.stored] == [7]
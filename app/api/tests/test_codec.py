@@ -0,0 +1,34 @@
+import pytest
+from app.api.modules.crud_reddis.codec import MAGIC, ValueCodec
+
+
+def test_json_codec_writes_plain_json():
+    assert ValueCodec("json").encode({"a": 1}) == b'{"a": 1}'
+
+
+@pytest.mark.parametrize("name", ["json", "orjson"])
+def test_values_round_trip(name):
+    codec = ValueCodec(name)
+    for value in ("título", 5, None, {"a": [1, 2]}):
+        assert codec.decode(codec.encode(value)) == value
+
+
+def test_legacy_json_is_readable_by_binary_codecs():
+    assert ValueCodec("orjson").decode(b'"long description"') == "long description"
+
+
+def test_large_values_are_compressed_above_threshold():
+    pytest.importorskip("zstandard")
+    codec = ValueCodec("orjson", "zstd", compression_threshold=100)
+    value = "description " * 100
+
+    encoded = codec.encode(value)
+
+    assert len(encoded) < len(value)
+    assert codec.encode("short")[1] != encoded[1]
+    assert ValueCodec("json").decode(encoded) == value
+
+
+def test_unknown_formats_are_rejected():
+    with pytest.raises(ValueError):
+        ValueCodec("orjson").decode(MAGIC + b"\xff{}")
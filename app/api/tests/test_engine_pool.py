@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+from sqlalchemy import text
+from app.api.connections import db
+from app.api.connections.db import PoolStats, build_engine
+
+SETTINGS = SimpleNamespace(
+    db_pool_size=3,
+    db_max_overflow=2,
+    db_pool_timeout=1.5,
+    db_pool_recycle=60,
+    db_pool_pre_ping=True,
+    db_statement_timeout_ms=250,
+)
+NO_TIMEOUT = SimpleNamespace(**{**vars(SETTINGS), "db_statement_timeout_ms": 0})
+
+
+def test_the_engine_is_configured_from_the_settings(monkeypatch):
+    calls = []
+    monkeypatch.setattr(db, "create_async_engine", lambda url, **kwargs: calls.append((url, kwargs)))
+
+    build_engine("postgresql+asyncpg://primary/urluser", SETTINGS)
+    build_engine("postgresql+asyncpg://replica/urluser", NO_TIMEOUT)
+
+    assert calls == [
+        (
+            "postgresql+asyncpg://primary/urluser",
+            {
+                "pool_size": 3,
+                "max_overflow": 2,
+                "pool_timeout": 1.5,
+                "pool_recycle": 60,
+                "pool_pre_ping": True,
+                "connect_args": {"server_settings": {"statement_timeout": "250"}},
+            },
+        ),
+        (
+            "postgresql+asyncpg://replica/urluser",
+            {
+                "pool_size": 3,
+                "max_overflow": 2,
+                "pool_timeout": 1.5,
+                "pool_recycle": 60,
+                "pool_pre_ping": True,
+                "connect_args": {},
+            },
+        ),
+    ]
+
+
+def test_pool_stats_count_checkouts_and_report_occupancy(tmp_path):
+    # server_settings is asyncpg-only, so the statement timeout stays off on SQLite.
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", NO_TIMEOUT)
+    stats = PoolStats(engine)
+
+    async def scenario():
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(text("SELECT 1"))
+            await second.execute(text("SELECT 1"))
+            during = stats.snapshot()
+        async with engine.connect() as third:
+            await third.execute(text("SELECT 1"))
+        after = stats.snapshot()
+        await engine.dispose()
+        return during, after
+
+    during, after = asyncio.run(scenario())
+
+    assert during == {
+        "connects": 2,
+        "checkouts": 2,
+        "checkins": 0,
+        "invalidated": 0,
+        "size": 3,
+        "checked_out": 2,
+        "overflow": -1,  # Counts up from -pool_size as connections are opened.
+    }
+    # The third checkout reuses a pooled connection.
+    assert (after["connects"], after["checkouts"], after["checkins"], after["checked_out"]) == (2, 3, 3, 0)
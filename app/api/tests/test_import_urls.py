@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+import fakeredis
+import pandas as pd
+import pytest
+from redis import RedisError
+from sqlalchemy import func, select
+from app.api.models.model import Urls
+from app.api.tests.conftest import FakeRedisManager
+from app.api.tools import import_urls as import_urls_module
+from app.api.tools.import_urls import import_urls, normalize_chunk, read_chunks, to_rows
+
+
+def test_normalize_strips_text_and_converts_integers():
+    chunk = pd.DataFrame({"title": ["  Dune ", ""], "rating": ["5", None], "extra": ["x", "y"]})
+
+    valid, rejected = normalize_chunk(chunk)
+
+    assert rejected.empty
+    assert list(valid.columns) == ["title", "description", "author", "rating", "user_id"]
+    assert to_rows(valid) == [
+        {"title": "Dune", "description": None, "author": None, "rating": 5, "user_id": None},
+        {"title": None, "description": None, "author": None, "rating": None, "user_id": None},
+    ]
+
+
+def test_normalize_rejects_values_that_do_not_fit():
+    chunk = pd.DataFrame({"title": ["ok", "t" * 101, "ok", "ok"], "rating": ["1", "1", "x", "1.5"]})
+
+    valid, rejected = normalize_chunk(chunk)
+
+    assert list(valid.index) == [0]
+    assert rejected.to_dict() == {
+        1: "Field title is longer than 100 characters",
+        2: "Field rating must be an integer",
+        3: "Field rating must be an integer",
+    }
+
+
+def test_read_chunks_skips_checkpointed_rows(tmp_path):
+    source = tmp_path / "catalog.csv"
+    source.write_text("title\n" + "".join(f"book {i}\n" for i in range(5)))
+
+    chunks = list(read_chunks(source, chunk_size=2, skip=3))
+
+    assert [list(chunk.index) for chunk in chunks] == [[3], [4]]
+    assert chunks[0]["title"].tolist() == ["book 3"]
+
+
+class FailingRedis(fakeredis.FakeAsyncRedis):
+    # Fails every pipeline with `error`.
+    def __init__(self, error) -> None:
+        super().__init__()
+        self.error = error
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipeline = super().pipeline(transaction, shard_hint)
+        pipeline.execute = self.fail
+        return pipeline
+
+    async def fail(self, raise_on_error=True):
+        raise self.error
+
+
+async def _noop():
+    pass
+
+
+def _count_urls(session_factory) -> int:
+    async def count():
+        async with session_factory() as db:
+            return (await db.execute(select(func.count()).select_from(Urls))).scalar()
+
+    return asyncio.run(count())
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch, session_factory):
+    monkeypatch.setattr(import_urls_module, "DBContext", session_factory)
+    monkeypatch.setattr(import_urls_module, "engine", SimpleNamespace(dispose=_noop))
+    source = tmp_path / "catalog.csv"
+    source.write_text("title\n" + "".join(f"book {i}\n" for i in range(4)))
+    return source
+
+
+def use_redis(monkeypatch, client) -> None:
+    manager = FakeRedisManager(client)
+    monkeypatch.setattr(import_urls_module.RedisManager, "from_settings", classmethod(lambda cls, *args, **kwargs: manager))
+
+
+def test_redis_failure_does_not_stop_the_import(catalog, monkeypatch, session_factory):
+    use_redis(monkeypatch, FailingRedis(RedisError("Connection refused")))
+
+    state = asyncio.run(import_urls(catalog, chunk_size=2))
+
+    assert state["imported"] == 4
+    assert _count_urls(session_factory) == 4
+
+
+def test_resume_after_a_crash_while_warming_the_cache(catalog, monkeypatch, session_factory):
+    # The process dies while caching the first chunk, after its commit.
+    use_redis(monkeypatch, FailingRedis(KeyboardInterrupt()))
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(import_urls(catalog, chunk_size=2))
+
+    use_redis(monkeypatch, fakeredis.FakeAsyncRedis())
+    state = asyncio.run(import_urls(catalog, chunk_size=2, resume=True))
+
+    assert state["rows"] == 4
+    assert state["imported"] == 4
+    assert _count_urls(session_factory) == 4
@@ -0,0 +1,41 @@
+import pytest
+from app.api.modules.search.inverted_index import InvertedIndex, trigrams
+
+
+@pytest.fixture
+def index():
+    index = InvertedIndex()
+    index.add(1, "Harry Potter and the Philosopher's Stone", "J. K. Rowling", "A young wizard")
+    index.add(2, "The Hobbit", "J. R. R. Tolkien", "A hobbit, a wizard and a dragon")
+    index.add(3, "Dune", "Frank Herbert", "Desert planet")
+    return index
+
+
+def test_trigrams_match_pg_trgm_padding():
+    assert trigrams("Cat") == {"  c", " ca", "cat", "at "}
+
+
+def test_title_matches_rank_above_description_matches(index):
+    ids = [doc_id for _, doc_id in index.search("wizard potter")]
+    assert ids[0] == 1
+    assert set(ids) == {1, 2}
+
+
+def test_fuzzy_title_match(index):
+    assert [doc_id for _, doc_id in index.search("hobit")] == [2]
+
+
+def test_keyset_pagination_covers_every_match_once(index):
+    first = index.search("wizard", limit=1)
+    second = index.search("wizard", limit=1, after=first[-1])
+    assert len(first) == len(second) == 1
+    assert {first[0][1], second[0][1]} == {1, 2}
+    assert index.search("wizard", limit=1, after=second[-1]) == []
+
+
+def test_reindex_and_remove(index):
+    index.add(3, "Dune Messiah", "Frank Herbert", "Desert planet")
+    assert [doc_id for _, doc_id in index.search("messiah")] == [3]
+    index.remove(3)
+    assert index.search("messiah") == []
+    assert len(index) == 2
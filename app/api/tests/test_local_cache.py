@@ -0,0 +1,46 @@
+import time
+from app.api.modules.crud_reddis.local_cache import LocalCache
+
+
+def test_stored_urls_are_served_until_invalidated():
+    cache = LocalCache(max_size=10, ttl=30)
+    cache.put(1, {"id": 1}, cache.generation)
+
+    assert cache.get(1) == {"id": 1}
+
+    cache.invalidate(1, lag_ms=4)
+
+    assert cache.get(1) is None
+    assert cache.snapshot()["invalidations"] == 1
+    assert cache.snapshot()["invalidation_lag_max_ms"] == 4
+
+
+def test_reads_started_before_an_invalidation_are_not_stored():
+    cache = LocalCache(max_size=10, ttl=30)
+    generation = cache.generation
+    cache.invalidate(1)
+
+    cache.put(1, {"id": 1}, generation)
+
+    assert cache.get(1) is None
+
+
+def test_entries_expire_after_ttl():
+    cache = LocalCache(max_size=10, ttl=0.01)
+    cache.put(1, {"id": 1}, cache.generation)
+    time.sleep(0.02)
+
+    assert cache.get(1) is None
+    assert cache.snapshot()["evictions"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LocalCache(max_size=2, ttl=30)
+    cache.put(1, {"id": 1}, cache.generation)
+    cache.put(2, {"id": 2}, cache.generation)
+    cache.get(1)
+    cache.put(3, {"id": 3}, cache.generation)
+
+    assert cache.get(2) is None
+    assert cache.get(1) == {"id": 1}
+    assert cache.snapshot()["size"] == 2
@@ -0,0 +1,27 @@
+import json
+import logging
+from app.api.modules.logger_modify import JsonFormatter, SamplingFilter
+
+
+def make_record(level, msg, *args, **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(make_record(logging.INFO, "URL retrieved: %s", "Dune", url_id=7))
+
+    entry = json.loads(line)
+    assert entry["message"] == "URL retrieved: Dune"
+    assert entry["level"] == "INFO"
+    assert entry["url_id"] == 7
+
+
+def test_sampling_by_template_and_call_site():
+    sampling = SamplingFilter({"URL retrieved: %s": 0.0})
+
+    assert not sampling.filter(make_record(logging.INFO, "URL retrieved: %s", "Dune"))
+    assert not sampling.filter(make_record(logging.INFO, "Cache hit", sample_rate=0.0))
+    assert sampling.filter(make_record(logging.INFO, "URL created: %s", "Dune"))
+    assert sampling.filter(make_record(logging.WARNING, "URL retrieved: %s", "Dune"))
@@ -0,0 +1,68 @@
+import re
+from types import SimpleNamespace
+from sqlalchemy import create_engine, text
+from app.api.modules.metrics.metrics import (
+    Histogram,
+    MetricsRegistry,
+    cache_collector,
+    metrics,
+    observe_engine,
+    render,
+    route_template,
+)
+
+
+def test_histogram_buckets_are_inclusive_upper_bounds():
+    histogram = Histogram()
+    histogram.observe(0.001)
+    histogram.observe(0.0011)
+    histogram.observe(60)
+
+    assert histogram.counts[3] == 1  # le="0.001"
+    assert histogram.counts[4] == 1  # le="0.0025"
+    assert histogram.counts[-1] == 1  # le="+Inf"
+    assert histogram.total == 0.001 + 0.0011 + 60
+
+
+def test_snapshots_of_several_workers_are_summed():
+    registry = MetricsRegistry()
+    registry.histogram("http_request_duration_seconds", (("method", "GET"), ("route", "/urls/"))).observe(0.002)
+    registry.register_collector(cache_collector(SimpleNamespace(hits=3, misses=1), "token"))
+
+    exposition = render([registry.snapshot(), registry.snapshot()])
+
+    assert "# TYPE http_request_duration_seconds histogram" in exposition
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/urls/",le="0.001"} 0' in exposition
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/urls/",le="0.0025"} 2' in exposition
+    assert 'http_request_duration_seconds_count{method="GET",route="/urls/"} 2' in exposition
+    assert 'cache_hits_total{cache="token"} 6' in exposition
+    assert 'cache_hit_ratio{cache="token"} 0.75' in exposition
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.register_collector(lambda: [("cache_hits_total", (("cache", 'a"b\\c'),), 1)])
+
+    assert 'cache_hits_total{cache="a\\"b\\\\c"} 1' in render([registry.snapshot()])
+
+
+def test_engine_statements_are_timed_per_type():
+    engine = create_engine("sqlite://")
+    observe_engine(engine, "test")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    selects = metrics.histogram("db_query_duration_seconds", (("pool", "test"), ("type", "select")))
+    others = metrics.histogram("db_query_duration_seconds", (("pool", "test"), ("type", "other")))
+    assert sum(selects.counts) == 1
+    assert sum(others.counts) == 1
+    engine.dispose()
+
+
+def test_route_template_includes_the_router_prefix():
+    route = SimpleNamespace(path="/url/{url_id}", path_regex=re.compile("^/url/(?P<url_id>[^/]+)$"))
+
+    assert route_template({"path": "/urls/url/7", "route": route}) == "/urls/url/{url_id}"
+    assert route_template({"path": "/url/7", "route": route}) == "/url/{url_id}"
+    assert route_template({"path": "/nope"}) == "unmatched"
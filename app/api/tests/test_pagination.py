@@ -0,0 +1,16 @@
+import pytest
+from app.api.modules.crud_postgresql.pagination import decode_cursor, encode_cursor
+
+
+def test_cursors_round_trip():
+    assert decode_cursor(encode_cursor([4, 17]), 2) == [4, 17]
+    assert decode_cursor(None, 2) is None
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["not base64!", encode_cursor([1]), encode_cursor(["1", 2]), encode_cursor([True, 2]), "eyJhIjoxfQ"],
+)
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
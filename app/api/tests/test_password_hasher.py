@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from app.api.modules.passwords.password_hasher import PasswordHasher, PasswordPoolBusy
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(["argon2", "bcrypt"], max_workers=2, max_pending=2)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_and_verify(hasher):
+    stored = asyncio.run(hasher.hash("s3cret"))
+
+    assert stored.startswith("$argon2")
+    assert asyncio.run(hasher.verify("s3cret", stored)) == (True, None)
+    assert asyncio.run(hasher.verify("wrong", stored)) == (False, None)
+
+
+def test_plaintext_and_outdated_rows_are_rehashed(hasher):
+    valid, new_hash = asyncio.run(hasher.verify("legacy", "legacy"))
+    assert valid and new_hash.startswith("$argon2")
+    assert asyncio.run(hasher.verify("other", "legacy")) == (False, None)
+
+    bcrypt_hash = hasher.context.handler("bcrypt").hash("old")
+    valid, new_hash = asyncio.run(hasher.verify("old", bcrypt_hash))
+    assert valid and new_hash.startswith("$argon2")
+
+
+def test_unknown_users_are_verified_in_the_pool(hasher):
+    assert asyncio.run(hasher.verify("s3cret", None)) == (False, None)
+
+    hasher.pending = hasher.max_pending
+    with pytest.raises(PasswordPoolBusy):
+        asyncio.run(hasher.verify("s3cret", None))
+
+
+def test_full_pool_is_rejected(hasher):
+    async def storm():
+        return await asyncio.gather(*(hasher.hash("x") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(storm())
+
+    assert sum(isinstance(result, PasswordPoolBusy) for result in results) == 1
+    assert hasher.rejected == 1
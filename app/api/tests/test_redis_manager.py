@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+import fakeredis
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from redis.asyncio import ConnectionPool, Redis
+from app.api.connections.instace import get_redis_manager
+from app.api.modules.redis_conf.redis_conf import RedisManager
+
+SETTINGS = SimpleNamespace(
+    redis_host="cache",
+    redis_port=6380,
+    redis_db=2,
+    redis_max_connections=7,
+    redis_socket_timeout=0.5,
+    redis_connect_timeout=0.25,
+    redis_health_check_interval=15,
+    redis_socket_keepalive=False,
+)
+
+
+def test_the_pool_is_configured_from_the_settings():
+    manager = RedisManager.from_settings(SETTINGS)
+
+    assert manager.pool.max_connections == 7
+    assert {key: manager.pool.connection_kwargs[key] for key in ("host", "port", "db", "socket_timeout")} == {
+        "host": "cache",
+        "port": 6380,
+        "db": 2,
+        "socket_timeout": 0.5,
+    }
+    assert manager.pool.connection_kwargs["health_check_interval"] == 15
+    assert manager.get_client() is manager.get_client()
+    assert RedisManager.from_settings(SETTINGS, socket_timeout=5).pool.connection_kwargs["socket_timeout"] == 5
+
+
+def test_requests_share_the_process_manager():
+    app = FastAPI()
+    app.state.redis_manager = RedisManager.from_settings(SETTINGS)
+    seen = []
+
+    @app.get("/")
+    def handler(redis_manager: RedisManager = Depends(get_redis_manager)):
+        seen.append(redis_manager)
+
+    with TestClient(app) as client:
+        client.get("/")
+        client.get("/")
+
+    assert seen == [app.state.redis_manager, app.state.redis_manager]
+
+
+def test_close_disconnects_the_pooled_connections():
+    manager = RedisManager.from_settings(SETTINGS)
+    manager.pool = ConnectionPool(connection_class=fakeredis.FakeAsyncConnection, server=fakeredis.FakeServer())
+    manager.redis_client = Redis(connection_pool=manager.pool)
+
+    async def scenario():
+        await asyncio.gather(*(manager.get_client().set(f"key:{i}", i) for i in range(3)))
+        opened = list(manager.pool._available_connections)
+        await manager.close()
+        return opened
+
+    opened = asyncio.run(scenario())
+
+    assert opened
+    assert not any(connection.is_connected for connection in opened)
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+from app.api.connections.db import Base
+from app.api.connections.routing import ReplicaRouter, RoutingSession
+from app.api.models.model import User
+
+
+@pytest.fixture
+def engines(tmp_path):
+    # Two independent local databases stand in for the primary and a replica.
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=primary)
+    Base.metadata.create_all(bind=replica)
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+def make_session(router, pin_key=None):
+    factory = sessionmaker(class_=RoutingSession, info={"router": router})
+    db = factory()
+    db.info["pin_key"] = pin_key
+    return db
+
+
+def test_reads_go_to_replica_and_writes_to_primary(engines):
+    primary, replica = engines
+    router = ReplicaRouter(primary, [replica], pin_window=0)
+
+    db = make_session(router)
+    db.add(User(username="writer", password="x", role="user"))
+    db.commit()
+
+    assert db.get_bind(clause=select(User)) is replica
+    assert db.execute(select(User)).scalars().first() is None
+    with primary.connect() as conn:
+        assert conn.execute(select(User.username)).scalar() == "writer"
+    db.close()
+
+
+def test_writer_is_pinned_to_primary_within_window(engines):
+    primary, replica = engines
+    router = ReplicaRouter(primary, [replica], pin_window=60)
+
+    writer = make_session(router, pin_key="client-a")
+    writer.add(User(username="pinned", password="x", role="user"))
+    writer.commit()
+    writer.close()
+
+    # A new session for the same client still reads its own write.
+    reader = make_session(router, pin_key="client-a")
+    assert reader.execute(select(User.username)).scalar() == "pinned"
+    reader.close()
+
+    other = make_session(router, pin_key="client-b")
+    assert other.execute(select(User.username)).scalar() is None
+    other.close()
+
+
+def test_round_robin_spreads_reads(engines):
+    primary, replica = engines
+    second = create_engine("sqlite://")
+    router = ReplicaRouter(primary, [replica, second])
+
+    assert [router.reader() for _ in range(4)] == [replica, second, replica, second]
+
+
+def test_least_latency_keeps_measuring_a_slow_replica(engines):
+    primary, replica = engines
+    second = create_engine("sqlite://")
+    router = ReplicaRouter(primary, [replica, second], strategy="least_latency")
+    router.latency[replica] = 1.0  # One slow sample.
+
+    readers = []
+    for _ in range(40):
+        readers.append(router.reader())
+        with readers[-1].connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    assert readers.count(second) > readers.count(replica) > 0
+    assert router.latency[replica] < 1.0
+
+
+def test_unknown_strategy_is_rejected(engines):
+    primary, replica = engines
+    with pytest.raises(ValueError):
+        ReplicaRouter(primary, [replica], strategy="random")
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, text
+from app.api.modules.metrics.metrics import observe_engine
+from app.api.modules.metrics.request_stats import (
+    QueryBudgetExceeded,
+    RequestTiming,
+    current_request,
+    query_budget,
+    redact_parameters,
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    observe_engine(engine, "budget")
+    yield engine
+    engine.dispose()
+
+
+def test_statements_are_counted_in_the_current_request(engine):
+    with query_budget() as stats, engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+
+    assert stats.queries == 2
+    assert stats.query_time > 0
+
+
+def test_statement_over_the_budget_fails(engine):
+    with query_budget(1) as stats, engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(QueryBudgetExceeded, match="SELECT 2"):
+            conn.execute(text("SELECT 2"))
+
+    assert stats.queries == 1
+    assert stats.refused == "SELECT 2"
+
+
+def test_parameters_are_redacted():
+    assert redact_parameters(("secret", 7, None)) == ["<str>", "<int>", None]
+    assert redact_parameters({"password": "x"}) == {"password": "<str>"}
+    assert redact_parameters([("a", 1), ("b", 2)], executemany=True) == {"rows": 2, "first": ["<str>", "<int>"]}
+
+
+def test_server_timing_header_reports_the_request():
+    async def app(scope, receive, send):
+        stats = current_request.get()
+        stats.queries += 3
+        stats.redis_calls += 1
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(RequestTiming(app)({"type": "http", "method": "GET", "path": "/"}, None, send))
+
+    header = dict(messages[0]["headers"])[b"server-timing"].decode()
+    assert 'desc="3 queries"' in header
+    assert 'desc="1 calls"' in header
+    assert current_request.get() is None
@@ -0,0 +1,169 @@
+import asyncio
+import csv
+import io
+import json
+from hashlib import sha256
+from types import SimpleNamespace
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.api.connections.instace import get_db
+from app.api.models.model import Urls, User
+from app.api.modules.crud_postgresql.query_url import UrlDataRepository
+from app.api.modules.crud_reddis.local_cache import url_local_cache
+from app.api.settings import get_settings
+
+
+@pytest.fixture
+def url_id(session_factory):
+    async def add_url():
+        async with session_factory() as db:
+            url = Urls(title="t", description="d", author="a", rating=3, user_id=None)
+            db.add(url)
+            await db.commit()
+            return url.id
+
+    return asyncio.run(add_url())
+
+
+@pytest.mark.parametrize("authorization", ["Bearer a-token", None])
+def test_get_db_pins_by_credentials_and_closes_the_session(authorization):
+    request = SimpleNamespace(headers={"authorization": authorization} if authorization else {})
+    closed = []
+
+    async def scenario():
+        dependency = get_db(request)
+        db = await dependency.__anext__()
+        close = db.close
+
+        async def track_close():
+            closed.append(True)
+            await close()
+
+        db.close = track_close
+        await dependency.aclose()
+        return db.info["pin_key"]
+
+    pin_key = asyncio.run(scenario())
+
+    assert pin_key == (sha256(authorization.encode()).hexdigest() if authorization else None)
+    assert closed == [True]
+
+
+@pytest.fixture
+def local_cache():
+    url_local_cache.clear()
+    yield url_local_cache
+    url_local_cache.clear()
+
+
+def test_a_created_url_is_read_back_and_recached(api, redis_manager, local_cache):
+    client = redis_manager.get_client()
+    created = api.post(
+        "/urls/url/", json={"title": "new", "description": "d", "author": "a", "rating": 4, "user_id": None}
+    )
+    url_id = created.json()["status"]["id"]
+    asyncio.run(client.delete(f"url_data:{url_id}"))
+    local_cache.clear()
+
+    response = api.get(f"/urls/url/{url_id}")
+
+    assert response.status_code == 200
+    assert response.json()["result"]["title"] == "new"
+    assert asyncio.run(client.hget(f"url_data:{url_id}", "title")) == b'"new"'
+
+
+@pytest.mark.parametrize("body", [{"nope": 2}, {"version": 9}, {"id": 5, "rating": 4}])
+def test_fields_that_cannot_be_updated_are_rejected(api, url_id, body):
+    response = api.put(f"/urls/url/{url_id}", json=body)
+
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("Fields cannot be updated")
+
+
+def test_update_returns_the_updated_url(api, url_id):
+    response = api.put(f"/urls/url/{url_id}", json={"rating": 5})
+
+    assert response.status_code == 200
+    assert (response.json()["rating"], response.json()["version"]) == (5, 2)
+
+
+def test_controller_errors_keep_their_status_and_detail(api, url_id, monkeypatch):
+    async def fail(self, *args, **kwargs):
+        raise OperationalError("UPDATE urls", {}, Exception("server closed the connection"))
+
+    monkeypatch.setattr(UrlDataRepository, "update_url", fail)
+    monkeypatch.setattr(UrlDataRepository, "delete_url", fail)
+
+    assert api.put(f"/urls/url/{url_id}", json={"rating": 5}).json() == {"detail": "Error updating URL"}
+    assert api.delete(f"/urls/url/{url_id}").json() == {"detail": "Error deleting URL"}
+
+
+@pytest.fixture
+def user_id(session_factory):
+    async def add_user():
+        async with session_factory() as db:
+            # A row from before passwords were hashed: rehashed on the next login.
+            user = User(username="legacy", password="s3cret", role="user")
+            db.add(user)
+            await db.commit()
+            return user.id
+
+    return asyncio.run(add_user())
+
+
+def test_a_login_rehash_changes_the_user_etag(api, user_id):
+    etag = api.get(f"/users/user/{user_id}").headers["ETag"]
+
+    assert api.post("/users/login", data={"username": "legacy", "password": "s3cret"}).status_code == 200
+
+    response = api.get(f"/users/user/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["version"] == 2
+    update = api.put(f"/users/user/{user_id}", json={"role": "admin"}, headers={"If-Match": response.headers["ETag"]})
+    assert update.json() is True
+
+
+def test_unknown_users_are_not_found(api):
+    response = api.get("/users/user/99")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "User not found"}
+
+
+@pytest.fixture
+def catalog(session_factory, monkeypatch):
+    # Five URLs, the even ones owned by user 1; exported two rows per chunk.
+    monkeypatch.setattr(get_settings(), "export_batch_size", 2)
+
+    async def add_urls():
+        async with session_factory() as db:
+            db.add(User(id=1, username="owner", password="x", role="user"))
+            db.add_all(Urls(title=f"book {i}", author="a,b", rating=i, user_id=None if i % 2 else 1) for i in range(5))
+            await db.commit()
+
+    asyncio.run(add_urls())
+
+
+def test_export_streams_ndjson_in_id_order(api, catalog):
+    response = api.get("/urls/export")
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [1, 2, 3, 4, 5]
+    assert rows[0] == {"id": 1, "title": "book 0", "description": None, "author": "a,b", "rating": 0, "user_id": 1}
+
+
+def test_export_csv_with_filters(api, catalog):
+    response = api.get("/urls/export", params={"format": "csv", "user_id": 1, "since_id": 1})
+
+    assert response.headers["content-disposition"] == 'attachment; filename="urls.csv"'
+    assert list(csv.reader(io.StringIO(response.text))) == [
+        ["id", "title", "description", "author", "rating", "user_id"],
+        ["3", "book 2", "", "a,b", "2", "1"],
+        ["5", "book 4", "", "a,b", "4", "1"],
+    ]
+
+
+def test_export_rejects_unknown_formats(api):
+    assert api.get("/urls/export", params={"format": "xml"}).status_code == 422
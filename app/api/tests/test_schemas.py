@@ -0,0 +1,20 @@
+from app.api.models.model import Urls, User
+from app.api.models.schemas import UrlResponse, UrlSchema, UserSchema
+
+
+def test_users_are_serialized_without_password():
+    user = User(id=1, username="reader", password="$argon2id$hash", role="admin", version=2)
+
+    assert UserSchema.model_validate(user).model_dump() == {"id": 1, "username": "reader", "role": "admin", "version": 2}
+
+
+def test_urls_are_read_from_rows():
+    url = Urls(id=2, title="t", description="d", author="a", rating=3, user_id=None, version=1)
+
+    assert UrlSchema.model_validate(url).model_dump() == url.to_dict()
+
+
+def test_selected_fields_are_not_padded_with_nulls():
+    response = UrlResponse.model_validate({"result": {"title": "t", "rating": 3}})
+
+    assert response.model_dump(exclude_unset=True) == {"result": {"title": "t", "rating": 3}}
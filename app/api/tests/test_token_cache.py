@@ -0,0 +1,46 @@
+import time
+import pytest
+from fastapi import HTTPException
+from app.api.modules.tokens.access_token import JWTAuthentication
+from app.api.modules.tokens.token_cache import TokenCache
+
+
+def test_verified_tokens_are_served_from_cache():
+    auth = JWTAuthentication(secret_key="secret", algorithm="HS256", expire_minutes=5)
+    token = auth.create_token({"sub": "reader"})
+
+    assert auth.verify_token(token)["sub"] == "reader"
+    assert auth.verify_token(token)["sub"] == "reader"
+    assert auth.cache.snapshot()["hits"] == 1
+    assert auth.cache.snapshot()["misses"] == 1
+
+
+def test_rotating_the_secret_drops_cached_tokens():
+    auth = JWTAuthentication(secret_key="secret", algorithm="HS256", expire_minutes=5)
+    token = auth.create_token({"sub": "reader"})
+    auth.verify_token(token)
+
+    auth.rotate_secret("another-secret")
+
+    with pytest.raises(HTTPException):
+        auth.verify_token(token)
+
+
+def test_entries_expire_at_exp():
+    cache = TokenCache(max_size=10)
+    cache.put("expired", {"sub": "a", "exp": time.time() - 1})
+
+    assert cache.get("expired") is None
+    assert cache.snapshot()["evictions"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TokenCache(max_size=2)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    cache.get("a")
+    cache.put("c", {"sub": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sub": "a"}
+    assert cache.get("c") == {"sub": "c"}
@@ -0,0 +1,139 @@
+import asyncio
+from time import time
+from app.api.modules.crud_reddis import crud_redis_basic
+from app.api.modules.crud_reddis.crud_redis_basic import CacheStats, CrudRedis
+
+URL = {"id": 1, "url": "https://example.com", "title": "Example", "rating": 4, "version": 1}
+
+
+def test_a_rebuild_does_not_overwrite_a_newer_version(redis_manager):
+    crud = CrudRedis(redis_manager)
+
+    async def scenario():
+        await crud.store_url_in_redis(1, {**URL, "title": "Updated", "version": 3})
+        await crud.store_url_in_redis(1, {**URL, "title": "Stale", "version": 2})
+        return await crud.get_url_from_redis(1)
+
+    assert asyncio.run(scenario())["title"] == "Updated"
+
+
+def test_the_rebuild_lock_is_released_by_its_holder_only(redis_manager):
+    crud = CrudRedis(redis_manager)
+    client = redis_manager.get_client()
+
+    async def scenario():
+        assert await crud.get_url_from_redis(1) is None  # Takes the rebuild lock.
+        # The lock expires during the rebuild and another worker takes it.
+        await client.set("lock:url_data:1", "another-worker")
+        await crud.store_url_in_redis(1, URL)
+        kept = await client.get("lock:url_data:1")
+
+        await client.delete("url_data:1", "lock:url_data:1")
+        assert await crud.get_url_from_redis(1) is None
+        await crud.store_url_in_redis(1, URL)
+        return kept, await client.exists("lock:url_data:1")
+
+    assert asyncio.run(scenario()) == (b"another-worker", 0)
+
+
+def test_a_versioned_update_writes_only_the_given_fields(redis_manager):
+    crud = CrudRedis(redis_manager)
+
+    async def scenario():
+        await crud.store_url_in_redis(1, URL)
+        assert await crud.update_url_in_redis(1, {"rating": 5}, version=2)
+        return await crud.get_url_from_redis(1), await redis_manager.get_client().hget("url_data:1", "_v")
+
+    cached, version = asyncio.run(scenario())
+
+    assert cached == {**URL, "rating": 5}
+    assert version == b"2"
+
+
+def test_an_older_update_is_ignored(redis_manager):
+    crud = CrudRedis(redis_manager)
+
+    async def scenario():
+        await crud.store_url_in_redis(1, {**URL, "version": 3})
+        assert not await crud.update_url_in_redis(1, {"rating": 1}, version=2)
+        assert not await crud.update_url_in_redis(1, {"rating": 1}, version=3)
+        return await crud.get_url_from_redis(1)
+
+    assert asyncio.run(scenario())["rating"] == 4
+
+
+def test_an_update_does_not_recreate_a_missing_entry(redis_manager):
+    crud = CrudRedis(redis_manager)
+    client = redis_manager.get_client()
+
+    async def scenario():
+        assert not await crud.update_url_in_redis(1, {"rating": 5}, version=2)
+        await crud.store_missing_url_in_redis(2)
+        assert not await crud.update_url_in_redis(2, {"rating": 5}, version=2)
+        return await client.exists("url_data:1"), await client.hgetall("url_data:2")
+
+    assert asyncio.run(scenario()) == (0, {b"_missing": b"1"})
+
+
+def _crud(redis_manager) -> CrudRedis:
+    crud = CrudRedis(redis_manager)
+    crud.stats = CacheStats()
+    return crud
+
+
+def test_a_cold_miss_waits_for_the_worker_holding_the_lock(redis_manager):
+    crud = _crud(redis_manager)
+    crud.lock_wait_ms = 1000
+
+    async def scenario():
+        assert await crud.get_url_from_redis(1) is None  # This worker rebuilds.
+        waiting = asyncio.create_task(crud.get_url_from_redis(1))
+        await asyncio.sleep(0.05)
+        await crud.store_url_in_redis(1, URL)
+        return await waiting
+
+    assert asyncio.run(scenario()) == URL
+    assert crud.stats.misses == 1
+    assert crud.stats.hits == 1
+
+
+def test_a_cold_miss_gives_up_when_the_rebuild_takes_too_long(redis_manager):
+    crud = _crud(redis_manager)
+    crud.lock_wait_ms = 50
+
+    async def scenario():
+        await crud.get_url_from_redis(1)
+        return await crud.get_url_from_redis(1)
+
+    assert asyncio.run(scenario()) is None
+    assert crud.stats.lock_timeouts == 1
+
+
+def test_an_entry_is_refreshed_early_by_one_reader(redis_manager, monkeypatch):
+    crud = _crud(redis_manager)
+    monkeypatch.setattr(crud_redis_basic, "random", lambda: 0.5)
+
+    async def scenario():
+        # Fresh for another second, but the last rebuild took ten.
+        await crud.store_url_in_redis(1, URL, delta_ms=10000)
+        await redis_manager.get_client().hset("url_data:1", "_exp", int(time() * 1000) + 1000)
+        return await crud.get_url_from_redis(1), await crud.get_url_from_redis(1)
+
+    assert asyncio.run(scenario()) == (None, URL)
+    assert crud.stats.refreshes == 1
+    assert crud.stats.stale_hits == 1
+
+
+def test_an_expired_entry_is_served_stale_while_another_worker_rebuilds(redis_manager):
+    crud = _crud(redis_manager)
+    client = redis_manager.get_client()
+
+    async def scenario():
+        await crud.store_url_in_redis(1, URL)
+        await client.hset("url_data:1", "_exp", int(time() * 1000) - 1000)
+        await client.set("lock:url_data:1", "another-worker")
+        return await crud.get_url_from_redis(1)
+
+    assert asyncio.run(scenario()) == URL
+    assert crud.stats.stale_hits == 1
+    assert crud.stats.misses == 0
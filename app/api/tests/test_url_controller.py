@@ -0,0 +1,211 @@
+import asyncio
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.api.connections.routing import ReplicaRouter, RoutingSession
+from app.api.controllers.controller_url import UrlController
+from app.api.models.model import Urls, User
+from app.api.modules.crud_postgresql.query_url import UrlDataRepository
+from app.api.modules.crud_reddis.local_cache import url_local_cache
+from app.api.settings import get_settings
+
+
+@pytest.fixture
+def run(session_factory, redis_manager):
+    # Runs `action(controller)` on a fresh session, with a user (ID 1) in the database.
+    async def add_user():
+        async with session_factory() as db:
+            db.add(User(id=1, username="owner", password="x", role="user"))
+            await db.commit()
+
+    asyncio.run(add_user())
+    url_local_cache.clear()
+
+    def run(action):
+        async def scenario():
+            async with session_factory() as db:
+                return await action(UrlController(db, redis_manager))
+
+        return asyncio.run(scenario())
+
+    yield run
+    url_local_cache.clear()
+
+
+def _url(title: str, **overrides) -> dict:
+    return {"title": title, "description": None, "author": "someone", "rating": 3, "user_id": 1, **overrides}
+
+
+def test_bulk_create_reports_invalid_items_next_to_created_ones(run):
+    items = [
+        _url("first"),
+        {"title": "no owner"},
+        _url("second", rating="high"),
+        _url("third", user_id=99),
+        _url("fourth"),
+    ]
+
+    response = run(lambda controller: controller.create_urls(items))
+
+    assert (response["created"], response["failed"]) == (2, 3)
+    assert [result["index"] for result in response["results"]] == [0, 1, 2, 3, 4]
+    assert [result["status"] for result in response["results"]] == ["created", "error", "error", "error", "created"]
+    assert response["results"][1]["detail"].startswith("Missing fields")
+    assert response["results"][2]["detail"] == "Field rating must be an integer"
+    assert response["results"][3]["detail"] == "User 99 does not exist"
+    assert response["results"][0]["url"]["title"] == "first"
+    assert response["results"][4]["url"]["title"] == "fourth"
+    assert response["results"][0]["url"]["id"] < response["results"][4]["url"]["id"]
+
+
+def test_bulk_insert_keeps_input_order_without_copy(session_factory):
+    # COPY needs asyncpg; on any other driver the INSERT ... RETURNING path is
+    # used whatever the threshold.
+    rows = [_url(f"book {i}", user_id=None) for i in (3, 1, 2)]
+
+    async def scenario():
+        async with session_factory() as db:
+            return await UrlDataRepository(db).create_urls(rows, copy_threshold=1)
+
+    created = asyncio.run(scenario())
+
+    assert [row["title"] for row in created] == ["book 3", "book 1", "book 2"]
+    assert [row["id"] for row in created] == [1, 2, 3]
+
+
+def test_multi_get_keeps_requested_order_and_backfills_misses(run, redis_manager):
+    run(lambda controller: controller.create_urls([_url("first"), _url("second"), _url("third")]))
+    client = redis_manager.get_client()
+    asyncio.run(client.delete("url_data:2"))
+
+    response = run(lambda controller: controller.read_urls([3, 99, 1, 2, 3]))
+
+    assert [url and url["title"] for url in response["results"]] == ["third", None, "first", "second", "third"]
+    assert response["missing"] == [99]
+    assert asyncio.run(client.hget("url_data:2", "title")) is not None
+    assert asyncio.run(client.hgetall("url_data:99")) == {b"_missing": b"1"}
+
+
+def _walk(run, list_page) -> list:
+    # Follows next_cursor from the first page to the last one.
+    pages, cursor = [], None
+    while True:
+        page = run(lambda controller: list_page(controller, cursor))
+        pages.append([url.title for url in page["results"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_rating_pages_break_ties_by_id_and_put_unrated_last(run):
+    ratings = [5, None, 3, 5, None, 3, 1]
+    run(lambda controller: controller.create_urls([_url(f"url {i}", rating=rating) for i, rating in enumerate(ratings)]))
+
+    pages = _walk(run, lambda controller, cursor: controller.list_urls(sort="rating", cursor=cursor, limit=2))
+
+    # (coalesce(rating, -1) DESC, id DESC); IDs are the indexes plus one.
+    assert pages == [["url 3", "url 0"], ["url 5", "url 2"], ["url 6", "url 4"], ["url 1"]]
+
+
+def test_id_pages_of_all_urls_and_of_one_user(run):
+    run(lambda controller: controller.create_urls([_url(f"url {i}", user_id=1 if i % 2 else None) for i in range(5)]))
+
+    pages = _walk(run, lambda controller, cursor: controller.list_urls(cursor=cursor, limit=2))
+    user_pages = _walk(run, lambda controller, cursor: controller.list_user_urls(1, cursor=cursor, limit=1))
+
+    assert pages == [["url 0", "url 1"], ["url 2", "url 3"], ["url 4"]]
+    assert user_pages == [["url 1"], ["url 3"]]
+
+
+def test_unknown_ids_are_cached_as_missing_until_created(run, redis_manager):
+    client = redis_manager.get_client()
+
+    with pytest.raises(ValueError):
+        run(lambda controller: controller.read_url(1))
+    assert asyncio.run(client.hgetall("url_data:1")) == {b"_missing": b"1"}
+    with pytest.raises(ValueError):
+        run(lambda controller: controller.read_url(1))
+
+    created = run(lambda controller: controller.create_url(_url("new")))
+
+    assert created["status"]["id"] == 1
+    assert asyncio.run(client.hget("url_data:1", "_missing")) is None
+    assert run(lambda controller: controller.read_url(1))["result"]["title"] == "new"
+
+
+@pytest.fixture
+def copy_run(postgres_engine, redis_manager, monkeypatch):
+    # Runs `action(controller)` on Postgres with every bulk insert going through COPY.
+    monkeypatch.setattr(get_settings(), "bulk_copy_threshold", 1)
+
+    def copy_run(action, replica: bool = False):
+        async def scenario():
+            router = ReplicaRouter(postgres_engine.sync_engine, [], pin_window=0)
+            if replica:
+                # A second engine on the same database stands in for a replica.
+                reader = create_async_engine(postgres_engine.url, poolclass=NullPool)
+                router.replicas.append(reader.sync_engine)
+            factory = async_sessionmaker(
+                postgres_engine, sync_session_class=RoutingSession, info={"router": router}, expire_on_commit=False
+            )
+            try:
+                async with factory() as db:
+                    return await action(UrlController(db, redis_manager))
+            finally:
+                if replica:
+                    await reader.dispose()
+
+        return asyncio.run(scenario())
+
+    return copy_run
+
+
+def test_copy_without_user_ids_keeps_the_staged_rows(copy_run):
+    # No user to look up, so COPY is the first statement of the transaction.
+    response = copy_run(lambda controller: controller.create_urls([_url(f"book {i}", user_id=None) for i in range(3)]))
+
+    assert response["created"] == 3
+    assert [result["url"]["title"] for result in response["results"]] == ["book 0", "book 1", "book 2"]
+
+
+def test_copy_with_a_replica_keeps_the_staged_rows(copy_run):
+    async def add_user_and_create(controller):
+        controller.db.add(User(id=1, username="owner", password="x", role="user"))
+        await controller.db.commit()
+        # The user lookup goes to the replica, so COPY opens the primary connection.
+        return await controller.create_urls([_url("first"), _url("second")])
+
+    response = copy_run(add_user_and_create, replica=True)
+
+    assert response["created"] == 2
+    assert [result["url"]["title"] for result in response["results"]] == ["first", "second"]
+
+
+def test_import_copies_within_the_session_transaction(postgres_engine):
+    rows = [_url(f"book {i}", user_id=None) for i in range(3)]
+    factory = async_sessionmaker(postgres_engine, expire_on_commit=False)
+    seen_before_commit = []
+
+    async def visible_titles():
+        async with factory() as other:
+            return (await other.execute(select(Urls.title).order_by(Urls.id))).scalars().all()
+
+    async def scenario():
+        async with factory() as db:
+            commit = db.commit
+
+            async def commit_after_looking():
+                # Another connection must not see the rows until the commit.
+                seen_before_commit.extend(await visible_titles())
+                await commit()
+
+            db.commit = commit_after_looking
+            loaded = await UrlDataRepository(db).import_urls(rows)
+        return loaded, await visible_titles()
+
+    loaded, titles = asyncio.run(scenario())
+
+    assert seen_before_commit == []
+    assert [row["id"] for row in loaded] == [1, 2, 3]
+    assert titles == ["book 0", "book 1", "book 2"]
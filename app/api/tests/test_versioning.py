@@ -0,0 +1,24 @@
+import pytest
+from app.api.modules.crud_postgresql.versioning import etag_matches, make_etag, parse_if_match
+
+
+@pytest.mark.parametrize("header, version", [(None, None), ("*", None), ("3", 3), ('"3"', 3), ('W/"3"', 3)])
+def test_if_match_holds_the_expected_version(header, version):
+    assert parse_if_match(header) == version
+
+
+def test_if_match_without_a_version_is_rejected():
+    with pytest.raises(ValueError):
+        parse_if_match('"abc"')
+
+
+def test_etags_round_trip_through_if_match():
+    assert parse_if_match(make_etag(4, ["title", "rating"])) == 4
+
+
+@pytest.mark.parametrize(
+    "header, matches",
+    [('"4"', True), ('W/"4"', True), ('"3", "4"', True), ("*", True), ('"3"', False), (None, False)],
+)
+def test_if_none_match_uses_weak_comparison(header, matches):
+    assert etag_matches(header, make_etag(4)) is matches
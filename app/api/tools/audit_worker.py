@@ -0,0 +1,182 @@
+"""
+Audit stream consumer.
+
+Usage:
+    python -m app.api.tools.audit_worker [--consumer NAME] [--once]
+
+Reads the URL audit events published by the API from the Redis Stream as
+part of a consumer group, in batches of AUDIT_BATCH_SIZE, and stores each
+batch in the partitioned `url_audit` table with one multi-row INSERT before
+acknowledging it. Several workers can run side by side with different
+consumer names.
+
+On start the worker first replays the entries it received but never
+acknowledged; while idle it claims entries left pending by other consumers
+for more than AUDIT_CLAIM_IDLE_MS. Since inserts skip already stored event
+IDs, a redelivered batch is never duplicated. Lost Redis connections are
+retried, so the worker outlives Redis restarts.
+"""
+from argparse import ArgumentParser
+from asyncio import run, sleep
+from datetime import datetime, timezone
+from json import loads as json_loads
+from socket import gethostname
+from os import getpid
+from time import monotonic
+from typing import List, Optional, Tuple
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import ResponseError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from app.api.connections.db import DBContext, engine
+from app.api.modules.crud_postgresql.query_audit import AuditRepository
+from app.api.modules.logger_modify import get_logger
+from app.api.modules.redis_conf.redis_conf import RedisManager
+from app.api.settings import get_settings
+
+logger = get_logger(__name__)
+
+# Seconds between checks that the monthly partitions exist.
+PARTITION_CHECK_INTERVAL = 3600
+
+# Seconds to wait before reading again after losing the Redis connection.
+RECONNECT_DELAY = 1
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def to_row(entry_id, fields: dict) -> dict:
+    """
+    Convert a stream entry into a `url_audit` row.
+
+    Args:
+        entry_id (bytes): The stream ID, "<milliseconds>-<sequence>".
+        fields (dict): The entry fields.
+
+    Returns:
+        dict: The UrlAudit column values.
+    """
+    event_id = _text(entry_id)
+    fields = {_text(key): _text(value) for key, value in fields.items()}
+    milliseconds = int(event_id.split("-", 1)[0])
+    return {
+        "event_id": event_id,
+        "created_at": datetime.fromtimestamp(milliseconds / 1000, timezone.utc),
+        "action": fields["action"],
+        "url_id": int(fields["url_id"]),
+        "actor": fields.get("actor") or None,
+        "data": json_loads(fields["data"]) if fields.get("data") else None,
+    }
+
+
+async def store_batch(client, entries: List[Tuple]) -> int:
+    """
+    Persist a batch of entries and acknowledge it.
+
+    Args:
+        client (Redis): The Redis client.
+        entries (List[Tuple]): (entry_id, fields) pairs.
+
+    Returns:
+        int: Number of entries stored.
+    """
+    if not entries:
+        return 0
+    settings = get_settings()
+    async with DBContext() as db:
+        await AuditRepository(db).insert_events([to_row(entry_id, fields) for entry_id, fields in entries])
+    await client.xack(settings.audit_stream, settings.audit_group, *(entry_id for entry_id, _ in entries))
+    return len(entries)
+
+
+async def run_worker(consumer: str, once: bool = False) -> int:
+    """
+    Consume the audit stream until interrupted.
+
+    Args:
+        consumer (str): Name of this consumer in the group.
+        once (bool): Stop as soon as no entries are waiting.
+
+    Returns:
+        int: Number of events stored.
+    """
+    settings = get_settings()
+    # XREADGROUP blocks for AUDIT_BLOCK_MS, so replies may take that long.
+    redis_manager = RedisManager.from_settings(
+        settings, socket_timeout=settings.audit_block_ms / 1000 + settings.redis_socket_timeout
+    )
+    client = redis_manager.get_client()
+    stream, group = settings.audit_stream, settings.audit_group
+    stored = 0
+    try:
+        try:
+            await client.xgroup_create(stream, group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        partitions_checked = None
+        # "0" replays this consumer's unacknowledged entries, ">" reads new ones.
+        next_id = "0"
+        while True:
+            if partitions_checked is None or monotonic() - partitions_checked > PARTITION_CHECK_INTERVAL:
+                async with DBContext() as db:
+                    await AuditRepository(db).ensure_partitions()
+                partitions_checked = monotonic()
+
+            try:
+                try:
+                    response = await client.xreadgroup(
+                        group,
+                        consumer,
+                        {stream: next_id},
+                        count=settings.audit_batch_size,
+                        block=None if next_id == "0" else settings.audit_block_ms,
+                    )
+                except RedisTimeoutError:
+                    # An idle stream answered late: same as no entries.
+                    response = None
+                entries = response[0][1] if response else []
+                if next_id == "0" and not entries:
+                    next_id = ">"
+                    continue
+                if not entries:
+                    claimed = await client.xautoclaim(
+                        stream, group, consumer, settings.audit_claim_idle_ms, "0-0", count=settings.audit_batch_size
+                    )
+                    # Entries trimmed from the stream come back without fields.
+                    entries = [(entry_id, fields) for entry_id, fields in claimed[1] if fields]
+                    if not entries and once:
+                        break
+
+                stored += await store_batch(client, entries)
+            except (RedisConnectionError, RedisTimeoutError) as e:
+                # Unacknowledged entries are delivered again, and stored once.
+                logger.warning("Audit stream unavailable, retrying: %s", str(e))
+                await sleep(RECONNECT_DELAY)
+                continue
+            if entries:
+                logger.info("Audit events stored: %d (%d total)", len(entries), stored)
+    finally:
+        await redis_manager.close()
+        await engine.dispose()
+    return stored
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command-line entry point.
+
+    Args:
+        argv (List[str]): Arguments, defaults to sys.argv.
+    """
+    parser = ArgumentParser(prog="python -m app.api.tools.audit_worker", description="Store URL audit events.")
+    parser.add_argument("--consumer", default=f"{gethostname()}-{getpid()}", help="consumer name (default: host-pid)")
+    parser.add_argument("--once", action="store_true", help="exit when no events are waiting")
+    args = parser.parse_args(argv)
+    run(run_worker(args.consumer, once=args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Bulk import of a URL catalog from CSV or Parquet.
+
+Usage:
+    python -m app.api.tools.import_urls catalog.csv [--chunk-size 50000] [--resume] [--dry-run]
+
+The file is read in chunks. Every chunk is validated and normalized with
+vectorized pandas operations, loaded into `urls` with COPY FROM STDIN and
+committed. Right after each commit the number of source rows consumed is
+saved in a checkpoint file, so an interrupted import restarts where it
+stopped with `--resume`. The new rows are then written to the `url_data:*`
+Redis keys through pipelines; if Redis fails they are simply cached on
+their first read.
+
+Columns missing from the file are imported as NULL and unknown columns are
+ignored. Rows with values that do not fit `urls` are rejected and counted.
+"""
+from argparse import ArgumentParser
+from asyncio import run
+from json import dump as json_dump, load as json_load
+from os import replace
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator, List, Optional, Tuple
+import pandas as pd
+from redis import RedisError
+from app.api.connections.db import DBContext, engine
+from app.api.models.model import Urls
+from app.api.modules.crud_postgresql.query_url import URL_COLUMNS, UrlDataRepository
+from app.api.modules.crud_postgresql.querys_user import UserRepository
+from app.api.modules.crud_reddis.crud_redis_basic import CrudRedis
+from app.api.modules.logger_modify import get_logger
+from app.api.modules.redis_conf.redis_conf import RedisManager
+from app.api.settings import get_settings
+
+logger = get_logger(__name__)
+
+# Largest value of a Postgres integer column.
+MAX_INTEGER = 2 ** 31 - 1
+
+
+def read_chunks(path: Path, chunk_size: int, skip: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV or Parquet file in chunks.
+
+    Args:
+        path (Path): The file; the format is taken from its extension.
+        chunk_size (int): Rows per chunk.
+        skip (int): Leading rows to drop, as recorded by a checkpoint.
+
+    Yields:
+        pd.DataFrame: The chunks, indexed by source row number.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        # Everything is read as text and converted by normalize_chunk; only
+        # empty cells are NULL, so titles such as "NA" survive.
+        chunks = pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[""])
+    elif suffix in (".parquet", ".pq"):
+        from pyarrow.parquet import ParquetFile
+
+        parquet = ParquetFile(path)
+        columns = [column for column in URL_COLUMNS if column in parquet.schema_arrow.names]
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns))
+    else:
+        raise ValueError(f"Unsupported file type: {path.suffix}")
+
+    start = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        if start <= skip:
+            continue
+        yield chunk[chunk.index >= skip]
+
+
+def normalize_chunk(chunk: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Validate and normalize a chunk for `urls`.
+
+    Strings are stripped (blank becomes NULL) and must fit their column;
+    `rating` and `user_id` must be integers.
+
+    Args:
+        chunk (pd.DataFrame): Raw rows of the source file.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.Series]: The valid rows with exactly the
+            URL_COLUMNS, and the reason of every rejected row, indexed by row.
+    """
+    frame = chunk.reindex(columns=list(URL_COLUMNS))
+    reasons = pd.Series(pd.NA, index=frame.index, dtype="string")
+
+    for column in URL_COLUMNS:
+        column_type = Urls.__table__.c[column].type
+        if column_type.python_type is int:
+            numbers = pd.to_numeric(frame[column], errors="coerce")
+            invalid = frame[column].notna() & ~(numbers.notna() & (numbers % 1 == 0) & (numbers.abs() <= MAX_INTEGER))
+            reasons = reasons.mask(reasons.isna() & invalid, f"Field {column} must be an integer")
+            frame[column] = numbers.where(~invalid).astype("Int64")
+        else:
+            values = frame[column].astype("string").str.strip()
+            values = values.mask(values == "")
+            too_long = (values.str.len() > column_type.length).fillna(False).astype(bool)
+            reasons = reasons.mask(
+                reasons.isna() & too_long, f"Field {column} is longer than {column_type.length} characters"
+            )
+            frame[column] = values
+
+    rejected = reasons.notna()
+    return frame[~rejected], reasons[rejected]
+
+
+def to_rows(frame: pd.DataFrame) -> List[dict]:
+    """
+    Convert normalized rows to plain Python values for the database driver.
+
+    Args:
+        frame (pd.DataFrame): Output of normalize_chunk.
+
+    Returns:
+        List[dict]: One dict per row, with None for NULL.
+    """
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+def load_checkpoint(checkpoint: Path, source: Path) -> dict:
+    """
+    Read the progress of a previous run.
+
+    Args:
+        checkpoint (Path): The checkpoint file.
+        source (Path): The file being imported.
+
+    Returns:
+        dict: The saved counters.
+
+    Raises:
+        ValueError: If the checkpoint belongs to another file.
+    """
+    with checkpoint.open() as handle:
+        state = json_load(handle)
+    if state["source"] != str(source.resolve()):
+        raise ValueError(f"Checkpoint {checkpoint} belongs to {state['source']}")
+    return state
+
+
+def save_checkpoint(checkpoint: Path, state: dict) -> None:
+    """
+    Atomically write the progress of the import.
+
+    Args:
+        checkpoint (Path): The checkpoint file.
+        state (dict): The counters to save.
+    """
+    partial = checkpoint.with_name(checkpoint.name + ".tmp")
+    with partial.open("w") as handle:
+        json_dump(state, handle)
+    replace(partial, checkpoint)
+
+
+async def warm_cache_with(redis_repo: CrudRedis, loaded: List[dict], batch_size: int) -> None:
+    """
+    Store imported URLs in Redis, best-effort.
+
+    The rows are already committed, so a Redis failure only leaves them to
+    be cached on their first read; it is logged and the import goes on.
+
+    Args:
+        redis_repo (CrudRedis): The cache repository.
+        loaded (List[dict]): The imported rows, with their IDs.
+        batch_size (int): URLs per Redis pipeline.
+    """
+    for offset in range(0, len(loaded), batch_size):
+        try:
+            await redis_repo.store_urls_in_redis(loaded[offset:offset + batch_size])
+        except RedisError as e:
+            logger.warning("Cache warming skipped for %d URLs: %s", len(loaded) - offset, str(e))
+            return
+
+
+async def import_urls(
+    source: Path,
+    chunk_size: int = 50000,
+    checkpoint: Optional[Path] = None,
+    resume: bool = False,
+    dry_run: bool = False,
+    warm_cache: bool = True,
+    cache_batch_size: int = 5000,
+) -> dict:
+    """
+    Import a catalog file into `urls` and warm the URL cache.
+
+    Args:
+        source (Path): CSV or Parquet file.
+        chunk_size (int): Rows read, validated and committed at a time.
+        checkpoint (Path): Progress file, defaults to `<source>.checkpoint`.
+        resume (bool): Continue from the checkpoint instead of starting over.
+        dry_run (bool): Only validate the file; nothing is written.
+        warm_cache (bool): Store the imported URLs in Redis.
+        cache_batch_size (int): URLs per Redis pipeline.
+
+    Returns:
+        dict: The final counters: rows read, imported and rejected.
+
+    Raises:
+        FileExistsError: If a checkpoint exists and `resume` is not set.
+    """
+    checkpoint = checkpoint or source.with_name(source.name + ".checkpoint")
+    state = {"source": str(source.resolve()), "rows": 0, "imported": 0, "rejected": 0}
+    if resume and checkpoint.exists():
+        state = load_checkpoint(checkpoint, source)
+        logger.info("Resuming %s after %d rows", source, state["rows"])
+    elif checkpoint.exists() and not dry_run:
+        raise FileExistsError(f"Checkpoint {checkpoint} exists; pass --resume or delete it")
+
+    redis_manager = RedisManager.from_settings(get_settings()) if warm_cache and not dry_run else None
+    started = perf_counter()
+    read = 0
+    try:
+        async with DBContext() as db:
+            url_repo = UrlDataRepository(db)
+            user_repo = UserRepository(db)
+            redis_repo = CrudRedis(redis_manager) if redis_manager else None
+            for chunk in read_chunks(source, chunk_size, skip=state["rows"]):
+                valid, reasons = normalize_chunk(chunk)
+
+                user_ids = valid["user_id"].dropna().unique().tolist()
+                if user_ids:
+                    existing = await user_repo.existing_user_ids([int(user_id) for user_id in user_ids])
+                    unknown = valid["user_id"].notna() & ~valid["user_id"].isin(list(existing))
+                    reasons = pd.concat([reasons, pd.Series("Unknown user_id", index=valid.index[unknown])])
+                    valid = valid[~unknown]
+
+                loaded = [] if dry_run else await url_repo.import_urls(to_rows(valid))
+
+                read += len(chunk)
+                state["rows"] = int(chunk.index[-1]) + 1
+                state["imported"] += len(valid)
+                state["rejected"] += len(reasons)
+                if not dry_run:
+                    # Right after the commit, so a resumed import never loads the chunk again.
+                    save_checkpoint(checkpoint, state)
+                if redis_repo:
+                    await warm_cache_with(redis_repo, loaded, cache_batch_size)
+                logger.info(
+                    "Rows %d: imported %d, rejected %d (%.0f rows/s)",
+                    state["rows"], state["imported"], state["rejected"], read / (perf_counter() - started),
+                )
+                if len(reasons):
+                    logger.warning("Rejected in chunk: %s", reasons.value_counts().to_dict())
+    finally:
+        if redis_manager:
+            await redis_manager.close()
+        await engine.dispose()
+    return state
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command-line entry point.
+
+    Args:
+        argv (List[str]): Arguments, defaults to sys.argv.
+    """
+    parser = ArgumentParser(prog="python -m app.api.tools.import_urls", description="Import URLs from CSV or Parquet.")
+    parser.add_argument("source", type=Path, help="CSV or Parquet file with the URL_COLUMNS")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per chunk (default: 50000)")
+    parser.add_argument("--checkpoint", type=Path, help="progress file (default: <source>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="continue after the rows recorded in the checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="validate the file without writing anything")
+    parser.add_argument("--no-cache", dest="warm_cache", action="store_false", help="do not warm the Redis cache")
+    args = parser.parse_args(argv)
+
+    state = run(
+        import_urls(
+            args.source,
+            chunk_size=args.chunk_size,
+            checkpoint=args.checkpoint,
+            resume=args.resume,
+            dry_run=args.dry_run,
+            warm_cache=args.warm_cache,
+        )
+    )
+    logger.info("Import finished: %d rows, %d imported, %d rejected", state["rows"], state["imported"], state["rejected"])
+
+
+if __name__ == "__main__":
+    main()